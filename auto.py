@@ -1,11 +1,10 @@
-import matplotlib
-matplotlib.use("TkAgg")  # Use TkAgg for GUI compatibility
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import tkinter as tk
-from tkinter import ttk
 import numpy as np
 
+import frame_timing
+
+# Tk and matplotlib are imported by the GUI functions that need them, so
+# apply_rule can be used (and benchmarked) without a display.
+
 # Rule mapping
 rule_map = {
     "Rule 30: Chaotic": 30,
@@ -27,10 +26,15 @@ initial_state[width // 2] = 1  # Activate center cell
 
 running = False  # Global flag to control animation
 
+# Frame timing overlay and trace, off unless FRAME_TIMING is set (see frame_timing.py)
+timing = frame_timing.FrameTimer.from_env()
+
 
 def select_rule():
     """Create the GUI for rule selection."""
     global running
+    import tkinter as tk
+    from tkinter import ttk
 
     def toggle_animation():
         global running
@@ -86,6 +90,10 @@ def apply_rule(current_state, rule_number):
 def simulate(rule_number):
     """Run and animate the cellular automaton with a grid."""
     global running
+    import matplotlib
+    matplotlib.use("TkAgg")  # Use TkAgg for GUI compatibility
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
 
     # Initialize grid to store evolution steps
     grid = np.zeros((steps, width), dtype=int)
@@ -104,11 +112,18 @@ def simulate(rule_number):
 
     img = ax.imshow(grid, cmap="Greens", aspect="auto", interpolation="none")
     ax.set_title(f"Elementary Cellular Automaton - Rule {rule_number}")
+    # FuncAnimation draws after evolve returns, so draws are timed by wrapping the canvas
+    timing.wrap_draw(fig.canvas)
+    timing.attach_overlay(fig.canvas)
 
     def evolve(i):
         if running and i < steps - 1:
-            grid[i + 1] = apply_rule(grid[i], rule_number)  # Generate next state
-            img.set_array(grid)  # Update display
+            with timing.frame():
+                with timing.span("step"):
+                    grid[i + 1] = apply_rule(grid[i], rule_number)  # Generate next state
+                with timing.span("artists"):
+                    img.set_array(grid)  # Update display
+                    timing.update_overlay()
         return [img]
 
     ani = animation.FuncAnimation(fig, evolve, frames=steps, interval=150, blit=False)
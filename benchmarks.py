@@ -0,0 +1,359 @@
+"""Throughput benchmarks for the simulation hot paths, with regression checks.
+
+Each case times one hot path at several input sizes and reports items per
+second (integration steps, cells, ticks, frames, droplets, lookups):
+
+  * projectile.rk4 / projectile.euler   Projectile.runge_kutta, the "flight 2" update
+  * auto.apply_rule                     one elementary-CA generation
+  * ca2d.evolve2d                       2d.py's customrule through cellpylib.evolve2d
+  * currency.ticks                      CurrencySimulator.produce_ticks, per CPU second
+  * currency.update_graph               one live-chart frame on an Agg canvas
+  * spatter.simulate_blood_spatter      droplets for a catalogue weapon
+  * weapons.lookup                      WeaponDB.get_weapon / get_weapon_by_id
+
+Results are written as JSON and can be compared with a baseline run: a
+case whose throughput dropped by more than its threshold counts as a
+regression and makes the command exit with status 1. Timings only compare
+on the same machine, so keep one baseline per box.
+
+    python benchmarks.py run --out bench.json
+    python benchmarks.py run --only projectile auto --baseline bench_baseline.json
+    python benchmarks.py compare bench.json bench_baseline.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from queue import Queue
+from typing import Callable, Optional
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THRESHOLD = 0.15
+TICK_SECONDS = 0.5  # How long the tick producer runs per sample
+
+_temp_dirs = []  # Catalogues written by the weapon cases; removed at exit
+
+
+@dataclass
+class Case:
+    name: str
+    sizes: tuple
+    setup: Callable    # setup(size) -> run(); run() returns the items processed, or (items, seconds)
+    unit: str
+    threshold: float = DEFAULT_THRESHOLD  # Throughput drop (fraction) tolerated before it's a regression
+    requires: tuple = ()                  # Optional modules; the case is skipped without them
+
+
+class _Var:
+    """Stands in for a Tk variable."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+# --- Cases ----------------------------------------------------------------
+
+def _flight(method):
+    def setup(steps):
+        from projectile import EulerProjectile, Projectile
+
+        cls = Projectile if method == "runge_kutta" else EulerProjectile
+
+        def run():
+            projectile = cls(50.0, 45.0, 1e5, 0.01, 1.0)  # Launched high enough not to land mid-run
+            step = getattr(projectile, method)
+            for _ in range(steps):
+                step(1e-3)
+            return steps
+        return run
+    return setup
+
+
+def _apply_rule(width, steps=10):
+    from auto import apply_rule
+
+    state = np.random.default_rng(0).integers(0, 2, width)
+
+    def run():
+        current = state
+        for _ in range(steps):
+            current = apply_rule(current, 30)
+        return width * steps
+    return run
+
+
+def _evolve2d(size, timesteps=10):
+    ca2d = runpy.run_path(os.path.join(HERE, "2d.py"), run_name="ca2d")
+    state = ca2d["initial_state"](size, size)
+
+    def run():
+        ca2d["evolve"](state, timesteps)
+        return size * size * (timesteps - 1)
+    return run
+
+
+def _currency_app():
+    import matplotlib
+    matplotlib.use("Agg")
+    from currency import CurrencySimulator
+    from frame_timing import FrameTimer
+
+    app = CurrencySimulator.__new__(CurrencySimulator)
+    app.timing = FrameTimer()  # Disabled, as in a normal run
+    return app
+
+
+def _ticks(tick_rate):
+    app = _currency_app()
+
+    def run():
+        queue, stop_event, cpu = Queue(), threading.Event(), []
+
+        def producer():
+            start = time.thread_time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                app.produce_ticks(queue, stop_event, 73.0738, 71.1012, tick_rate)
+            cpu.append(time.thread_time() - start)
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        time.sleep(TICK_SECONDS)
+        stop_event.set()
+        thread.join()
+        ticks = 0
+        while not queue.empty():
+            ticks += len(queue.get_nowait()[0])
+        # Paced by the clock, so the cost is the producer's CPU time, not the wall time
+        return ticks, max(cpu[0], 1e-9)
+    return run
+
+
+def _update_graph(points, frames=20):
+    app = _currency_app()
+    import matplotlib.pyplot as plt
+
+    app.fig, app.ax = plt.subplots(figsize=(8, 4))
+    app.canvas = app.fig.canvas
+    app.data_points_count = points
+    app.tick_rate = 1.0
+    app.ema_spans, app.analytics_windows = (20,), (20, 100)
+    app.inr_label, app.rub_label = "INR", "RUB"
+    app.history_view = False
+    app.show_analytics_var = _Var(False)
+    app.init_graph()
+
+    def run():
+        # Same ticks every run: one full draw, then blits with the occasional rescale
+        app.reset_graph_limits()
+        app.time_history, app.rate_history1, app.rate_history2 = [0.0], [73.0738], [71.1012]
+        rng = random.Random(0)
+        for _ in range(frames):
+            app.time_history.append(app.time_history[-1] + 1.0)
+            app.rate_history1.append(app.rate_history1[-1] * rng.uniform(0.995, 1.005))
+            app.rate_history2.append(app.rate_history2[-1] * rng.uniform(0.995, 1.005))
+            app.update_graph()
+        return frames
+    return run
+
+
+def _weapon_db(count):
+    """A WeaponDB of ``count`` weapons in a temporary weapons.json."""
+    from weapons import Weapon, WeaponDB
+
+    tmp = tempfile.TemporaryDirectory()
+    _temp_dirs.append(tmp)
+    db = WeaponDB(os.path.join(tmp.name, "weapons.json"), on_error=lambda title, message: None)
+    db.weapons = [Weapon(i, f"Weapon {i}", "Sharp", 1.0 + i % 3, 0.2 + 0.1 * (i % 4), "", "", 0.3)
+                  for i in range(1, count + 1)]
+    db.save_weapons()
+    db.load_weapons(force=True)
+    return db
+
+
+def _simulate_blood_spatter(droplets):
+    from spatter import simulate_blood_spatter
+
+    db = _weapon_db(3)
+
+    def run():
+        x, _, _ = simulate_blood_spatter(20.0, 45.0, "Rough", "Weapon 2", db, droplets, rng=0)
+        return len(x)
+    return run
+
+
+def _weapon_lookup(count):
+    db = _weapon_db(count)
+    names = [w.name for w in db.weapons]
+    ids = [w.id for w in db.weapons]
+
+    def run():
+        db.load_weapons()  # Unchanged file: a stat, not a re-read
+        for name in names:
+            db.get_weapon(name)
+        for weapon_id in ids:
+            db.get_weapon_by_id(weapon_id)
+        return 2 * count
+    return run
+
+
+CASES = [
+    Case("projectile.rk4", (1_000, 10_000, 100_000), _flight("runge_kutta"), "steps/s"),
+    Case("projectile.euler", (1_000, 10_000, 100_000), _flight("update"), "steps/s"),
+    Case("auto.apply_rule", (60, 1_000, 10_000), _apply_rule, "cells/s"),
+    Case("ca2d.evolve2d", (60, 120), _evolve2d, "cells/s", requires=("cellpylib",)),
+    Case("currency.ticks", (1_000, 10_000, 100_000), _ticks, "ticks/CPU s", threshold=0.3),
+    Case("currency.update_graph", (12, 48, 192), _update_graph, "frames/s", threshold=0.25),
+    Case("spatter.simulate_blood_spatter", (10_000, 100_000, 1_000_000), _simulate_blood_spatter, "droplets/s"),
+    Case("weapons.lookup", (100, 10_000, 100_000), _weapon_lookup, "lookups/s"),
+]
+
+
+# --- Running and comparing ----------------------------------------------
+
+def _missing(case):
+    for module in case.requires:
+        try:
+            __import__(module)
+        except ImportError:
+            return module
+    return None
+
+
+def measure(case, size, repeat=5):
+    """Throughput of one case at one size: the fastest of ``repeat`` runs, after a warm-up run.
+
+    The fastest run is the one least disturbed by the rest of the machine, so
+    it's the steadiest number to compare; the median and spread are kept too.
+    """
+    run = case.setup(size)
+    run()  # Warm-up: imports, caches, first allocations
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        items, seconds = result if isinstance(result, tuple) else (result, elapsed)
+        samples.append(seconds)
+    best = min(samples)
+    return {"case": case.name, "size": size, "unit": case.unit, "items": items, "min_s": best,
+            "median_s": statistics.median(samples), "stdev_s": statistics.pstdev(samples),
+            "throughput": items / best, "threshold": case.threshold}
+
+
+def run_benchmarks(only=None, repeat=5, progress=print):
+    """Run every case (or those whose name contains one of ``only``) and return the results document."""
+    results, skipped = {}, {}
+    for case in CASES:
+        if only and not any(pattern in case.name for pattern in only):
+            continue
+        module = _missing(case)
+        if module:
+            skipped[case.name] = f"{module} is not installed"
+            progress(f"{case.name:<32} skipped ({module} is not installed)")
+            continue
+        for size in case.sizes:
+            result = measure(case, size, repeat)
+            results[f"{case.name}[{size}]"] = result
+            progress(f"{case.name:<32} {size:>10,} {result['throughput']:>14,.0f} {case.unit}"
+                     f"  (±{100 * result['stdev_s'] / result['median_s']:.0f}%)")
+    meta = {"date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "machine": platform.node(),
+            "cpus": os.cpu_count(), "repeat": repeat}
+    return {"meta": meta, "results": results, "skipped": skipped}
+
+
+def compare(current, baseline, threshold=None):
+    """Rows of (key, baseline, current, change, status); ``threshold`` overrides each case's own."""
+    ran = {result["case"] for result in current["results"].values()} | set(current.get("skipped", {}))
+    keys = set(current["results"]) | {key for key, result in baseline["results"].items() if result["case"] in ran}
+    order = {case.name: i for i, case in enumerate(CASES)}
+    rows = []
+    for key in sorted(keys, key=lambda key: (order.get(key.split("[")[0], len(order)), key.split("[")[0],
+                                             int(key.split("[")[1].rstrip("]")))):
+        new, old = current["results"].get(key), baseline["results"].get(key)
+        if old is None:
+            rows.append((key, None, new["throughput"], None, "new"))
+        elif new is None:
+            skipped = old["case"] in current.get("skipped", {})
+            rows.append((key, old["throughput"], None, None, "skipped" if skipped else "missing"))
+        else:
+            change = new["throughput"] / old["throughput"] - 1
+            limit = new["threshold"] if threshold is None else threshold
+            status = "REGRESSION" if change < -limit else "faster" if change > limit else "ok"
+            rows.append((key, old["throughput"], new["throughput"], change, status))
+    return rows
+
+
+def print_comparison(rows, current, baseline):
+    if current["meta"].get("machine") != baseline["meta"].get("machine"):
+        print(f"Note: baseline is from {baseline['meta'].get('machine')}, not {current['meta'].get('machine')}; "
+              "timings may not be comparable")
+    print(f"{'case':<44} {'baseline':>14} {'current':>14} {'change':>8}  status")
+    for key, old, new, change, status in rows:
+        print(f"{key:<44} {'-' if old is None else f'{old:,.0f}':>14} {'-' if new is None else f'{new:,.0f}':>14} "
+              f"{'' if change is None else f'{100 * change:+.1f}%':>8}  {status}")
+    return sum(status == "REGRESSION" for *_, status in rows)
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Throughput benchmarks for the simulation hot paths")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run the benchmarks")
+    run.add_argument("--only", nargs="+", help="case name substrings, e.g. projectile currency")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--out", default="bench.json")
+    run.add_argument("--baseline", help="results file to compare against")
+    run.add_argument("--threshold", type=float, help="allowed throughput drop for every case, e.g. 0.1")
+    cmp = sub.add_parser("compare", help="compare two results files")
+    cmp.add_argument("current")
+    cmp.add_argument("baseline")
+    cmp.add_argument("--threshold", type=float)
+    sub.add_parser("list", help="list the cases and their sizes")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for case in CASES:
+            print(f"{case.name:<32} {case.unit:<12} sizes {', '.join(f'{s:,}' for s in case.sizes)}"
+                  f"  threshold {case.threshold:.0%}")
+        return 0
+
+    if args.command == "run":
+        current = run_benchmarks(args.only, args.repeat)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.out}")
+        if not args.baseline:
+            return 0
+        baseline = _load(args.baseline)
+    else:
+        current, baseline = _load(args.current), _load(args.baseline)
+
+    regressions = print_comparison(compare(current, baseline, args.threshold), current, baseline)
+    if regressions:
+        print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
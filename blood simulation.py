@@ -1,83 +1,14 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import art3d
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from PIL import Image, ImageTk, ImageDraw
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import cv2
-from dataclasses import dataclass
-import json
-from typing import Optional
-
-# Weapon Database Classes
-@dataclass
-class Weapon:
-    id: int
-    name: str
-    type: str
-    velocity_mult: float
-    spread_factor: float
-    pattern_desc: str
-    stain_chars: str
-    satellite_chance: float
-    caliber: Optional[str] = None
-    blade_length: Optional[float] = None
-
-class WeaponDB:
-    def __init__(self, file_path='weapons.json'):
-        self.weapons = []
-        self.file_path = file_path
-        self.load_weapons()
-
-    def load_weapons(self):
-        try:
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
-                self.weapons = [
-                    Weapon(
-                        id=w["id"],
-                        name=w["name"],
-                        type=w["type"],
-                        velocity_mult=w["velocity_mult"],
-                        spread_factor=w["spread_factor"],
-                        pattern_desc=w["pattern_desc"],
-                        stain_chars=w["stain_chars"],
-                        satellite_chance=w["satellite_chance"],
-                        caliber=w.get("caliber"),
-                        blade_length=w.get("blade_length")
-                    ) for w in data.get('weapons', [])
-                ]
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            messagebox.showerror("Load Error", f"Failed to load weapons: {str(e)}")
-            self.weapons = []
-
-    def save_weapons(self):
-        data = {"weapons": [{
-            "id": w.id,
-            "name": w.name,
-            "type": w.type,
-            "velocity_mult": w.velocity_mult,
-            "spread_factor": w.spread_factor,
-            "pattern_desc": w.pattern_desc,
-            "stain_chars": w.stain_chars,
-            "satellite_chance": w.satellite_chance,
-            "caliber": w.caliber,
-            "blade_length": w.blade_length
-        } for w in self.weapons]}
-        try:
-            with open(self.file_path, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            messagebox.showerror("Save Error", f"Failed to save weapons: {str(e)}")
-
-    def get_weapon(self, name):
-        return next((w for w in self.weapons if w.name == name), None)
-
-    def get_all_weapons(self):
-        return [w.name for w in self.weapons]
+from functools import lru_cache
+import queue
+import threading
+import frame_timing
+from spatter import simulate_blood_spatter, simulate_ballistic_spatter, voxel_decimate, density_grid
+from weapons import Weapon, WeaponDB
+# matplotlib and its Tk canvas are imported when the plots are built; spatter_index,
+# spatter_archive, stain_detection (OpenCV) and spatter_report (reportlab) on first use
 
 # Weapon Manager GUI
 class WeaponManager(tk.Toplevel):
@@ -128,9 +59,8 @@ class AddWeaponDialog(tk.Toplevel):
 
     def save_weapon(self):
         try:
-            new_id = max(w.id for w in self.db.weapons) + 1 if self.db.weapons else 1
             new_weapon = Weapon(
-                id=new_id,
+                id=self.db.next_id(),
                 name=self.vars["name"].get(),
                 type=self.vars["type"].get(),
                 velocity_mult=self.vars["velocity_mult"].get(),
@@ -139,13 +69,96 @@ class AddWeaponDialog(tk.Toplevel):
                 pattern_desc=self.vars["pattern_desc"].get(),
                 stain_chars=self.vars["stain_chars"].get()
             )
-            self.db.weapons.append(new_weapon)
-            self.db.save_weapons()
-            self.destroy()
+            if self.db.add_weapon(new_weapon):  # A duplicate name is reported and the dialog stays open
+                self.destroy()
         except ValueError as e:
             messagebox.showerror("Input Error", f"Invalid value: {str(e)}")
 
+# Archived Run Browser
+class RunBrowser(tk.Toplevel):
+    def __init__(self, parent, archive):
+        super().__init__(parent)
+        self.title("Past Runs")
+        self.parent = parent
+        self.archive = archive
+        self.geometry("600x350")
+
+        filter_frame = tk.Frame(self)
+        filter_frame.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(filter_frame, text="Weapon:").pack(side=tk.LEFT)
+        self.weapon_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.weapon_var, width=12).pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="Surface:").pack(side=tk.LEFT)
+        self.surface_var = tk.StringVar()
+        ttk.Combobox(filter_frame, textvariable=self.surface_var, values=["", "Smooth", "Rough", "Fabric"],
+                     width=8, state="readonly").pack(side=tk.LEFT, padx=5)
+        tk.Button(filter_frame, text="Filter", command=self.refresh_list).pack(side=tk.LEFT, padx=5)
+
+        self.listbox = tk.Listbox(self)
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.listbox.bind("<Double-Button-1>", lambda event: self.load_run())
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=5)
+        tk.Button(btn_frame, text="Load", command=self.load_run).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Delete", command=self.delete_run).pack(side=tk.LEFT, padx=5)
+        self.refresh_list()
+
+    def refresh_list(self):
+        criteria = {key: var.get() for key, var in (("weapon", self.weapon_var), ("surface", self.surface_var))
+                    if var.get()}
+        self.runs = self.archive.find(**criteria)[::-1]  # Newest first
+        self.listbox.delete(0, tk.END)
+        for e in self.runs:
+            self.listbox.insert(tk.END, f"{e['id']}  {e['weapon']} / {e['surface']} / {e['model']}  "
+                                        f"{e['velocity']} m/s at {e['angle']}°  {e['droplets']:,} droplets")
+
+    def selected(self):
+        selection = self.listbox.curselection()
+        return self.runs[selection[0]]["id"] if selection else None
+
+    def load_run(self):
+        run_id = self.selected()
+        if run_id:
+            self.parent.load_archived_run(run_id)
+
+    def delete_run(self):
+        run_id = self.selected()
+        if run_id and messagebox.askyesno("Delete Run", f"Delete run {run_id}?", parent=self):
+            self.archive.delete(run_id)
+            self.refresh_list()
+
 # Stabbing Simulation Classes
+@lru_cache(maxsize=None)
+def cylinder_mesh(pos, radius, height, direction=(0, 0, 1)):
+    """X, Y, Z grids of a cylinder surface; cached, so resets and new scenes reuse them."""
+    u = np.linspace(0, 2 * np.pi, 50)
+    z = np.linspace(0, height, 2)
+    U, Z = np.meshgrid(u, z)
+    X = radius * np.cos(U) + pos[0]
+    Y = radius * np.sin(U) + pos[1]
+    Z = Z + pos[2]
+
+    if direction != (0, 0, 1):
+        direction = np.array(direction) / np.linalg.norm(direction)
+        rot_matrix = HumanBody3D.rotation_matrix((0, 0, 1), direction)
+        points = np.vstack((X.ravel(), Y.ravel(), Z.ravel()))
+        rotated_points = np.dot(rot_matrix, points).T.reshape(X.shape + (3,))
+        X, Y, Z = rotated_points[..., 0], rotated_points[..., 1], rotated_points[..., 2]
+    for grid in (X, Y, Z):
+        grid.flags.writeable = False  # Shared between callers
+    return X, Y, Z
+
+@lru_cache(maxsize=None)
+def sphere_mesh(pos, radius):
+    u = np.linspace(0, 2 * np.pi, 50)
+    v = np.linspace(0, np.pi, 50)
+    x = radius * np.outer(np.cos(u), np.sin(v)) + pos[0]
+    y = radius * np.outer(np.sin(u), np.sin(v)) + pos[1]
+    z = radius * np.outer(np.ones(np.size(u)), np.cos(v)) + pos[2]
+    for grid in (x, y, z):
+        grid.flags.writeable = False
+    return x, y, z
+
 class HumanBody3D:
     def __init__(self, ax):
         self.ax = ax
@@ -186,28 +199,11 @@ class HumanBody3D:
         )
 
     def add_cylinder(self, pos, radius, height, color, direction=(0, 0, 1)):
-        u = np.linspace(0, 2 * np.pi, 50)
-        z = np.linspace(0, height, 2)
-        U, Z = np.meshgrid(u, z)
-        X = radius * np.cos(U) + pos[0]
-        Y = radius * np.sin(U) + pos[1]
-        Z = Z + pos[2]
-
-        if direction != (0, 0, 1):
-            direction = np.array(direction) / np.linalg.norm(direction)
-            rot_matrix = self.rotation_matrix((0, 0, 1), direction)
-            points = np.vstack((X.ravel(), Y.ravel(), Z.ravel()))
-            rotated_points = np.dot(rot_matrix, points).reshape(X.shape + (3,))
-            X, Y, Z = rotated_points[..., 0], rotated_points[..., 1], rotated_points[..., 2]
-
+        X, Y, Z = cylinder_mesh(tuple(pos), radius, height, tuple(direction))
         return self.ax.plot_surface(X, Y, Z, color=color, alpha=0.8)
 
     def add_sphere(self, pos, radius, color):
-        u = np.linspace(0, 2 * np.pi, 50)
-        v = np.linspace(0, np.pi, 50)
-        x = radius * np.outer(np.cos(u), np.sin(v)) + pos[0]
-        y = radius * np.outer(np.sin(u), np.sin(v)) + pos[1]
-        z = radius * np.outer(np.ones(np.size(u)), np.cos(v)) + pos[2]
+        x, y, z = sphere_mesh(tuple(pos), radius)
         return self.ax.plot_surface(x, y, z, color=color, alpha=0.8)
 
     @staticmethod
@@ -221,12 +217,17 @@ class HumanBody3D:
         return np.eye(3) + kmat + np.dot(kmat, kmat) * ((1 - c) / (s ** 2))
 
 class StabbingSimulation:
-    def __init__(self, parent):
+    def __init__(self, parent, timing=None):
         self.parent = parent
+        self.timing = timing or frame_timing.FrameTimer()
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         self.fig = plt.figure(figsize=(8, 6))
         self.ax = self.fig.add_subplot(111, projection='3d')
         self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.timing.wrap_draw(self.canvas)
+        self.timing.attach_overlay(self.canvas)
 
         control_frame = tk.Frame(parent)
         control_frame.pack(pady=10)
@@ -238,26 +239,34 @@ class StabbingSimulation:
         tk.Button(control_frame, text="Start Simulation", command=self.start_animation).grid(row=1, column=0, columnspan=2, pady=5)
         tk.Button(control_frame, text="Reset", command=self.reset_scene).grid(row=2, column=0, columnspan=2, pady=5)
 
+        self.animation_running = False
+        self.background = None
+        # The body is static: it is drawn by full draws only and cached as the
+        # background, so animation frames just restore it and draw the blade
         self.body = HumanBody3D(self.ax)
         self.initialize_blade()
+        self.set_view()
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def set_view(self):
         self.ax.set_xlim(-1, 1)
         self.ax.set_ylim(-1, 1)
         self.ax.set_zlim(0, 2)
 
     def initialize_blade(self):
+        from mpl_toolkits.mplot3d import art3d
         blade_length = 0.4
         blade_width = 0.05
         x = np.array([0, blade_length, blade_length, 0])
         y = np.array([-blade_width / 2, -blade_width / 2, blade_width / 2, blade_width / 2])
         z = np.zeros(4)
 
-        verts = [list(zip(x, y, z))]
-        self.blade = art3d.Poly3DCollection(verts)
+        self.blade_verts = np.column_stack([x, y, z])
+        self.blade_pos = np.array([0.5, 0, 1.2])
+        self.blade = art3d.Poly3DCollection([self.blade_verts + self.blade_pos], animated=True)
         self.blade.set_color('silver')
         self.ax.add_collection3d(self.blade)
 
-        self.blade_pos = np.array([0.5, 0, 1.2])
-
     def update_blade(self, progress):
         angle = np.radians(self.angle_var.get())
         attack_vector = np.array([
@@ -265,18 +274,31 @@ class StabbingSimulation:
             0,
             -np.sin(angle) * progress
         ])
+        self.blade.set_verts([self.blade_verts + self.blade_pos + attack_vector])
+
+    def on_draw(self, event):
+        # A full draw (resize, view rotation) invalidates the cached background
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_blade()
 
-        new_verts = []
-        for vert in self.blade.get_verts():
-            translated_vert = np.array(vert) + self.blade_pos + attack_vector
-            new_verts.append(translated_vert)
-        self.blade.set_verts(new_verts)
+    def draw_blade(self):
+        self.blade.do_3d_projection()
+        self.ax.draw_artist(self.blade)
 
     def animate_stab(self, frame=0):
         if self.animation_running:
-            progress = np.sin(frame * 0.1)
-            self.update_blade(progress)
-            self.canvas.draw()
+            with self.timing.frame():
+                with self.timing.span("step"):
+                    progress = np.sin(frame * 0.1)
+                    self.update_blade(progress)
+                    self.timing.update_overlay()
+                if self.background is None:
+                    self.canvas.draw()  # on_draw captures the background and draws the blade
+                else:
+                    with self.timing.span("draw"):
+                        self.canvas.restore_region(self.background)
+                        self.draw_blade()
+                        self.canvas.blit(self.fig.bbox)
             self.parent.after(50, self.animate_stab, frame + 1)
 
     def start_animation(self):
@@ -285,21 +307,30 @@ class StabbingSimulation:
             self.animate_stab()
 
     def reset_scene(self):
-        self.ax.cla()
-        self.body = HumanBody3D(self.ax)
-        self.initialize_blade()
-        self.ax.set_xlim(-1, 1)
-        self.ax.set_ylim(-1, 1)
-        self.ax.set_zlim(0, 2)
+        # The body artists and meshes are kept; only the blade and the view go back to the start
+        self.animation_running = False
+        self.update_blade(0)
+        self.ax.view_init()
+        self.set_view()
         self.canvas.draw()
 
+# Above this many droplets "Auto" rendering switches from points to voxels/density images
+POINT_LIMIT = 20_000
+
+# Longest stain/droplet table written into a PDF report. reportlab holds the
+# whole document in memory until it is saved, so this bounds the report's memory
+REPORT_MAX_ROWS = 50_000
+
 # Blood Spatter App
 class BloodSpatterApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Advanced Blood Spatter Analyzer")
         self.geometry("1200x800")
-        self.db = WeaponDB()
+        self.db = WeaponDB(on_error=messagebox.showerror)
+        self.archive = None  # Opened on the first archived save or browse
+        # Frame timing overlay and trace, off unless FRAME_TIMING is set (see frame_timing.py)
+        self.timing = frame_timing.FrameTimer.from_env()
 
         # Control Panel
         control_frame = tk.Frame(self, bd=2, relief=tk.RIDGE)
@@ -328,13 +359,53 @@ class BloodSpatterApp(tk.Tk):
         self.angle_scale.set(45)
         self.angle_scale.pack()
 
+        tk.Label(control_frame, text="Droplets:").pack()
+        self.droplets_var = tk.IntVar(value=100)
+        tk.Entry(control_frame, textvariable=self.droplets_var, width=10).pack()
+
+        # Model: the original scatter model or ballistic flight onto a surface plane
+        tk.Label(control_frame, text="Model:").pack()
+        self.model_var = tk.StringVar(value="Scatter")
+        ttk.Combobox(control_frame, textvariable=self.model_var, values=["Scatter", "Ballistic"],
+                     state="readonly").pack()
+
+        tk.Label(control_frame, text="Target plane:").pack()
+        self.plane_var = tk.StringVar(value="Floor")
+        ttk.Combobox(control_frame, textvariable=self.plane_var, values=["Floor", "Wall"], state="readonly").pack()
+
+        # Rendering: every droplet as a point, or decimated voxels and density images
+        tk.Label(control_frame, text="Render:").pack()
+        self.render_var = tk.StringVar(value="Auto")
+        ttk.Combobox(control_frame, textvariable=self.render_var, values=["Auto", "Points", "Density"],
+                     state="readonly").pack()
+
         # Buttons
         tk.Button(control_frame, text="Run Simulation", command=self.run_simulation).pack(pady=10)
         tk.Button(control_frame, text="Upload Image", command=self.upload_image).pack(pady=5)
-        tk.Button(control_frame, text="Generate Report", command=self.generate_report).pack(pady=5)
+        self.report_button = tk.Button(control_frame, text="Generate Report", command=self.generate_report)
+        self.report_button.pack(pady=5)
         tk.Button(control_frame, text="Manage Weapons", command=self.manage_weapons).pack(pady=5)
 
+        # Every run can be kept on disk and reloaded, memory-mapped, from Past Runs
+        self.archive_var = tk.BooleanVar(value=False)  # Opt-in: runs can be many MB each
+        tk.Checkbutton(control_frame, text="Archive runs", variable=self.archive_var).pack()
+        tk.Button(control_frame, text="Past Runs...", command=self.browse_runs).pack(pady=5)
+
+        # Spatial analysis: click the 2D plot to count droplets within the radius
+        tk.Label(control_frame, text="Query radius:").pack()
+        self.radius_var = tk.DoubleVar(value=0.1)
+        tk.Entry(control_frame, textvariable=self.radius_var, width=10).pack()
+        tk.Button(control_frame, text="Cluster Analysis", command=self.cluster_analysis).pack(pady=5)
+
+        # Report progress; reports are written on a worker thread
+        self.report_progress = ttk.Progressbar(control_frame, length=150, mode='determinate')
+        self.report_progress.pack(pady=2)
+        self.report_status = tk.StringVar()
+        tk.Label(control_frame, textvariable=self.report_status, wraplength=150).pack()
+
         # Visualization
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         vis_frame = tk.Frame(self)
         vis_frame.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
 
@@ -345,7 +416,20 @@ class BloodSpatterApp(tk.Tk):
 
         self.fig_2d, self.ax_2d = plt.subplots(figsize=(8, 4))
         self.canvas_2d = FigureCanvasTkAgg(self.fig_2d, master=vis_frame)
+        self.canvas_2d.mpl_connect('button_press_event', self.on_click_2d)
         self.canvas_2d.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.timing.wrap_draw(self.canvas_3d)
+        self.timing.wrap_draw(self.canvas_2d)
+        self.timing.attach_overlay(self.canvas_2d)
+
+        self.last_stains = None
+        self.last_droplets = None
+        self.last_run = None  # Parameters of the run shown, for the report
+        self.plot_images = {}  # Plots rasterized for reports; cleared whenever they are redrawn
+        self.report_queue = None
+        self.report_cancel = None
+        self.spatial_index = None  # Built on the first spatial query of each run
+        self.radius_marker = None
 
         self.refresh_weapons()
         self.surface_var.set("Smooth")
@@ -361,8 +445,15 @@ class BloodSpatterApp(tk.Tk):
         tab_control.add(stabbing_tab, text="Stabbing Simulation")
         tab_control.pack(expand=1, fill="both")
 
-        # Initialize stabbing simulation
-        self.stabbing_sim = StabbingSimulation(stabbing_tab)
+        # The 3D body scene is only built the first time its tab is shown
+        self.stabbing_tab = stabbing_tab
+        self.stabbing_sim = None
+        tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event):
+        notebook = event.widget
+        if self.stabbing_sim is None and notebook.nametowidget(notebook.select()) is self.stabbing_tab:
+            self.stabbing_sim = StabbingSimulation(self.stabbing_tab, self.timing)
 
     def refresh_weapons(self):
         self.db.load_weapons()
@@ -379,77 +470,306 @@ class BloodSpatterApp(tk.Tk):
         angle = self.angle_scale.get()
         surface = self.surface_var.get()
         weapon = self.weapon_var.get()
-        x, y, z = simulate_blood_spatter(velocity, angle, surface, weapon, self.db)
-        if not x:
+        try:
+            num_droplets = self.droplets_var.get()
+            if num_droplets <= 0:
+                raise ValueError("Droplet count must be positive")
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("Input Error", f"Invalid droplet count: {str(e)}")
             return
 
+        # A fresh seed per run, recorded so the run can be reproduced exactly
+        seed = np.random.SeedSequence().entropy
+        model = self.model_var.get()
+        if model == "Ballistic":
+            with self.timing.span("step"):
+                stains = simulate_ballistic_spatter(velocity, angle, surface, weapon, self.db,
+                                                    self.plane_var.get().lower(), num_droplets, rng=seed,
+                                                    on_error=messagebox.showerror)
+            if stains is None or len(stains) == 0:
+                return
+            x, y, z = stains.x, stains.y, stains.z
+        else:
+            stains = None
+            with self.timing.span("step"):
+                x, y, z = simulate_blood_spatter(velocity, angle, surface, weapon, self.db, num_droplets,
+                                                 rng=seed, on_error=messagebox.showerror)
+            if len(x) == 0:
+                return
+
+        params = {"weapon": weapon, "surface": surface, "velocity": velocity, "angle": angle,
+                  "requested": num_droplets, "model": model, "seed": seed}
+        if self.archive_var.get():
+            try:
+                self.get_archive().save(params, x, y, z, stains)
+            except OSError as e:
+                messagebox.showerror("Archive Error", f"Failed to archive run: {str(e)}")
+        self.show_run(params, x, y, z, stains)
+
+    def get_archive(self):
+        if self.archive is None:
+            from spatter_archive import RunArchive
+            self.archive = RunArchive()
+        return self.archive
+
+    def browse_runs(self):
+        RunBrowser(self, self.get_archive())
+
+    def load_archived_run(self, run_id):
+        try:
+            run = self.get_archive().load(run_id)
+            stains = run.stains()
+            x, y, z = run.droplets()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Archive Error", f"Failed to load run: {str(e)}")
+            return
+        self.show_run(run.params, x, y, z, stains)
+
+    def show_run(self, params, x, y, z, stains=None):
+        """Make a run (fresh or archived) the current one and plot it."""
+        self.last_stains = stains
+        self.last_droplets = (x, y, z)
+        self.last_run = {"Weapon": params["weapon"], "Surface": params["surface"],
+                         "Velocity": f"{params['velocity']} m/s", "Angle": f"{params['angle']}°",
+                         "Droplets": f"{params['requested']:,}", "Model": params["model"], "Seed": params["seed"]}
+        if stains is not None:
+            self.last_run["Target plane"] = stains.plane.capitalize()
+            if stains.airborne:
+                self.last_run["Never landed"] = f"{stains.airborne:,}"
+        self.plot_images = {}
+        self.spatial_index = None
+
+        render = self.render_var.get()
+        dense = render == "Density" or (render == "Auto" and len(x) > POINT_LIMIT)
+
         # Update 3D plot
-        self.ax_3d.clear()
-        self.ax_3d.scatter(x, y, z, c='r', marker='.', alpha=0.6)
-        self.ax_3d.set_xlabel("X Distance (m)")
-        self.ax_3d.set_ylabel("Y Distance (m)")
-        self.ax_3d.set_zlabel("Z Deviation (m)")
+        with self.timing.span("artists"):
+            self.ax_3d.clear()
+            if dense:
+                # One marker per occupied voxel, sized and shaded by how many droplets it holds
+                vx, vy, vz, counts = voxel_decimate(x, y, z, POINT_LIMIT)
+                weight = np.log1p(counts)
+                self.ax_3d.scatter(vx, vy, vz, c=weight, cmap='Reds', s=2 + 8 * weight / weight.max(), marker='.',
+                                   alpha=0.6)
+            else:
+                self.ax_3d.scatter(x, y, z, c='r', marker='.', alpha=0.6)
+            self.ax_3d.set_xlabel("X Distance (m)")
+            self.ax_3d.set_ylabel("Y Distance (m)")
+            self.ax_3d.set_zlabel("Z Deviation (m)")
         self.canvas_3d.draw()
 
         # Update 2D plot
-        self.ax_2d.clear()
-        self.ax_2d.scatter(x, y, c='r', marker='.', alpha=0.6)
-        self.ax_2d.set_xlabel("X Distance (m)")
-        self.ax_2d.set_ylabel("Y Distance (m)")
+        with self.timing.span("artists"):
+            self.ax_2d.clear()
+            if dense:
+                stains = self.last_stains
+                u, v = (stains.u, stains.v) if stains is not None else (x, y)
+                self.draw_density(u, v)
+                self.label_plane(stains.plane if stains is not None else "floor")
+            elif self.last_stains is not None:
+                self.draw_stains(self.last_stains)
+            else:
+                self.ax_2d.scatter(x, y, c='r', marker='.', alpha=0.6)
+                self.label_plane("floor")
+            self.timing.update_overlay(interval=0)
+        self.canvas_2d.draw()
+
+    def analysis_points(self):
+        """Points of the pattern shown in the 2D view and their unit, or None before any run."""
+        if self.last_stains is not None:
+            unit = "px" if self.last_stains.plane == "image" else "m"
+            return np.column_stack([self.last_stains.u, self.last_stains.v]), unit
+        if self.last_droplets is not None:
+            return np.column_stack(self.last_droplets[:2]), "m"
+        return None, None
+
+    def get_spatial_index(self):
+        if self.spatial_index is None:
+            points, _ = self.analysis_points()
+            if points is None or not len(points):
+                return None
+            from spatter_index import GridIndex
+            self.spatial_index = GridIndex(points)
+        return self.spatial_index
+
+    def on_click_2d(self, event):
+        if event.inaxes is not self.ax_2d or event.button != 1:
+            return
+        index = self.get_spatial_index()
+        if index is None:
+            return
+        try:
+            radius = self.radius_var.get()
+            if radius <= 0:
+                raise ValueError("Radius must be positive")
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("Input Error", f"Invalid radius: {str(e)}")
+            return
+        from matplotlib.patches import Circle
+        _, unit = self.analysis_points()
+        count = len(index.query_radius((event.xdata, event.ydata), radius))
+        if self.radius_marker is not None and self.radius_marker.axes is self.ax_2d:
+            self.radius_marker.remove()
+        self.radius_marker = self.ax_2d.add_patch(Circle((event.xdata, event.ydata), radius, fill=False,
+                                                         color='black', linestyle='--'))
+        self.ax_2d.set_title(f"{count:,} within {radius:g} {unit} of ({event.xdata:.2f}, {event.ydata:.2f})")
+        self.canvas_2d.draw_idle()
+        self.plot_images.pop("2D view", None)
+
+    def cluster_analysis(self):
+        index = self.get_spatial_index()
+        if index is None:
+            messagebox.showinfo("Cluster Analysis", "Run a simulation or upload an image first")
+            return
+        points, unit = self.analysis_points()
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            # Neighbourhood of twice the typical spacing, so clusters are regions denser than usual
+            spacing, _ = index.nearest_neighbor()
+            spacing = spacing[np.isfinite(spacing)]
+            eps = 2 * float(np.median(spacing)) if len(spacing) else 1.0
+            labels = index.dbscan(eps, min_samples=5)
+        finally:
+            self.config(cursor="")
+        from spatter_index import cluster_summary
+        summary = cluster_summary(labels)
+
+        if len(points) <= POINT_LIMIT:
+            noise = labels < 0
+            self.ax_2d.scatter(points[noise, 0], points[noise, 1], c='lightgrey', marker='.')
+            self.ax_2d.scatter(points[~noise, 0], points[~noise, 1], c=labels[~noise] % 20, cmap='tab20',
+                               marker='.')
+        spacing_text = f"median {np.median(spacing):.4g} {unit}" if len(spacing) else "n/a"
+        largest = ", ".join(f"{size:,}" for size in summary["sizes"][:5])
+        self.ax_2d.set_title(f"{summary['clusters']:,} clusters, {summary['noise']:,} noise")
         self.canvas_2d.draw()
+        self.plot_images = {}
+        if self.last_run is not None:
+            self.last_run["Clusters"] = f"{summary['clusters']:,} (eps {eps:.3g} {unit})"
+            self.last_run["Droplet spacing"] = spacing_text
+        messagebox.showinfo("Cluster Analysis", f"Nearest-neighbour spacing: {spacing_text}\n"
+                                                f"Clusters (eps {eps:.3g} {unit}, 5 points): {summary['clusters']:,}\n"
+                                                f"Noise points: {summary['noise']:,}\n"
+                                                f"Largest clusters: {largest or 'none'}")
+
+    def draw_density(self, u, v):
+        """Draw droplet positions as a log-scaled density image, whose cost doesn't grow with the count."""
+        from matplotlib.colors import LogNorm
+        counts, extent = density_grid(u, v)
+        self.ax_2d.imshow(np.ma.masked_equal(counts, 0), origin='lower', extent=extent, cmap='Reds',
+                          norm=LogNorm(), interpolation='nearest', aspect='auto')
+
+    def draw_stains(self, stains):
+        """Draw stain ellipses in the target plane as a single collection."""
+        from matplotlib.collections import EllipseCollection
+        self.ax_2d.add_collection(EllipseCollection(
+            stains.length, stains.width, np.degrees(stains.orientation), units='xy',
+            offsets=np.column_stack([stains.u, stains.v]), offset_transform=self.ax_2d.transData,
+            facecolors='darkred', alpha=0.6))
+        self.ax_2d.autoscale_view()
+        self.ax_2d.set_aspect('equal', adjustable='datalim')
+        self.label_plane(stains.plane)
+
+    def label_plane(self, plane):
+        if plane == "image":
+            if not self.ax_2d.yaxis_inverted():
+                self.ax_2d.invert_yaxis()
+            self.ax_2d.set_xlabel("X (px)")
+            self.ax_2d.set_ylabel("Y (px)")
+        elif plane == "wall":
+            self.ax_2d.set_xlabel("Y Along Wall (m)")
+            self.ax_2d.set_ylabel("Z Height (m)")
+        else:
+            self.ax_2d.set_xlabel("X Distance (m)")
+            self.ax_2d.set_ylabel("Y Distance (m)")
 
     def upload_image(self):
         file_path = filedialog.askopenfilename()
         if file_path:
             try:
-                self.img = Image.open(file_path)
-                self.tk_img = ImageTk.PhotoImage(self.img)
-                # Implement image display logic here
+                self.config(cursor="watch")
+                self.update_idletasks()
+                from stain_detection import detect_stains, open_image, thumbnail
+                # Tiled across a process pool straight from a memory-mapped copy of the image
+                stains = detect_stains(file_path)
+                image, _ = open_image(file_path)
+                height, width = image.shape[:2]
+                preview = thumbnail(image)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load image: {str(e)}")
+                return
+            finally:
+                self.config(cursor="")
+
+            self.last_stains = stains
+            self.last_run = {"Image": file_path, "Size": f"{width} x {height} px"}
+            self.plot_images = {}
+            self.spatial_index = None
+            self.ax_2d.clear()
+            self.ax_2d.imshow(preview, extent=(0, width, height, 0))
+            self.draw_stains(stains)
+            self.ax_2d.set_title(f"{len(stains)} stains detected")
+            self.canvas_2d.draw()
 
     def generate_report(self):
-        pass
-
-def simulate_blood_spatter(velocity, angle_degrees, surface_type, weapon, db, num_droplets=100):
-    weapon_data = db.get_weapon(weapon)
-    if not weapon_data:
-        messagebox.showerror("Error", "Selected weapon not found in database")
-        return [], [], []
-
-    velocity *= weapon_data.velocity_mult
-    spread = weapon_data.spread_factor * {
-        "Smooth": 0.5,
-        "Rough": 2.0,
-        "Fabric": 1.2
-    }.get(surface_type, 1.0)
-
-    angle_radians = np.radians(angle_degrees)
-    gravity = 9.81
-    time_of_flight = (2 * velocity * np.sin(angle_radians)) / gravity
-    x, y, z = [], [], []
-
-    for _ in range(num_droplets):
-        t = np.random.uniform(0, time_of_flight)
-        xi = velocity * np.cos(angle_radians) * t
-        yi = velocity * np.sin(angle_radians) * t - 0.5 * gravity * t**2
-        zi = np.random.normal(0, 0.1)
-        xi += np.random.normal(0, spread)
-        yi += np.random.normal(0, spread)
-        x.append(xi)
-        y.append(yi)
-        z.append(zi)
-
-        if np.random.rand() < weapon_data.satellite_chance:
-            for _ in range(np.random.randint(1, 4)):
-                x_sat = xi + np.random.normal(0, spread / 3)
-                y_sat = yi + np.random.normal(0, spread / 3)
-                z_sat = zi + np.random.normal(0, 0.05)
-                x.append(x_sat)
-                y.append(y_sat)
-                z.append(z_sat)
-
-    return x, y, z
+        if self.report_queue is not None:
+            return  # One report at a time
+        if self.last_run is None:
+            messagebox.showinfo("Report", "Run a simulation or upload an image first")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
+        if not file_path:
+            return
+        from spatter_report import ReportData, droplet_columns, figure_png, report_worker, stain_columns
+
+        # Figures belong to the Tk thread: rasterize them here, once per run
+        figures = [("2D view", self.fig_2d)]
+        if self.last_stains is None or self.last_stains.plane != "image":
+            figures.insert(0, ("3D view", self.fig_3d))
+        for caption, figure in figures:
+            if caption not in self.plot_images:
+                self.plot_images[caption] = figure_png(figure)
+        if self.last_stains is not None:
+            columns, table_title = stain_columns(self.last_stains), "Stains"
+        else:
+            columns, table_title = droplet_columns(*self.last_droplets), "Droplets"
+        data = ReportData("Blood Spatter Analysis Report", dict(self.last_run),
+                          [(caption, self.plot_images[caption]) for caption, _ in figures], columns, table_title,
+                          max_rows=REPORT_MAX_ROWS)
+
+        self.report_queue = queue.Queue()
+        self.report_cancel = threading.Event()
+        threading.Thread(target=report_worker, args=(file_path, data, self.report_queue, self.report_cancel),
+                         daemon=True).start()
+        self.report_button.config(text="Cancel Report", command=self.report_cancel.set)
+        self.report_status.set("Writing report...")
+        self.after(100, self.poll_report)
+
+    def poll_report(self):
+        from spatter_report import ReportCancelled
+        while True:
+            try:
+                message = self.report_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress":
+                _, done, total = message
+                self.report_progress.config(maximum=total, value=done)
+                self.report_status.set(f"Page {done} of {total}")
+                continue
+            self.report_queue = None
+            self.report_button.config(text="Generate Report", command=self.generate_report)
+            self.report_progress.config(value=0)
+            if message[0] == "done":
+                self.report_status.set(f"Saved {message[1]}")
+            elif isinstance(message[1], ReportCancelled):
+                self.report_status.set("Report cancelled")
+            else:
+                self.report_status.set("")
+                messagebox.showerror("Report Error", f"Failed to write report: {str(message[1])}")
+            return
+        self.after(100, self.poll_report)
 
 if __name__ == "__main__":
     app = BloodSpatterApp()
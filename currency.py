@@ -1,11 +1,17 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import random
 import time
 import threading
 from queue import Queue
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import currency_feed
+import currency_analytics
+import currency_pyramid
+import frame_timing
+
+SOURCES = ["Random walk", "Replay file", "Local feed"]
 
 class CurrencySimulator:
     def __init__(self, root):
@@ -13,6 +19,8 @@ class CurrencySimulator:
         self.root.title("INR/RUB Exchange Rate Simulator")
         self.running = False
         self.queue = Queue()
+        self.stop_event = None
+        self.producer = None
         self.current_rate1 = 0.0  # INR
         self.current_rate2 = 0.0  # RUB
         self.rate_history1 = []
@@ -20,6 +28,26 @@ class CurrencySimulator:
         self.time_history = []
         self.start_time = None
         self.data_points_count = 12  # Number of data points to show
+        self.tick_rate = 1.0  # Simulation ticks per second
+        self.max_fps = 30  # Redraw cap, independent of the tick rate
+        self.replay_path = None
+
+        # Streaming analytics (windows count ticks, candle intervals are seconds)
+        self.ema_spans = (20,)
+        self.analytics_windows = (20, 100)
+        self.candle_intervals = (1, 10, 60)
+        self.analytics = None
+        self.indicator_history = {}
+        self.background = None
+
+        # Zoomable history: min/max/mean pyramid over every tick of the run
+        self.pyramid = currency_pyramid.HistoryPyramid()
+        self.history_view = False  # True once the user zooms or pans away from the live window
+        self.history_dirty = False
+        self.pan_start = None
+
+        # Frame timing overlay and trace, off unless FRAME_TIMING is set (see frame_timing.py)
+        self.timing = frame_timing.FrameTimer.from_env()
 
         # --- Input Frame ---
         self.input_frame = ttk.Frame(root)
@@ -41,6 +69,37 @@ class CurrencySimulator:
         self.initial_price2_entry.grid(row=0, column=3, padx=5)
         self.initial_price2_var.set("71.1012")  # Set default value
 
+        # Tick rate (ticks per second)
+        self.tick_rate_label = ttk.Label(self.input_frame, text="Ticks/s:")
+        self.tick_rate_label.grid(row=0, column=4, padx=5)
+        self.tick_rate_var = tk.StringVar()
+        self.tick_rate_entry = ttk.Entry(self.input_frame, textvariable=self.tick_rate_var, width=6)
+        self.tick_rate_entry.grid(row=0, column=5, padx=5)
+        self.tick_rate_var.set("1")  # Set default value
+
+        # Tick source: random walk, recorded file or local feed
+        self.source_label = ttk.Label(self.input_frame, text="Source:")
+        self.source_label.grid(row=1, column=0, padx=5, pady=5)
+        self.source_var = tk.StringVar(value=SOURCES[0])
+        self.source_dropdown = ttk.Combobox(self.input_frame, textvariable=self.source_var, values=SOURCES,
+                                            state="readonly", width=12)
+        self.source_dropdown.grid(row=1, column=1, padx=5, pady=5)
+
+        self.open_file_button = ttk.Button(self.input_frame, text="Open file...", command=self.choose_replay_file)
+        self.open_file_button.grid(row=1, column=2, padx=5, pady=5)
+
+        self.speed_label = ttk.Label(self.input_frame, text="Speed x:")
+        self.speed_label.grid(row=1, column=3, padx=5, pady=5)
+        self.speed_var = tk.StringVar()
+        self.speed_entry = ttk.Entry(self.input_frame, textvariable=self.speed_var, width=6)
+        self.speed_entry.grid(row=1, column=4, padx=5, pady=5)
+        self.speed_var.set("1")  # 0 replays as fast as possible
+
+        self.feed_var = tk.StringVar()
+        self.feed_entry = ttk.Entry(self.input_frame, textvariable=self.feed_var, width=16)
+        self.feed_entry.grid(row=1, column=5, padx=5, pady=5)
+        self.feed_var.set(f"{currency_feed.DEFAULT_HOST}:{currency_feed.DEFAULT_PORT}")
+
         # --- Control Buttons ---
         self.button_frame = ttk.Frame(root)
         self.button_frame.pack(pady=10)
@@ -48,6 +107,18 @@ class CurrencySimulator:
         self.start_stop_button = ttk.Button(self.button_frame, text="Start/Stop", command=self.toggle_simulation)
         self.start_stop_button.pack(side=tk.LEFT, padx=5)
 
+        self.show_analytics_var = tk.BooleanVar(value=False)
+        self.show_analytics_check = ttk.Checkbutton(self.button_frame, text="Show EMA/mean/min-max",
+                                                    variable=self.show_analytics_var)
+        self.show_analytics_check.pack(side=tk.LEFT, padx=5)
+
+        self.export_button = ttk.Button(self.button_frame, text="Export...", command=self.export_ticks)
+        self.export_button.pack(side=tk.LEFT, padx=5)
+
+        # Scroll to zoom and drag to pan through the history; this returns to the live window
+        self.live_button = ttk.Button(self.button_frame, text="Live", command=self.follow_live)
+        self.live_button.pack(side=tk.LEFT, padx=5)
+
         # --- Graph Area ---
         self.graph_frame = ttk.LabelFrame(root, text="Exchange Rate Trend")
         self.graph_frame.pack(pady=10, fill=tk.BOTH, expand=True, padx=10)
@@ -55,6 +126,8 @@ class CurrencySimulator:
         self.fig, self.ax = plt.subplots(figsize=(8, 4))
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.timing.wrap_draw(self.canvas)
+        self.timing.attach_overlay(self.canvas)
 
         # Grid for the graph
         self.ax.grid(True)
@@ -63,6 +136,8 @@ class CurrencySimulator:
         self.inr_label = "INR"
         self.rub_label = "RUB"
 
+        self.init_graph()
+
         # --- Error Label ---
         self.error_label = ttk.Label(root, text="", foreground="red")
         self.error_label.pack()
@@ -77,15 +152,57 @@ class CurrencySimulator:
 
             initial_price1 = float(initial_price1_str)
             initial_price2 = float(initial_price2_str)
+            tick_rate = float(self.tick_rate_var.get().replace(",", "."))
 
             if initial_price1 <= 0 or initial_price2 <= 0:
                 raise ValueError("Initial prices must be positive")
+            if tick_rate <= 0:
+                raise ValueError("Tick rate must be positive")
+
+            source = self.source_var.get()
+            if source == "Replay file":
+                if not self.replay_path:
+                    raise ValueError("Choose a tick file to replay")
+                if float(self.speed_var.get().replace(",", ".")) < 0:
+                    raise ValueError("Replay speed must not be negative")
+            elif source == "Local feed":
+                self.parse_feed_address()
 
             return True
         except ValueError as e:
             self.error_label.config(text=str(e) if str(e) else "Invalid input value")
             return False
 
+    def parse_feed_address(self):
+        host, _, port = self.feed_var.get().strip().rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError("Feed address must look like host:port")
+        return host, int(port)
+
+    def choose_replay_file(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Tick files", "*.csv *.npy"), ("All files", "*.*")])
+        if file_path:
+            self.replay_path = file_path
+            self.source_var.set("Replay file")
+
+    def export_ticks(self):
+        """Save the tick log with its indicator columns, plus one OHLC candle file per interval."""
+        if not self.time_history:
+            self.error_label.config(text="Nothing to export yet")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+        try:
+            pairs = (self.inr_label, self.rub_label)
+            currency_analytics.write_tick_log(file_path, pairs, self.time_history,
+                                              [self.rate_history1, self.rate_history2], self.indicator_history)
+            self.analytics.export_candles(file_path.rsplit(".", 1)[0])
+            self.error_label.config(text="")
+        except OSError as e:
+            self.error_label.config(text=f"Export failed: {str(e)}")
+
     def toggle_simulation(self):
         if self.running:
             self.stop_simulation()
@@ -99,12 +216,27 @@ class CurrencySimulator:
             initial_price2_str = self.initial_price2_var.get().replace(",", ".")
 
             self.running = True
+            self.tick_rate = float(self.tick_rate_var.get().replace(",", "."))
             self.current_rate1 = float(initial_price1_str)
             self.current_rate2 = float(initial_price2_str)
-            self.rate_history1 = [self.current_rate1]
-            self.rate_history2 = [self.current_rate2]
+            if self.source_var.get() == "Random walk":
+                self.rate_history1 = [self.current_rate1]
+                self.rate_history2 = [self.current_rate2]
+                self.time_history = [0]
+            else:
+                # Recorded and live sources supply their own first tick
+                self.rate_history1 = []
+                self.rate_history2 = []
+                self.time_history = []
             self.start_time = time.time()
-            self.time_history = [0]
+            self.analytics = currency_analytics.StreamAnalytics(
+                (self.inr_label, self.rub_label), self.ema_spans, self.analytics_windows, self.candle_intervals)
+            # Seed with the initial tick so indicator columns line up with the rate history
+            self.indicator_history = self.analytics.update_batch(
+                self.time_history, self.rate_history1, self.rate_history2)
+            self.pyramid = currency_pyramid.HistoryPyramid()
+            self.pyramid.append(self.time_history, self.rate_history1, self.rate_history2)
+            self.follow_live()
 
             self.start_stop_button.config(text="Stop")  # Change button text
             self.error_label.config(text="")  # Clear any previous errors
@@ -115,37 +247,242 @@ class CurrencySimulator:
 
     def stop_simulation(self):
         self.running = False
+        if self.stop_event is not None:
+            self.stop_event.set()
         self.start_stop_button.config(text="Start")  # Change button text back
         print("Simulation stopped.")
 
     def simulate_exchange_rate(self):
-        def simulate():
-            if not self.running:
-                print("Simulation thread exiting...")
-                return
+        # Each run gets its own queue and stop flag so a lingering producer can't feed the next run
+        self.queue = Queue()
+        self.stop_event = threading.Event()
+        sink = currency_analytics.AnalyticsStage(self.analytics, self.queue)  # Indicators run on the producer thread
+        source = self.source_var.get()
+        if source == "Replay file":
+            target = self.replay_ticks
+            args = (sink, self.stop_event, self.replay_path, float(self.speed_var.get().replace(",", ".")))
+        elif source == "Local feed":
+            target = self.receive_ticks
+            args = (sink, self.stop_event) + self.parse_feed_address()
+        else:
+            target = self.produce_ticks
+            args = (sink, self.stop_event, self.current_rate1, self.current_rate2, self.tick_rate)
+        self.producer = threading.Thread(target=target, args=args, daemon=True)
+        self.producer.start()
 
-            try:
-                # Simulate rate changes with small random fluctuations
-                self.current_rate1 *= random.uniform(0.995, 1.005)
-                self.current_rate2 *= random.uniform(0.995, 1.005)
+    def replay_ticks(self, queue, stop_event, path, speed):
+        """Load a recorded tick file on the producer thread and replay it at ``speed``x."""
+        try:
+            times, rates = currency_feed.load_ticks(path)
+            currency_feed.TickReplayer(times, rates, speed=speed).run(queue, stop_event)
+        except Exception as e:
+            print(f"Error in replay thread: {e}")
+            queue.put(e)  # Reported by update_gui on the Tk thread
+
+    def receive_ticks(self, queue, stop_event, host, port):
+        """Forward ticks from a local feed (see currency_feed.py serve) until stopped."""
+        try:
+            currency_feed.FeedClient(host, port).run(queue, stop_event)
+        except Exception as e:
+            print(f"Error in feed thread: {e}")
+            queue.put(e)  # Reported by update_gui on the Tk thread
+
+    def produce_ticks(self, queue, stop_event, rate1, rate2, tick_rate):
+        """Generate ticks off the Tk thread and hand them over in batches.
+
+        Tick k is stamped k / tick_rate seconds after the start; every wake-up
+        emits all ticks that have come due since the previous one, so the
+        throughput doesn't depend on how precisely the thread is scheduled.
+        """
+        batch_interval = max(1.0 / tick_rate, 0.005)  # Don't wake up more than 200 times a second
+        produced = 1  # Tick 0 is the initial price
+        start = time.perf_counter()
+        try:
+            while not stop_event.is_set():
+                due = int((time.perf_counter() - start) * tick_rate) + 1
+                times, rates1, rates2 = [], [], []
+                for k in range(produced, due):
+                    # Simulate rate changes with small random fluctuations
+                    rate1 *= random.uniform(0.995, 1.005)
+                    rate2 *= random.uniform(0.995, 1.005)
+                    times.append(k / tick_rate)
+                    rates1.append(rate1)
+                    rates2.append(rate2)
+                if times:
+                    queue.put((times, rates1, rates2))
+                    produced = due
+                stop_event.wait(batch_interval)
+        except Exception as e:
+            print(f"Error in simulation thread: {e}")
+            queue.put(e)  # Reported by update_gui on the Tk thread
+        print("Simulation thread exiting...")
+
+    def drain_queue(self):
+        """Move every pending batch into the history; returns True if anything arrived."""
+        received = False
+        # Only take what is queued now, so a fast producer can't keep the frame from finishing
+        for _ in range(self.queue.qsize()):
+            item = self.queue.get_nowait()
+            if isinstance(item, Exception):
+                self.error_label.config(text=f"Simulation error: {str(item)}")
+                self.stop_simulation()  # Stop on error
+                return received
+            times, rates1, rates2, indicators = item
+            self.time_history.extend(times)
+            self.rate_history1.extend(rates1)
+            self.rate_history2.extend(rates2)
+            self.pyramid.append(times, rates1, rates2)
+            for name, per_pair in indicators.items():
+                for history, values in zip(self.indicator_history[name], per_pair):
+                    history.extend(values)
+            received = True
+        if received:
+            self.current_rate1 = self.rate_history1[-1]
+            self.current_rate2 = self.rate_history2[-1]
+        return received
+
+    def init_graph(self):
+        """Create the line and label artists once; ticks only move them."""
+        self.ax.set_xlabel('Time (seconds)')
+        self.ax.set_ylabel('Exchange Rate')
+        self.ax.set_title('INR/RUB Exchange Rate Over Time')
 
-                current_time = time.time() - self.start_time
-                self.rate_history1.append(self.current_rate1)
-                self.rate_history2.append(self.current_rate2)
-                self.time_history.append(current_time)
+        # Animated artists are skipped by canvas.draw() and blitted on top of the cached background
+        self.line1, = self.ax.plot([], [], 'g-', label=self.inr_label, animated=True)
+        self.line2, = self.ax.plot([], [], 'r-', label=self.rub_label, animated=True)
+        self.point_labels1 = [
+            self.ax.text(0, 0, '', color='green', fontsize=8, ha='center', va='bottom', animated=True)
+            for _ in range(self.data_points_count)
+        ]
+        self.point_labels2 = [
+            self.ax.text(0, 0, '', color='red', fontsize=8, ha='center', va='bottom', animated=True)
+            for _ in range(self.data_points_count)
+        ]
+        # Indicator overlays: EMA, rolling mean and the rolling min/max band of the shortest window
+        window = self.analytics_windows[0]
+        self.overlay_columns = [f"ema{self.ema_spans[0]}", f"mean{window}", f"min{window}", f"max{window}"]
+        styles = ['--', ':', '-.', '-.']
+        self.overlay_lines = [
+            [self.ax.plot([], [], color=color, linestyle=style, linewidth=1, alpha=0.7, animated=True)[0]
+             for style in styles]
+            for color in ('green', 'red')
+        ]
+        self.animated_artists = [self.line1, self.line2] + self.point_labels1 + self.point_labels2
+        self.animated_artists += self.overlay_lines[0] + self.overlay_lines[1]
+        # Min/max envelope of each pyramid bucket, only shown in the history view
+        self.envelope_lines = [
+            [self.ax.plot([], [], color=color, linewidth=0.5, alpha=0.5, animated=True, visible=False)[0]
+             for _ in range(2)]
+            for color in ('green', 'red')
+        ]
+        self.animated_artists += self.envelope_lines[0] + self.envelope_lines[1]
+        self.ax.legend()
 
-                self.update_graph()
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
 
-            except Exception as e:
-                print(f"Error in simulation thread: {e}")
-                self.error_label.config(text=f"Simulation error: {str(e)}")
-                self.stop_simulation() # Stop on error
+    def on_draw(self, event):
+        # A full draw (resize, rescale) invalidates the cached background
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_animated()
 
-            self.root.after(1000, simulate)  # Schedule next update in 1 second
-        simulate()  # Start the simulation loop
+    def draw_animated(self):
+        for artist in self.animated_artists:
+            self.ax.draw_artist(artist)
+
+    def on_scroll(self, event):
+        if event.inaxes is not self.ax or not len(self.pyramid):
+            return
+        factor = 1 / 1.25 if event.button == 'up' else 1.25
+        x_min, x_max = self.ax.get_xlim()
+        # Zoom around the cursor
+        self.set_history_view(event.xdata - (event.xdata - x_min) * factor,
+                              event.xdata + (x_max - event.xdata) * factor)
+
+    def on_press(self, event):
+        if event.inaxes is self.ax and event.button == 1 and len(self.pyramid):
+            self.pan_start = (event.x, self.ax.get_xlim())
+
+    def on_motion(self, event):
+        if self.pan_start is None:
+            return
+        start_x, (x_min, x_max) = self.pan_start
+        shift = (event.x - start_x) * (x_max - x_min) / self.ax.bbox.width
+        self.set_history_view(x_min - shift, x_max - shift)
+
+    def on_release(self, event):
+        self.pan_start = None
+
+    def set_history_view(self, x_min, x_max):
+        first, last = self.pyramid.time_range()
+        span = min(x_max - x_min, max(last - first, 1e-6) * 1.1)
+        # Keep the view over recorded ticks
+        x_min = min(max(x_min, first - 0.05 * span), last - 0.5 * span)
+        self.ax.set_xlim([x_min, x_min + span])
+        self.history_view = True
+        self.history_dirty = True  # Drawn by update_gui, so fast wheel/drag events collapse into one frame
+
+    def draw_history(self):
+        """Fetch the visible range from the pyramid at about one entry per pixel and redraw."""
+        x_min, x_max = self.ax.get_xlim()
+        times, mean, lo, hi = self.pyramid.query(x_min, x_max, max(int(self.ax.bbox.width), 1))
+        self.line1.set_data(times, mean[:, 0])
+        self.line2.set_data(times, mean[:, 1])
+        for p, (min_line, max_line) in enumerate(self.envelope_lines):
+            min_line.set_data(times, lo[:, p])
+            max_line.set_data(times, hi[:, p])
+            min_line.set_visible(True)
+            max_line.set_visible(True)
+        for artist in self.point_labels1 + self.point_labels2 + self.overlay_lines[0] + self.overlay_lines[1]:
+            artist.set_visible(False)
+
+        if len(times):
+            min_y, max_y = lo.min(), hi.max()
+            y_range = max(max_y - min_y, 0.001 * max_y)
+            self.ax.set_ylim([min_y - 0.05 * y_range, max_y + 0.05 * y_range])
+        self.canvas.draw()
+        self.history_dirty = False
+
+    def follow_live(self):
+        self.history_view = False
+        self.history_dirty = False
+        for line in self.envelope_lines[0] + self.envelope_lines[1]:
+            line.set_visible(False)
+        self.reset_graph_limits()
+        self.update_graph()
+
+    def reset_graph_limits(self):
+        self.ax.set_xlim([0, 1])
+        self.ax.set_ylim([0, 1])
+        self.background = None
+
+    def rescale_if_needed(self, time_data, rate_data1, rate_data2):
+        """Widen the view only when the data leaves it, so most frames can be blitted."""
+        changed = False
+
+        x_min, x_max = self.ax.get_xlim()
+        if time_data[-1] > x_max or time_data[0] < x_min:
+            # Leave room for as many ticks again before the next page turn
+            span = max(time_data[-1] - time_data[0], 1.0 / self.tick_rate)
+            self.ax.set_xlim([time_data[0], time_data[0] + 2 * span])
+            changed = True
+
+        max_y = max(max(rate_data1), max(rate_data2))
+        min_y = min(min(rate_data1), min(rate_data2))
+        y_min, y_max = self.ax.get_ylim()
+        if min_y < y_min or max_y > y_max:
+            # Pad generously (and make room for the value labels) so small moves stay inside
+            y_range = max(max_y - min_y, 0.001 * max_y)
+            self.ax.set_ylim([min_y - 0.25 * y_range, max_y + 0.25 * y_range])
+            changed = True
+
+        return changed
 
     def update_graph(self):
-        if not self.running:
+        if not self.time_history or self.history_view:
             return
 
         # Limit number of points displayed
@@ -154,41 +491,48 @@ class CurrencySimulator:
         rate_data1 = self.rate_history1[-num_points:]
         rate_data2 = self.rate_history2[-num_points:]
 
-        # Clear the axes and plot the new data
-        self.ax.clear()
-        self.ax.grid(True)
-
-        # Plot data
-        self.ax.plot(time_data, rate_data1, 'g-', label=self.inr_label)
-        self.ax.plot(time_data, rate_data2, 'r-', label=self.rub_label)
-
-        # Set the range for labels to not overlap with the lines
-        max_y = max(max(rate_data1), max(rate_data2))
-        min_y = min(min(rate_data1), min(rate_data2))
-        y_range = max_y - min_y
-        self.ax.set_ylim([min_y - 0.05 * y_range, max_y + 0.05 * y_range])
-
-        # Add data point values to graph
-        for i in range(len(time_data)):
-            # Adding rate1 data
-            self.ax.text(time_data[i], rate_data1[i], f'{rate_data1[i]:.4f}', color='green', fontsize=8, ha='center', va='bottom')
-            # Adding rate2 data
-            self.ax.text(time_data[i], rate_data2[i], f'{rate_data2[i]:.4f}', color='red', fontsize=8, ha='center', va='bottom')
-
-        # Set the limit of x axis to 10 points, so not to overlap the graph
-        max_x = max(time_data)
-        self.ax.set_xlim([0, max_x if max_x <10 else 10])
-
-        # Add the label and title
-        self.ax.set_xlabel('Time (seconds)')
-        self.ax.set_ylabel('Exchange Rate')
-        self.ax.set_title('INR/RUB Exchange Rate Over Time')
-
-        self.ax.legend()
-        self.canvas.draw()  # Redraw
+        with self.timing.span("artists"):
+            # Update the existing artists in place
+            self.line1.set_data(time_data, rate_data1)
+            self.line2.set_data(time_data, rate_data2)
+            for i in range(self.data_points_count):
+                visible = i < num_points
+                self.point_labels1[i].set_visible(visible)
+                self.point_labels2[i].set_visible(visible)
+                if visible:
+                    self.point_labels1[i].set_position((time_data[i], rate_data1[i]))
+                    self.point_labels1[i].set_text(f'{rate_data1[i]:.4f}')
+                    self.point_labels2[i].set_position((time_data[i], rate_data2[i]))
+                    self.point_labels2[i].set_text(f'{rate_data2[i]:.4f}')
+
+            show_analytics = self.show_analytics_var.get()
+            for p, lines in enumerate(self.overlay_lines):
+                for name, line in zip(self.overlay_columns, lines):
+                    line.set_visible(show_analytics)
+                    if show_analytics:
+                        line.set_data(time_data, self.indicator_history[name][p][-num_points:])
+            self.timing.update_overlay()
+            full_draw = self.rescale_if_needed(time_data, rate_data1, rate_data2) or self.background is None
+
+        if full_draw:
+            self.canvas.draw()  # Axis ticks changed; on_draw re-captures the background
+        else:
+            with self.timing.span("draw"):
+                self.canvas.restore_region(self.background)
+                self.draw_animated()
+                self.canvas.blit(self.ax.bbox)
 
     def update_gui(self):
-        self.root.after(100, self.update_gui)
+        # Drain everything the producer queued since the last frame, then draw once
+        if self.running:
+            with self.timing.frame():
+                with self.timing.span("step"):
+                    received = self.drain_queue()
+                if received:
+                    self.update_graph()
+        if self.history_dirty:
+            self.draw_history()
+        self.root.after(max(1, int(1000 / self.max_fps)), self.update_gui)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,330 @@
+"""Incremental analytics for the exchange-rate tick stream.
+
+Every indicator keeps just enough state to fold in one tick in O(1)
+(amortized for the min/max deques), so nothing ever re-scans the history:
+
+  * EMA            exponential moving average
+  * RollingStats   mean / standard deviation over the last N values
+  * RollingMinMax  extremes over the last N values via monotonic deques
+  * CandleBuilder  OHLC candles over fixed time intervals
+
+StreamAnalytics bundles them per pair, and AnalyticsStage plugs them between
+a tick producer and CurrencySimulator's queue.
+"""
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class EMA:
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def update_batch(self, xs):
+        if not xs:
+            return []
+        alpha = self.alpha
+        value = xs[0] if self.value is None else self.value
+        out = []
+        append = out.append
+        for x in xs:
+            value += alpha * (x - value)
+            append(value)
+        self.value = value
+        return out
+
+
+class RollingStats:
+    """Mean and standard deviation over a sliding window of ``window`` values."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.shift = None  # Sums are taken relative to the first value to avoid cancellation
+
+    def update(self, x):
+        if self.shift is None:
+            self.shift = x
+        d = x - self.shift
+        self.values.append(d)
+        self.total += d
+        self.total_sq += d * d
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        return self.mean
+
+    def update_batch(self, xs):
+        """Returns ``(means, stds)`` after each value; same result as calling update per value."""
+        if not xs:
+            return [], []
+        if self.shift is None:
+            self.shift = xs[0]
+        shift, window, values = self.shift, self.window, self.values
+        total, total_sq = self.total, self.total_sq
+        means, stds = [], []
+        sqrt = math.sqrt
+        for x in xs:
+            d = x - shift
+            values.append(d)
+            total += d
+            total_sq += d * d
+            n = len(values)
+            if n > window:
+                old = values.popleft()
+                total -= old
+                total_sq -= old * old
+                n = window
+            means.append(shift + total / n)
+            stds.append(sqrt(max(total_sq - total * total / n, 0.0) / (n - 1)) if n > 1 else 0.0)
+        self.total, self.total_sq = total, total_sq
+        return means, stds
+
+    @property
+    def mean(self):
+        if not self.values:
+            return math.nan
+        return self.shift + self.total / len(self.values)
+
+    @property
+    def std(self):
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(self.total_sq - self.total * self.total / n, 0.0) / (n - 1))
+
+
+class RollingMinMax:
+    """Minimum and maximum over the last ``window`` values."""
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.min_deque = deque()  # (index, value), values increasing
+        self.max_deque = deque()  # (index, value), values decreasing
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        while self.min_deque and self.min_deque[-1][1] >= x:
+            self.min_deque.pop()
+        self.min_deque.append((i, x))
+        while self.max_deque and self.max_deque[-1][1] <= x:
+            self.max_deque.pop()
+        self.max_deque.append((i, x))
+        # Drop whatever slid out of the window
+        if self.min_deque[0][0] <= i - self.window:
+            self.min_deque.popleft()
+        if self.max_deque[0][0] <= i - self.window:
+            self.max_deque.popleft()
+        return self.min_deque[0][1], self.max_deque[0][1]
+
+    def update_batch(self, xs):
+        """Returns ``(mins, maxs)`` after each value."""
+        min_deque, max_deque = self.min_deque, self.max_deque
+        window = self.window
+        mins, maxs = [], []
+        i = self.count
+        for x in xs:
+            while min_deque and min_deque[-1][1] >= x:
+                min_deque.pop()
+            min_deque.append((i, x))
+            while max_deque and max_deque[-1][1] <= x:
+                max_deque.pop()
+            max_deque.append((i, x))
+            if min_deque[0][0] <= i - window:
+                min_deque.popleft()
+            if max_deque[0][0] <= i - window:
+                max_deque.popleft()
+            mins.append(min_deque[0][1])
+            maxs.append(max_deque[0][1])
+            i += 1
+        self.count = i
+        return mins, maxs
+
+
+class CandleBuilder:
+    """Aggregates ticks into OHLC candles of ``interval`` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.candles = []  # Completed (start, open, high, low, close, ticks)
+        self.current = None
+
+    def update(self, t, x):
+        start = math.floor(t / self.interval) * self.interval
+        if self.current is not None and start == self.current[0]:
+            c = self.current
+            c[2] = max(c[2], x)
+            c[3] = min(c[3], x)
+            c[4] = x
+            c[5] += 1
+            return
+        if self.current is not None:
+            self.candles.append(tuple(self.current))
+        self.current = [start, x, x, x, x, 1]
+
+    def update_batch(self, times, xs):
+        if not len(times):
+            return
+        # Bucket the whole batch at once and only touch Python per candle, not per tick
+        times = np.asarray(times, dtype=float)
+        xs = np.asarray(xs, dtype=float)
+        starts = np.floor(times / self.interval) * self.interval
+        bounds = np.flatnonzero(np.diff(starts)) + 1
+        firsts = np.concatenate(([0], bounds))
+        lasts = np.concatenate((bounds, [len(xs)])) - 1
+        highs = np.maximum.reduceat(xs, firsts)
+        lows = np.minimum.reduceat(xs, firsts)
+        for k in range(len(firsts)):
+            start, first, last = starts[firsts[k]], firsts[k], lasts[k]
+            if self.current is not None and start == self.current[0]:
+                c = self.current
+                c[2] = max(c[2], highs[k])
+                c[3] = min(c[3], lows[k])
+                c[4] = float(xs[last])
+                c[5] += int(last - first + 1)
+                continue
+            if self.current is not None:
+                self.candles.append(tuple(self.current))
+            self.current = [float(start), float(xs[first]), float(highs[k]), float(lows[k]), float(xs[last]),
+                            int(last - first + 1)]
+
+    def all_candles(self):
+        """Completed candles plus the one still forming."""
+        return self.candles + ([tuple(self.current)] if self.current is not None else [])
+
+
+class PairAnalytics:
+    def __init__(self, ema_spans, windows, candle_intervals):
+        self.emas = {span: EMA(span) for span in ema_spans}
+        self.stats = {w: RollingStats(w) for w in windows}
+        self.vols = {w: RollingStats(w) for w in windows}
+        self.extremes = {w: RollingMinMax(w) for w in windows}
+        self.candles = {interval: CandleBuilder(interval) for interval in candle_intervals}
+        self.last = None
+
+    def update(self, t, x):
+        """Fold in one tick; returns the indicator values in column order."""
+        row = [ema.update(x) for ema in self.emas.values()]
+        log_return = math.log(x / self.last) if self.last else 0.0
+        self.last = x
+        for w in self.stats:
+            row.append(self.stats[w].update(x))
+            self.vols[w].update(log_return)
+            row.append(self.vols[w].std)
+            row.extend(self.extremes[w].update(x))
+        for builder in self.candles.values():
+            builder.update(t, x)
+        return row
+
+    def update_batch(self, times, xs):
+        """Fold in a batch; returns one list per indicator column, in column order."""
+        columns = [ema.update_batch(xs) for ema in self.emas.values()]
+        if xs:
+            previous = [self.last] + xs[:-1] if self.last else [xs[0]] + xs[:-1]
+            log_returns = [math.log(x / p) for x, p in zip(xs, previous)]
+            self.last = xs[-1]
+        else:
+            log_returns = []
+        for w in self.stats:
+            means, _ = self.stats[w].update_batch(xs)
+            _, vols = self.vols[w].update_batch(log_returns)
+            columns += [means, vols, *self.extremes[w].update_batch(xs)]
+        for builder in self.candles.values():
+            builder.update_batch(times, xs)
+        return columns
+
+
+class StreamAnalytics:
+    """Per-pair indicators over the tick stream.
+
+    ``columns`` names the per-tick indicator values (``ema20``, ``mean100``,
+    ``vol100``, ``min100``, ``max100``, ...). Windows count ticks, candle
+    intervals are in seconds.
+
+    AnalyticsStage updates the indicators on the producer thread while the UI
+    reads candles, so updates and reads both go through ``lock``.
+    """
+
+    def __init__(self, pairs=("INR", "RUB"), ema_spans=(20,), windows=(20, 100), candle_intervals=(1, 10, 60)):
+        self.pairs = pairs
+        self.ema_spans = ema_spans
+        self.windows = windows
+        self.candle_intervals = candle_intervals
+        self.columns = [f"ema{span}" for span in ema_spans]
+        for w in windows:
+            self.columns += [f"mean{w}", f"vol{w}", f"min{w}", f"max{w}"]
+        self.analytics = {pair: PairAnalytics(ema_spans, windows, candle_intervals) for pair in pairs}
+        self.lock = threading.Lock()
+
+    def update_batch(self, times, *rates):
+        """Fold in a batch; returns ``{column: [values for pair 1, values for pair 2, ...]}``."""
+        with self.lock:
+            per_pair = [self.analytics[pair].update_batch(times, list(rates[p])) for p, pair in enumerate(self.pairs)]
+        return {name: [columns[c] for columns in per_pair] for c, name in enumerate(self.columns)}
+
+    def candles(self, pair, interval):
+        with self.lock:
+            return self.analytics[pair].candles[interval].all_candles()
+
+    def snapshot_candles(self):
+        """Copy of every pair's candles, ``{interval: {pair: candles}}``, all as of the same batch."""
+        with self.lock:
+            return {interval: {pair: self.analytics[pair].candles[interval].all_candles() for pair in self.pairs}
+                    for interval in self.candle_intervals}
+
+    def export_candles(self, path_prefix):
+        """Write one ``<prefix>_candles_<interval>s.csv`` per interval; returns the paths."""
+        # Snapshot first so the producer is only held up for the copy, not the file writes
+        snapshot = self.snapshot_candles()
+        paths = []
+        for interval in self.candle_intervals:
+            path = f"{path_prefix}_candles_{interval:g}s.csv"
+            with open(path, "w") as f:
+                f.write("pair,start,open,high,low,close,ticks\n")
+                for pair in self.pairs:
+                    for start, o, h, l, c, n in snapshot[interval][pair]:
+                        f.write(f"{pair},{start:.6f},{o:.6f},{h:.6f},{l:.6f},{c:.6f},{n}\n")
+            paths.append(path)
+        return paths
+
+
+class AnalyticsStage:
+    """Queue front that runs StreamAnalytics on each batch before passing it on.
+
+    Producers call ``put`` exactly as they would on the queue itself, so the
+    indicator work happens on the producer thread; the batch gains a fourth
+    element with the per-tick indicator columns.
+    """
+
+    def __init__(self, analytics, queue):
+        self.analytics = analytics
+        self.queue = queue
+
+    def put(self, item):
+        if not isinstance(item, Exception):
+            times, rates1, rates2 = item
+            item = (times, rates1, rates2, self.analytics.update_batch(times, rates1, rates2))
+        self.queue.put(item)
+
+
+def write_tick_log(path, pairs, times, rates, indicators=None):
+    """Write the tick history (plus indicator columns) as a wide CSV that currency_feed can replay."""
+    header = ["time"] + list(pairs)
+    columns = [times] + list(rates)
+    for name, per_pair in (indicators or {}).items():
+        for pair, values in zip(pairs, per_pair):
+            header.append(f"{pair}_{name}")
+            columns.append(values)
+    np.savetxt(path, np.column_stack(columns), delimiter=",", fmt="%.6f", header=",".join(header), comments="")
@@ -0,0 +1,382 @@
+"""Tick sources for currency.py: recorded tick files and a local TCP feed.
+
+Every source runs on a background thread and pushes the same batches the
+random-walk producer in currency.py does, a ``(times, rates1, rates2)`` tuple
+of equal-length lists, so CurrencySimulator can drain them unchanged.
+
+File formats:
+  * CSV, wide:  ``time,INR,RUB,...`` one row per timestamp
+  * CSV, long:  ``time,pair,rate``   one row per tick, pairs interleaved
+  * Binary:     ``.npy`` structured array with a ``time`` field and one
+                float field per pair, opened memory-mapped
+
+Run ``python currency_feed.py serve`` for a local stand-in feed server,
+``python currency_feed.py convert ticks.csv ticks.npy`` to build a binary
+file and ``python currency_feed.py bench`` to measure ingestion throughput.
+"""
+import argparse
+import io
+import random
+import socket
+import sys
+import threading
+import time
+from queue import Queue
+
+import numpy as np
+
+PAIRS = ("INR", "RUB")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def align_ticks(series, pairs=PAIRS):
+    """Merge per-pair ``{pair: (times, rates)}`` onto one timeline.
+
+    The result has a row for every distinct timestamp; a pair that didn't
+    tick at that instant carries its last known rate forward. Rows before
+    every pair has quoted at least once are dropped.
+    """
+    times = np.unique(np.concatenate([np.asarray(series[p][0], dtype=float) for p in pairs]))
+    rates = np.empty((len(times), len(pairs)))
+    first = 0
+    for col, pair in enumerate(pairs):
+        pair_times = np.asarray(series[pair][0], dtype=float)
+        pair_rates = np.asarray(series[pair][1], dtype=float)
+        order = np.argsort(pair_times, kind="stable")
+        pair_times, pair_rates = pair_times[order], pair_rates[order]
+        # Index of the last tick at or before each timestamp (as-of join)
+        idx = np.searchsorted(pair_times, times, side="right") - 1
+        first = max(first, np.searchsorted(idx, 0))
+        rates[:, col] = pair_rates[np.maximum(idx, 0)]
+    return times[first:], rates[first:]
+
+
+def load_csv_ticks(path, pairs=PAIRS):
+    """Parse a wide or long CSV tick file into ``(times, rates)`` arrays."""
+    with open(path, "r") as f:
+        header = [name.strip() for name in f.readline().split(",")]
+        if header[:3] == ["time", "pair", "rate"]:
+            data = np.loadtxt(f, delimiter=",", ndmin=1,
+                              dtype={"names": ("time", "pair", "rate"), "formats": ("f8", "U16", "f8")})
+            series = {}
+            for pair in pairs:
+                rows = data[data["pair"] == pair]
+                if not len(rows):
+                    raise ValueError(f"No ticks for {pair} in {path}")
+                series[pair] = (rows["time"], rows["rate"])
+            return align_ticks(series, pairs)
+
+        missing = [p for p in ("time",) + tuple(pairs) if p not in header]
+        if missing:
+            raise ValueError(f"{path} has no column(s) {', '.join(missing)}")
+        cols = [header.index("time")] + [header.index(p) for p in pairs]
+        data = np.loadtxt(f, delimiter=",", usecols=cols, ndmin=2)
+    order = np.argsort(data[:, 0], kind="stable")
+    return data[order, 0], data[order, 1:]
+
+
+def save_binary_ticks(path, times, rates, pairs=PAIRS):
+    """Write aligned ticks as a structured ``.npy`` file that load_binary_ticks can memory-map."""
+    dtype = np.dtype([("time", "<f8")] + [(p, "<f8") for p in pairs])
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(len(times),))
+    out["time"] = times
+    for col, pair in enumerate(pairs):
+        out[pair] = np.asarray(rates)[:, col]
+    out.flush()
+    del out
+
+
+def load_binary_ticks(path, pairs=PAIRS):
+    """Memory-map a binary tick file; only the pages replay touches are read."""
+    data = np.load(path, mmap_mode="r")
+    missing = [p for p in pairs if p not in data.dtype.names]
+    if missing:
+        raise ValueError(f"{path} has no field(s) {', '.join(missing)}")
+    # Field views of a memmap stay memory-mapped; column_stack would copy everything
+    return data["time"], [data[p] for p in pairs]
+
+
+def load_ticks(path, pairs=PAIRS):
+    """Open a tick file by extension; returns ``(times, [rates per pair])``."""
+    if str(path).endswith(".npy"):
+        return load_binary_ticks(path, pairs)
+    times, rates = load_csv_ticks(path, pairs)
+    return times, [rates[:, col] for col in range(len(pairs))]
+
+
+def parse_feed_block(block, width):
+    """Parse complete ``time,<pair>,...`` feed lines into a (k, width) array; returns ``(rows, dropped)``.
+
+    The block is parsed in one np.loadtxt call. Only if that fails (a
+    garbled line) is it parsed line by line, dropping lines that don't hold
+    exactly ``width`` numbers; rows with non-finite values are dropped too.
+    """
+    try:
+        rows = np.loadtxt(io.BytesIO(block), delimiter=",", ndmin=2)
+        if rows.size and rows.shape[1] != width:
+            raise ValueError(f"expected {width} columns")
+        rows = rows.reshape(-1, width)
+        dropped = 0
+    except ValueError:
+        lines = [line for line in block.split(b"\n") if line.strip()]
+        good = []
+        for line in lines:
+            fields = line.split(b",")
+            if len(fields) != width:
+                continue
+            try:
+                good.append([float(field) for field in fields])
+            except ValueError:
+                continue
+        rows = np.array(good, dtype=float).reshape(-1, width)
+        dropped = len(lines) - len(rows)
+    finite = np.isfinite(rows).all(axis=1)
+    if not finite.all():
+        rows = rows[finite]
+        dropped += int(np.count_nonzero(~finite))
+    return rows, dropped
+
+
+def in_order(times, after=-np.inf):
+    """Mask of the ticks that don't go back in time, against each other and the last tick ``after``."""
+    previous = np.maximum.accumulate(np.concatenate(([after], times[:-1])))
+    return times >= previous
+
+
+class TickReplayer:
+    """Replays recorded ticks at ``speed`` times real time (``speed <= 0`` replays as fast as possible)."""
+
+    def __init__(self, times, rates, speed=1.0, batch_interval=0.01, max_batch=65536):
+        # run() finds the due ticks with searchsorted, which silently misbehaves on unsorted times
+        if len(times) > 1 and np.any(np.diff(times) < 0):
+            raise ValueError("Tick times are not sorted; sort the file (load_csv_ticks does) before replaying")
+        self.times = times
+        self.rates = rates
+        self.speed = speed
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+
+    def run(self, queue, stop_event):
+        if not len(self.times):
+            return
+        t0 = float(self.times[0])
+        sent = 0
+        start = time.perf_counter()
+        while sent < len(self.times) and not stop_event.is_set():
+            if self.speed > 0:
+                replay_time = t0 + (time.perf_counter() - start) * self.speed
+                due = int(np.searchsorted(self.times, replay_time, side="right"))
+            else:
+                due = len(self.times)
+            due = min(due, sent + self.max_batch)
+            if due > sent:
+                queue.put((
+                    (np.asarray(self.times[sent:due]) - t0).tolist(),
+                    np.asarray(self.rates[0][sent:due]).tolist(),
+                    np.asarray(self.rates[1][sent:due]).tolist(),
+                ))
+                sent = due
+            if self.speed > 0:
+                stop_event.wait(self.batch_interval)
+        print("Replay finished." if sent == len(self.times) else "Replay stopped.")
+
+
+class FeedClient:
+    """Reads a local line feed (see serve_feed) and forwards ticks in bulk-parsed batches."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, pairs=PAIRS, recv_size=1 << 20):
+        self.host = host
+        self.port = port
+        self.pairs = pairs
+        self.recv_size = recv_size
+        self.dropped = 0  # Malformed or out-of-order lines skipped so far
+
+    def run(self, queue, stop_event):
+        with socket.create_connection((self.host, self.port), timeout=5) as sock:
+            sock.settimeout(0.1)  # Wake up regularly to notice stop_event
+            buffer = b""
+            header = None
+            t0 = None
+            last = -np.inf  # Time of the last tick passed on
+            while not stop_event.is_set():
+                try:
+                    chunk = sock.recv(self.recv_size)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    print("Feed closed by server.")
+                    return
+                buffer += chunk
+                if header is None:
+                    if b"\n" not in buffer:
+                        continue
+                    line, buffer = buffer.split(b"\n", 1)
+                    header = line.decode(errors="replace").strip().split(",")
+                    missing = [c for c in ("time", *self.pairs) if c not in header]
+                    if missing:
+                        raise ValueError(f"Feed has no column(s) {', '.join(missing)}")
+                    time_col = header.index("time")
+                    cols = [header.index(p) for p in self.pairs]
+                end = buffer.rfind(b"\n")
+                if end < 0:
+                    continue
+                complete, buffer = buffer[:end], buffer[end + 1:]
+                # One C-level parse per chunk instead of a split/float per field
+                rows, dropped = parse_feed_block(complete, len(header))
+                # The history pyramid and the candle builders assume time never goes backwards
+                ordered = in_order(rows[:, time_col], last)
+                if not ordered.all():
+                    rows = rows[ordered]
+                    dropped += int(np.count_nonzero(~ordered))
+                if dropped:
+                    self.dropped += dropped
+                    print(f"Dropped {dropped} malformed or out-of-order feed line(s) ({self.dropped} so far)",
+                          file=sys.stderr)
+                if not len(rows):
+                    continue
+                times = rows[:, time_col]
+                last = times[-1]
+                if t0 is None:
+                    t0 = times[0]
+                queue.put((
+                    (times - t0).tolist(),
+                    rows[:, cols[0]].tolist(),
+                    rows[:, cols[1]].tolist(),
+                ))
+
+
+def serve_feed(host=DEFAULT_HOST, port=DEFAULT_PORT, tick_rate=1000.0, initial_rates=(73.0738, 71.1012),
+               pairs=PAIRS, replay=None, stop_event=None, ready=None):
+    """Local stand-in for a rate feed: streams random-walk (or replayed) ticks to every client.
+
+    Each client gets a ``time,<pair>,...`` header followed by one CSV line
+    per tick, written in batches every few milliseconds.
+    """
+    stop_event = stop_event or threading.Event()
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+    server.settimeout(0.2)
+    print(f"Serving {'/'.join(pairs)} ticks on {host}:{server.getsockname()[1]} at {tick_rate:g} ticks/s")
+    if ready is not None:
+        ready(server.getsockname()[1])
+
+    def stream(conn):
+        with conn:
+            conn.sendall(("time," + ",".join(pairs) + "\n").encode())
+            rates = list(initial_rates)
+            produced = 0
+            start = time.perf_counter()
+            try:
+                while not stop_event.is_set():
+                    due = int((time.perf_counter() - start) * tick_rate)
+                    if replay is not None:
+                        due = min(due, len(replay[0]))
+                        if produced == due == len(replay[0]):
+                            return
+                    lines = []
+                    for k in range(produced, due):
+                        if replay is not None:
+                            lines.append(",".join([f"{replay[0][k]:.6f}"] + [f"{r[k]:.6f}" for r in replay[1]]))
+                            continue
+                        rates = [r * random.uniform(0.995, 1.005) for r in rates]
+                        lines.append(",".join([f"{k / tick_rate:.6f}"] + [f"{r:.6f}" for r in rates]))
+                    if lines:
+                        conn.sendall(("\n".join(lines) + "\n").encode())
+                        produced = due
+                    stop_event.wait(0.005)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    with server:
+        while not stop_event.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=stream, args=(conn,), daemon=True).start()
+
+
+def benchmark(num_ticks=1_000_000, tick_rate=200_000.0):
+    """Measure replay and feed ingestion throughput in ticks/second."""
+    import os
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    times = np.arange(num_ticks) / tick_rate
+    rates = np.column_stack([r * np.cumprod(rng.uniform(0.995, 1.005, num_ticks)) for r in (73.0738, 71.1012)])
+
+    def drain(queue, thread):
+        count = 0
+        while thread.is_alive() or not queue.empty():
+            while not queue.empty():
+                count += len(queue.get_nowait()[0])
+            time.sleep(0.001)
+        return count
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "ticks.csv")
+        npy_path = os.path.join(tmp, "ticks.npy")
+        np.savetxt(csv_path, np.column_stack([times, rates]), delimiter=",", fmt="%.6f",
+                   header="time," + ",".join(PAIRS), comments="")
+
+        start = time.perf_counter()
+        csv_times, csv_rates = load_csv_ticks(csv_path)
+        print(f"CSV parse:    {num_ticks / (time.perf_counter() - start):>12,.0f} ticks/s")
+        save_binary_ticks(npy_path, csv_times, csv_rates)
+
+        for label, path in (("CSV replay", csv_path), ("NPY replay", npy_path)):
+            start = time.perf_counter()
+            source_times, source_rates = load_ticks(path)
+            queue, stop_event = Queue(), threading.Event()
+            replayer = TickReplayer(source_times, source_rates, speed=0)
+            thread = threading.Thread(target=replayer.run, args=(queue, stop_event))
+            thread.start()
+            count = drain(queue, thread)
+            print(f"{label}:   {count / (time.perf_counter() - start):>12,.0f} ticks/s")
+
+    stop_event = threading.Event()
+    ports = Queue()
+    server = threading.Thread(target=serve_feed, kwargs=dict(port=0, tick_rate=tick_rate, stop_event=stop_event,
+                                                             ready=ports.put), daemon=True)
+    server.start()
+    queue = Queue()
+    client = threading.Thread(target=FeedClient(port=ports.get()).run, args=(queue, stop_event), daemon=True)
+    client.start()
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 3:
+        while not queue.empty():
+            count += len(queue.get_nowait()[0])
+        time.sleep(0.001)
+    stop_event.set()
+    print(f"TCP feed:     {count / (time.perf_counter() - start):>12,.0f} ticks/s (server target {tick_rate:,.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tick sources for the INR/RUB simulator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the local stand-in feed server")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--rate", type=float, default=1000.0, help="ticks per second")
+    serve.add_argument("--replay", help="stream this tick file instead of a random walk")
+
+    convert = sub.add_parser("convert", help="convert a CSV tick file to memory-mappable .npy")
+    convert.add_argument("source")
+    convert.add_argument("target")
+
+    bench = sub.add_parser("bench", help="measure ingestion throughput")
+    bench.add_argument("--ticks", type=int, default=1_000_000)
+    bench.add_argument("--rate", type=float, default=200_000.0)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve_feed(args.host, args.port, args.rate, replay=load_ticks(args.replay) if args.replay else None)
+    elif args.command == "convert":
+        save_binary_ticks(args.target, *load_csv_ticks(args.source))
+    else:
+        benchmark(args.ticks, args.rate)
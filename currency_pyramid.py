@@ -0,0 +1,139 @@
+"""Multi-resolution min/max/mean pyramid over the tick history.
+
+Level 0 holds the raw ticks; every level above summarizes ``base`` entries
+of the one below (1x, 16x, 256x, ... ticks per entry by default). Appends
+only recompute the last, partial bucket of each level, so maintenance costs
+O(1) amortized per tick, and a query for any time range reads from the
+coarsest level that still gives at least one entry per pixel, so its cost
+depends on the pixel width rather than on how many ticks the range holds.
+"""
+import numpy as np
+
+
+class _Column:
+    """Append-only numpy array with amortized doubling."""
+
+    def __init__(self, width=None, dtype=float):
+        self.shape = () if width is None else (width,)
+        self.data = np.empty((1024,) + self.shape, dtype=dtype)
+        self.size = 0
+
+    def resize(self, size):
+        if size > len(self.data):
+            grown = np.empty((max(size, 2 * len(self.data)),) + self.shape, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.size = size
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class _Level:
+    def __init__(self, n_series):
+        self.t = _Column()                       # Time of the first tick in each entry
+        self.min = _Column(n_series)
+        self.max = _Column(n_series)
+        self.sum = _Column(n_series)
+        self.count = _Column(dtype=np.int64)
+
+    @property
+    def size(self):
+        return self.t.size
+
+    def resize(self, size):
+        for column in (self.t, self.min, self.max, self.sum, self.count):
+            column.resize(size)
+
+
+class HistoryPyramid:
+    def __init__(self, n_series=2, base=16):
+        self.n_series = n_series
+        self.base = base
+        self.times = _Column()
+        self.values = _Column(n_series)
+        self.levels = []  # levels[0] summarizes `base` raw ticks per entry
+
+    def __len__(self):
+        return self.times.size
+
+    def append(self, times, *series):
+        """Append a batch of ticks (one sequence per series); times must not go backwards."""
+        n = len(times)
+        if not n:
+            return
+        old = self.times.size
+        self.times.resize(old + n)
+        self.values.resize(old + n)
+        self.times.data[old:old + n] = times
+        self.values.data[old:old + n] = np.column_stack(series)
+
+        # Rebuild only the buckets that gained entries, level by level
+        parent_old, parent_new = old, old + n
+        depth = 0
+        while parent_new > self.base or depth < len(self.levels):
+            if depth == len(self.levels):
+                self.levels.append(_Level(self.n_series))
+                parent_old = 0  # A new level summarizes everything below it, not just this batch
+            self._rebuild(depth, parent_old, parent_new)
+            level = self.levels[depth]
+            parent_old = parent_old // self.base  # First bucket touched at this level
+            parent_new = level.size
+            depth += 1
+
+    def _parent(self, depth, start, stop):
+        """t, min, max, sum, count of the entries below ``levels[depth]``."""
+        if depth == 0:
+            values = self.values.data[start:stop]
+            return self.times.data[start:stop], values, values, values, np.ones(stop - start, dtype=np.int64)
+        p = self.levels[depth - 1]
+        return (p.t.data[start:stop], p.min.data[start:stop], p.max.data[start:stop],
+                p.sum.data[start:stop], p.count.data[start:stop])
+
+    def _rebuild(self, depth, parent_old, parent_new):
+        base = self.base
+        first = parent_old // base
+        buckets = -(-parent_new // base)
+        start = first * base
+        t, lo, hi, total, count = self._parent(depth, start, parent_new)
+        pad = buckets * base - parent_new
+        if pad:
+            lo = np.concatenate([lo, np.full((pad, self.n_series), np.inf)])
+            hi = np.concatenate([hi, np.full((pad, self.n_series), -np.inf)])
+            total = np.concatenate([total, np.zeros((pad, self.n_series))])
+            count = np.concatenate([count, np.zeros(pad, dtype=np.int64)])
+        shape = (buckets - first, base, self.n_series)
+        level = self.levels[depth]
+        level.resize(buckets)
+        level.t.data[first:buckets] = t[::base]
+        level.min.data[first:buckets] = lo.reshape(shape).min(axis=1)
+        level.max.data[first:buckets] = hi.reshape(shape).max(axis=1)
+        level.sum.data[first:buckets] = total.reshape(shape).sum(axis=1)
+        level.count.data[first:buckets] = count.reshape(shape[:2]).sum(axis=1)
+
+    def query(self, t0, t1, max_points):
+        """Summaries covering ``[t0, t1]`` with at most about ``max_points`` entries.
+
+        Returns ``(times, mean, min, max)``; the value arrays have one column
+        per series. Raw ticks come back unchanged when they already fit.
+        """
+        times = self.times.view()
+        i0 = max(int(np.searchsorted(times, t0, side="left")) - 1, 0)  # Include the tick just off screen
+        i1 = min(int(np.searchsorted(times, t1, side="right")) + 1, len(times))
+        span = i1 - i0
+        depth, scale = 0, 1
+        while span / scale > max_points and depth < len(self.levels):
+            depth += 1
+            scale *= self.base
+        if depth == 0:
+            values = self.values.data[i0:i1]
+            return times[i0:i1], values, values, values
+        level = self.levels[depth - 1]
+        b0, b1 = i0 // scale, -(-i1 // scale)
+        mean = level.sum.data[b0:b1] / level.count.data[b0:b1, None]
+        return level.t.data[b0:b1], mean, level.min.data[b0:b1], level.max.data[b0:b1]
+
+    def time_range(self):
+        if not len(self):
+            return None
+        return self.times.data[0], self.times.data[self.times.size - 1]
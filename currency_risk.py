@@ -0,0 +1,314 @@
+"""Headless Monte Carlo risk engine for an INR/RUB currency portfolio.
+
+Simulates many future rate paths, the same multiplicative random walk
+currency.py animates but with normal, optionally correlated, log-returns,
+and reports VaR/CVaR of the final P&L, the distribution of maximum
+drawdowns and quantile fan charts of the portfolio value.
+
+Paths are generated in chunks across a process pool. Every chunk draws from
+its own ``SeedSequence.spawn`` child, so a given seed reproduces the same
+numbers regardless of how many workers run them. Chunks never return paths,
+only fixed-bin histograms (counts plus value sums) that merge exactly, so
+memory stays flat no matter how many paths are requested.
+
+    python currency_risk.py --paths 2000000 --steps 250 --plot fan.png
+    python currency_risk.py bench
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+# Step volatility of currency.py's uniform(0.995, 1.005) walk: half-width / sqrt(3)
+DEFAULT_STEP_VOL = 0.005 / np.sqrt(3)
+
+
+@dataclass
+class Portfolio:
+    rates: tuple = (73.0738, 71.1012)       # Current rates (INR, RUB)
+    holdings: tuple = (1_000_000, 1_000_000)  # Units held of each; negative for shorts
+    vols: tuple = (DEFAULT_STEP_VOL, DEFAULT_STEP_VOL)  # Per-step log-return volatility
+    drifts: tuple = (0.0, 0.0)              # Per-step log-return drift
+    correlation: float = 0.0
+
+    @property
+    def value(self):
+        return float(np.dot(self.holdings, self.rates))
+
+
+class Histogram:
+    """Fixed-bin histogram that also keeps per-bin value sums, so tail means are exact to the bin."""
+
+    def __init__(self, lo, hi, bins):
+        self.lo, self.hi, self.bins = lo, hi, bins
+        self.width = (hi - lo) / bins
+        # Slot 0 is underflow, slot bins + 1 is overflow
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+        self.sums = np.zeros(bins + 2)
+
+    def slots(self, values):
+        return np.clip(np.floor((values - self.lo) / self.width).astype(np.int64) + 1, 0, self.bins + 1)
+
+    def add(self, values):
+        slots = self.slots(values)
+        self.counts += np.bincount(slots, minlength=self.bins + 2)
+        self.sums += np.bincount(slots, weights=values, minlength=self.bins + 2)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.sums += other.sums
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        cum = np.cumsum(self.counts)
+        target = q * cum[-1]
+        slot = int(np.searchsorted(cum, target))
+        if slot == 0 or slot == self.bins + 1:
+            # Outside the histogram range: fall back to the mean of the out-of-range values
+            return self.sums[slot] / max(self.counts[slot], 1)
+        below = cum[slot - 1]
+        frac = (target - below) / max(self.counts[slot], 1)
+        return self.lo + (slot - 1 + frac) * self.width
+
+    def tail_mean(self, q):
+        """Mean of the lowest ``q`` fraction of values."""
+        cum = np.cumsum(self.counts)
+        target = q * cum[-1]
+        slot = int(np.searchsorted(cum, target))
+        below = cum[slot - 1] if slot else 0
+        total = self.sums[:slot].sum()
+        if self.counts[slot]:
+            # Take the partial bin at its own average value
+            total += (target - below) * self.sums[slot] / self.counts[slot]
+        return total / max(target, 1)
+
+    def mean(self):
+        return self.sums.sum() / max(self.total, 1)
+
+
+class FanHistogram:
+    """One value histogram per time step, stored as a single (steps, bins) count matrix."""
+
+    def __init__(self, lo, hi, bins, steps):
+        self.lo, self.hi, self.bins, self.steps = lo, hi, bins, steps
+        self.width = (hi - lo) / bins
+        self.counts = np.zeros((steps, bins), dtype=np.int64)
+
+    def add(self, values):
+        slots = np.clip(np.floor((values - self.lo) / self.width).astype(np.int64), 0, self.bins - 1)
+        flat = slots + np.arange(self.steps) * self.bins
+        self.counts += np.bincount(flat.ravel(), minlength=self.steps * self.bins).reshape(self.steps, self.bins)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def quantiles(self, levels):
+        cum = np.cumsum(self.counts, axis=1)
+        out = np.empty((len(levels), self.steps))
+        for i, q in enumerate(levels):
+            target = q * cum[:, -1:]
+            slot = (cum < target).sum(axis=1)
+            out[i] = self.lo + (slot + 0.5) * self.width
+        return out
+
+
+@dataclass
+class RiskAggregate:
+    pnl: Histogram
+    drawdown: Histogram
+    fan: FanHistogram
+    paths: int = 0
+
+    def merge(self, other):
+        self.pnl.merge(other.pnl)
+        self.drawdown.merge(other.drawdown)
+        self.fan.merge(other.fan)
+        self.paths += other.paths
+
+
+@dataclass
+class RiskConfig:
+    portfolio: Portfolio = field(default_factory=Portfolio)
+    paths: int = 1_000_000
+    steps: int = 250
+    seed: int = 0
+    bins: int = 20000
+    fan_bins: int = 400
+    chunk_paths: int = 50_000  # Paths per independently seeded task
+    batch_paths: int = 10_000  # Paths simulated per vectorized block inside a task
+
+    def value_range(self, sigmas=10.0):
+        """Portfolio value bounds wide enough that paths essentially never leave them."""
+        p = self.portfolio
+        lo = hi = 0.0
+        for rate, holding, vol, drift in zip(p.rates, p.holdings, p.vols, p.drifts):
+            spread = sigmas * vol * np.sqrt(self.steps)
+            ends = sorted(holding * rate * np.exp(drift * self.steps + np.array([-spread, spread])))
+            lo += ends[0]
+            hi += ends[1]
+        return lo, hi
+
+    def empty_aggregate(self):
+        lo, hi = self.value_range()
+        v0 = self.portfolio.value
+        return RiskAggregate(
+            pnl=Histogram(lo - v0, hi - v0, self.bins),
+            drawdown=Histogram(0.0, hi - lo, self.bins),
+            fan=FanHistogram(lo, hi, self.fan_bins, self.steps),
+        )
+
+
+def simulate_chunk(config, seed_seq, n_paths):
+    """Simulate ``n_paths`` paths from one independent stream; returns only the merged histograms."""
+    rng = np.random.default_rng(seed_seq)
+    p = config.portfolio
+    agg = config.empty_aggregate()
+    rates0 = np.asarray(p.rates, dtype=float)
+    holdings = np.asarray(p.holdings, dtype=float)
+    vols = np.asarray(p.vols, dtype=float)
+    drifts = np.asarray(p.drifts, dtype=float)
+    chol = np.linalg.cholesky(np.array([[1.0, p.correlation], [p.correlation, 1.0]]))
+    v0 = p.value
+
+    done = 0
+    while done < n_paths:
+        n = min(config.batch_paths, n_paths - done)
+        shocks = rng.standard_normal((n, config.steps, 2))
+        if p.correlation:
+            shocks = shocks @ chol.T
+        log_paths = np.cumsum(drifts + vols * shocks, axis=1)
+        values = (np.exp(log_paths, out=log_paths) * (rates0 * holdings)).sum(axis=2)  # (n, steps)
+        running_peak = np.maximum(np.maximum.accumulate(values, axis=1), v0)
+        agg.pnl.add(values[:, -1] - v0)
+        agg.drawdown.add((running_peak - values).max(axis=1))
+        agg.fan.add(values)
+        agg.paths += n
+        done += n
+    return agg
+
+
+def run_risk(config, workers=None):
+    """Run the simulation across a process pool and merge the per-chunk aggregates."""
+    workers = workers or os.cpu_count() or 1
+    # Chunking depends only on the path count, so results don't change with the worker count
+    n_chunks = -(-config.paths // config.chunk_paths)
+    sizes = [min(config.chunk_paths, config.paths - i * config.chunk_paths) for i in range(n_chunks)]
+    seeds = np.random.SeedSequence(config.seed).spawn(n_chunks)
+
+    total = config.empty_aggregate()
+    if workers == 1:
+        for seed_seq, size in zip(seeds, sizes):
+            total.merge(simulate_chunk(config, seed_seq, size))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for agg in pool.map(simulate_chunk, [config] * n_chunks, seeds, sizes):
+            total.merge(agg)
+    return total
+
+
+def summarize(config, agg, levels=(0.95, 0.99), fan_levels=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """VaR/CVaR (as positive losses), drawdown quantiles and fan chart series."""
+    summary = {
+        "paths": agg.paths,
+        "steps": config.steps,
+        "initial_value": config.portfolio.value,
+        "expected_pnl": agg.pnl.mean(),
+        "var": {},
+        "cvar": {},
+        "drawdown": {
+            "mean": agg.drawdown.mean(),
+            **{f"q{int(q * 100)}": agg.drawdown.quantile(q) for q in (0.5, 0.95, 0.99)},
+        },
+        "fan": {f"q{int(q * 100)}": series.tolist()
+                for q, series in zip(fan_levels, agg.fan.quantiles(fan_levels))},
+    }
+    for level in levels:
+        summary["var"][f"{level:g}"] = -agg.pnl.quantile(1 - level)
+        summary["cvar"][f"{level:g}"] = -agg.pnl.tail_mean(1 - level)
+    return summary
+
+
+def plot_fan(summary, path):
+    import matplotlib
+    matplotlib.use("Agg")  # Headless: render straight to file
+    import matplotlib.pyplot as plt
+
+    fan = summary["fan"]
+    steps = np.arange(1, summary["steps"] + 1)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.fill_between(steps, fan["q5"], fan["q95"], color="tab:blue", alpha=0.2, label="5-95%")
+    ax.fill_between(steps, fan["q25"], fan["q75"], color="tab:blue", alpha=0.4, label="25-75%")
+    ax.plot(steps, fan["q50"], color="tab:blue", label="Median")
+    ax.set_xlabel("Step")
+    ax.set_ylabel("Portfolio value")
+    ax.set_title(f"Portfolio value fan chart ({summary['paths']:,} paths)")
+    ax.grid(True)
+    ax.legend()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def benchmark(paths=400_000, steps=250):
+    """Report simulated paths/second for increasing worker counts."""
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    for workers in counts:
+        config = RiskConfig(paths=paths, steps=steps)
+        start = time.perf_counter()
+        run_risk(config, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>3} worker(s): {paths / elapsed:>12,.0f} paths/s ({paths * steps / elapsed:,.0f} steps/s)")
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Monte Carlo VaR/CVaR for an INR/RUB portfolio")
+    parser.add_argument("command", nargs="?", choices=["run", "bench"], default="run")
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rates", type=float, nargs=2, default=Portfolio.rates)
+    parser.add_argument("--holdings", type=float, nargs=2, default=Portfolio.holdings)
+    parser.add_argument("--vols", type=float, nargs=2, default=Portfolio.vols, help="per-step log-return volatility")
+    parser.add_argument("--correlation", type=float, default=0.0)
+    parser.add_argument("--json", help="write the full summary (including fan series) here")
+    parser.add_argument("--plot", help="save a fan chart image here")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        benchmark(min(args.paths, 400_000), args.steps)
+        return
+
+    config = RiskConfig(
+        portfolio=Portfolio(tuple(args.rates), tuple(args.holdings), tuple(args.vols), correlation=args.correlation),
+        paths=args.paths, steps=args.steps, seed=args.seed,
+    )
+    start = time.perf_counter()
+    agg = run_risk(config, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    summary = summarize(config, agg)
+
+    print(f"{agg.paths:,} paths x {config.steps} steps in {elapsed:.2f}s ({agg.paths / elapsed:,.0f} paths/s)")
+    print(f"Initial value: {summary['initial_value']:,.2f}   expected P&L: {summary['expected_pnl']:,.2f}")
+    for level in summary["var"]:
+        print(f"VaR {level}: {summary['var'][level]:,.2f}   CVaR {level}: {summary['cvar'][level]:,.2f}")
+    dd = summary["drawdown"]
+    print(f"Max drawdown: mean {dd['mean']:,.2f}  median {dd['q50']:,.2f}  95% {dd['q95']:,.2f}  99% {dd['q99']:,.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.plot:
+        plot_fan(summary, args.plot)
+
+
+if __name__ == "__main__":
+    main()
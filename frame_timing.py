@@ -0,0 +1,219 @@
+"""Opt-in frame timing for the Tk front ends.
+
+Off unless the environment asks for it:
+
+    FRAME_TIMING=1 python currency.py                 # FPS/latency overlay, summary at exit
+    FRAME_TIMING_TRACE=trace.json python flight.py    # ...and a Chrome trace written at exit
+
+The apps wrap each phase of a frame in a span, so the time spent in the
+physics, in updating matplotlib artists and in drawing the canvas shows up
+separately:
+
+    with timing.frame():
+        with timing.span("step"):       # simulation / data
+            ...
+        with timing.span("artists"):    # set_data, set_text, ...
+            ...
+        with timing.span("draw"):       # canvas draw or blit
+            ...
+
+Canvases whose draws happen later, from the Tk event loop (draw_idle,
+FuncAnimation, plt.pause), go through ``wrap_draw`` so those draws are
+timed wherever they run. Wall time outside every frame is Tk event
+handling and idle time; the overlay reports it as the busy percentage.
+The overlay is a Tk label placed over the plot rather than a matplotlib
+text artist, so it never adds to a draw or breaks a blit.
+
+Each span keeps its last ``window`` durations for rolling percentiles.
+Every span is also logged as a Chrome "complete" event, and
+``export_chrome_trace`` writes them out for chrome://tracing or Perfetto.
+When timing is disabled, ``span`` and ``frame`` return one shared no-op
+context manager, so an instrumented frame costs a few method calls.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameTimer:
+    def __init__(self, enabled=False, window=240, max_events=500_000):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}                          # Span name -> last ``window`` durations (s)
+        self.frame_starts = deque(maxlen=window)
+        self.events = deque(maxlen=max_events)     # (name, start, end, thread id), oldest dropped first
+        self.origin = time.perf_counter()
+        self.overlays = []
+        self._overlay_updated = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """A timer switched on by FRAME_TIMING or FRAME_TIMING_TRACE; prints (and exports) at exit."""
+        trace_path = os.environ.get("FRAME_TIMING_TRACE")
+        timer = cls(bool(trace_path) or os.environ.get("FRAME_TIMING", "0") not in ("", "0"))
+        if timer.enabled:
+            atexit.register(timer.print_summary)
+        if trace_path:
+            atexit.register(timer.export_chrome_trace, trace_path)
+        return timer
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def frame(self, name="frame"):
+        """Span around a whole frame; its starts also drive the FPS figure."""
+        if not self.enabled:
+            return NULL_SPAN
+        self.frame_starts.append(time.perf_counter())
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(end - start)
+        self.events.append((name, start, end, threading.get_ident()))
+
+    def wrap_draw(self, canvas):
+        """Time every ``canvas.draw()`` as a "draw" span, including the deferred ones. No-op when disabled."""
+        if not self.enabled:
+            return
+        draw = canvas.draw
+
+        def timed_draw(*args, **kwargs):
+            with self.span("draw"):
+                return draw(*args, **kwargs)
+        canvas.draw = timed_draw
+
+    # --- Statistics -------------------------------------------------------
+
+    def percentiles(self, name, q=(50, 95, 99)):
+        """Rolling percentiles of a span in milliseconds, or None before its first sample."""
+        samples = self.samples.get(name)
+        if not samples:
+            return None
+        return dict(zip(q, np.percentile(np.fromiter(samples, float, len(samples)), q) * 1000))
+
+    def fps(self):
+        starts = self.frame_starts
+        if len(starts) < 2 or starts[-1] == starts[0]:
+            return 0.0
+        return (len(starts) - 1) / (starts[-1] - starts[0])
+
+    def busy(self):
+        """Fraction of the wall time over the window spent inside frames (the rest is Tk and idle)."""
+        frames = self.samples.get("frame")
+        if not frames or len(self.frame_starts) < 2:
+            return None
+        elapsed = time.perf_counter() - self.frame_starts[0]
+        recent = list(frames)[-len(self.frame_starts):]
+        return min(sum(recent) / elapsed, 1.0) if elapsed > 0 else None
+
+    def summary(self):
+        """One line for the frame rate (once there are frames), then p50/p95/p99 per span."""
+        lines = []
+        if len(self.frame_starts) >= 2:
+            busy = self.busy()
+            lines.append(f"{self.fps():5.1f} fps" + (f"  busy {busy:.0%}" if busy is not None else ""))
+        for name in sorted(self.samples, key=lambda name: (name != "frame", name)):
+            p = self.percentiles(name)
+            lines.append(f"{name:<8} p50 {p[50]:6.1f}  p95 {p[95]:6.1f}  p99 {p[99]:6.1f} ms")
+        return "\n".join(lines)
+
+    def print_summary(self):
+        if self.samples:
+            print(self.summary())
+
+    # --- Overlay ----------------------------------------------------------
+
+    def attach_overlay(self, canvas):
+        """Show the FPS/latency summary in the top-left corner of a matplotlib canvas.
+
+        Returns the label, or None when disabled or when the canvas isn't a Tk one
+        (the Tk widget is only looked up once timing is on).
+        """
+        if not self.enabled:
+            return None
+        get_tk_widget = getattr(canvas, "get_tk_widget", None)
+        if get_tk_widget is None:
+            return None
+        widget = get_tk_widget()
+        import tkinter as tk
+
+        overlay = tk.Label(widget, text="", font=("TkFixedFont", 8), justify=tk.LEFT, anchor="nw", bg="white",
+                           fg="black")
+        overlay.place(x=4, y=4)
+        self.overlays.append(overlay)
+        return overlay
+
+    def update_overlay(self, interval=0.25):
+        """Refresh the overlays, at most once per ``interval`` seconds."""
+        if not self.overlays:
+            return
+        now = time.perf_counter()
+        if now - self._overlay_updated >= interval:
+            text = self.summary()
+            for overlay in self.overlays:
+                if overlay.winfo_exists():
+                    overlay.config(text=text)
+            self._overlay_updated = now
+
+    # --- Export -----------------------------------------------------------
+
+    def chrome_trace(self):
+        """The recorded spans as a Chrome trace-event document."""
+        pid = os.getpid()
+        events = [{"name": name, "cat": "frame" if name == "frame" else "phase", "ph": "X", "pid": pid,
+                   "tid": tid, "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+                  for name, start, end, tid in list(self.events)]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        """Write the trace to ``path`` (via a temporary file); returns the number of events."""
+        trace = self.chrome_trace()
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(trace, f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return len(trace["traceEvents"])
@@ -0,0 +1,125 @@
+"""Projectile flight with drag in an exponential atmosphere.
+
+The physics behind flight.py (Runge-Kutta 4) and "flight 2" (Euler), kept
+free of Tk and matplotlib so it can be imported, scripted and benchmarked
+without a display.
+"""
+import numpy as np
+
+# Constants
+C = 0.47  # Drag coefficient
+rho_0 = 1.225  # Air density at sea level (kg/m^3)
+g = 9.81  # Gravity (m/s^2)
+H = 8500  # Scale height for Earth's atmosphere (m)
+
+
+class Projectile:
+    def __init__(self, v0, angle, height, size, weight):
+        self.v0 = v0
+        self.angle = np.deg2rad(angle)
+        self.height = height
+        self.size = size
+        self.weight = weight
+        self.cosa = np.cos(self.angle)
+        self.sina = np.sin(self.angle)
+        self.vx = self.v0 * self.cosa
+        self.vy = self.v0 * self.sina
+        self.x = 0
+        self.y = self.height
+        self.t = 0
+        self.on_ground = False
+
+    def air_density(self, h):
+        """Calculate air density at a given altitude using the barometric formula."""
+        return rho_0 * np.exp(-h / H)
+
+    def derivatives(self, t, vx, vy):
+        v = np.sqrt(vx**2 + vy**2)
+        rho = self.air_density(self.y)  # Dynamic air density based on altitude
+        k = 0.5 * C * rho * self.size / self.weight  # Update k with dynamic air density
+        dvx_dt = -k * vx * v
+        dvy_dt = -g - k * vy * v
+        dx_dt = vx
+        dy_dt = vy
+        return dx_dt, dy_dt, dvx_dt, dvy_dt
+
+    def runge_kutta(self, dt):
+        if not self.on_ground:
+            dx_dt, dy_dt, dvx_dt, dvy_dt = self.derivatives(self.t, self.vx, self.vy)
+
+            k1_x = dt * dx_dt
+            k1_y = dt * dy_dt
+            k1_vx = dt * dvx_dt
+            k1_vy = dt * dvy_dt
+
+            dx_dt, dy_dt, dvx_dt, dvy_dt = self.derivatives(self.t + dt/2, self.vx + k1_vx/2, self.vy + k1_vy/2)
+            k2_x = dt * dx_dt
+            k2_y = dt * dy_dt
+            k2_vx = dt * dvx_dt
+            k2_vy = dt * dvy_dt
+
+            dx_dt, dy_dt, dvx_dt, dvy_dt = self.derivatives(self.t + dt/2, self.vx + k2_vx/2, self.vy + k2_vy/2)
+            k3_x = dt * dx_dt
+            k3_y = dt * dy_dt
+            k3_vx = dt * dvx_dt
+            k3_vy = dt * dvy_dt
+
+            dx_dt, dy_dt, dvx_dt, dvy_dt = self.derivatives(self.t + dt, self.vx + k3_vx, self.vy + k3_vy)
+            k4_x = dt * dx_dt
+            k4_y = dt * dy_dt
+            k4_vx = dt * dvx_dt
+            k4_vy = dt * dvy_dt
+
+            self.x += (k1_x + 2*k2_x + 2*k3_x + k4_x) / 6
+            self.y += (k1_y + 2*k2_y + 2*k3_y + k4_y) / 6
+            self.vx += (k1_vx + 2*k2_vx + 2*k3_vx + k4_vx) / 6
+            self.vy += (k1_vy + 2*k2_vy + 2*k3_vy + k4_vy) / 6
+
+            self.t += dt
+
+            if self.y < 0:
+                self.y = 0
+                self.on_ground = True
+                self.vx = 0
+                self.vy = 0
+
+    def calculate_max_height(self):
+        return self.height + (self.v0**2 * self.sina**2) / (2 * g)
+
+    def calculate_distance(self):
+        return self.x
+
+    def calculate_speed_at_end(self):
+        return self.vx
+
+
+class EulerProjectile(Projectile):
+    """The simpler first-order integrator used by "flight 2"."""
+
+    def drag_force(self, vx, vy):
+        """Compute drag force components based on velocity."""
+        v = np.sqrt(vx**2 + vy**2)
+        rho = self.air_density(self.y)  # Dynamic air density
+        k = 0.5 * C * rho * self.size / self.weight  # Drag coefficient adjusted for mass
+        drag_x = -k * vx * v
+        drag_y = -k * vy * v
+        return drag_x, drag_y
+
+    def update(self, dt):
+        """Update projectile motion using Euler's method."""
+        if not self.on_ground:
+            drag_x, drag_y = self.drag_force(self.vx, self.vy)
+
+            # Update velocities
+            self.vx += drag_x * dt
+            self.vy += (-g + drag_y) * dt
+
+            # Update positions
+            self.x += self.vx * dt
+            self.y += self.vy * dt
+
+            if self.y <= 0:
+                self.y = 0
+                self.on_ground = True
+                self.vx = 0
+                self.vy = 0
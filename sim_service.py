@@ -0,0 +1,662 @@
+"""Local HTTP/JSON service for the simulators.
+
+Runs projectiles (projectile.py, as in flight.py), blood spatter
+(spatter.simulate_blood_spatter against the WeaponDB catalogue) and cellular
+automata (auto.py's elementary rules, 2d.py's Life rule) for other tools,
+without the Tk windows:
+
+    POST /projectile  {"v0": 50, "angle": 45, "height": 0, "size": 0.01, "weight": 1, "dt": 0.01, "method": "rk4"}
+    POST /spatter     {"weapon": "Knife", "surface": "Smooth", "velocity": 20, "angle": 45, "droplets": 1000,
+                       "seed": 1, "model": "scatter"}
+    POST /automaton   {"kind": "elementary", "rule": 30, "width": 60, "steps": 40}
+                      {"kind": "life", "rows": 60, "cols": 60, "steps": 220}
+    GET  /weapons, /stats, /health
+
+Parameters are validated and completed with their defaults, and the result
+is cached under a hash of them (spatter runs only when the client gives a
+seed, since a server-drawn seed makes every run unique). Identical requests
+already being computed share one job. Misses wait a few milliseconds in a
+queue so jobs can be sent to the process pool in batches, which keeps the
+pickling overhead of many small runs low; large jobs go on their own.
+Workers send back the JSON already encoded. Responses above STREAM_BYTES
+go out with chunked transfer encoding, CHUNK_BYTES at a time.
+
+Automaton grids come back as one string of 0/1 characters per row.
+
+    python sim_service.py serve --port 8766
+    python sim_service.py loadtest                  # starts its own server
+    python sim_service.py loadtest --url 127.0.0.1:8766 --requests 2000 --concurrency 16
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+
+from auto import apply_rule
+from projectile import EulerProjectile, Projectile
+from spatter import simulate_ballistic_spatter, simulate_blood_spatter
+from weapons import Weapon, open_weapon_db
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+STREAM_BYTES = 1 << 20   # Responses larger than this are sent chunked
+CHUNK_BYTES = 256 << 10
+BATCH_WINDOW = 0.005     # Seconds a miss waits for others to share its batch
+BATCH_COST = 200_000     # Work units (steps, droplets, cells) per batch; bigger jobs run alone
+SURFACES = ("Smooth", "Rough", "Fabric")
+
+# Parameter schemas: name -> (type, default, min, max), or a tuple of choices (first is the default)
+PROJECTILE = {
+    "v0": (float, 50.0, 0.0, 1e4),
+    "angle": (float, 45.0, 0.0, 90.0),
+    "height": (float, 0.0, 0.0, 1e5),
+    "size": (float, 0.01, 1e-6, 100.0),
+    "weight": (float, 1.0, 1e-6, 1e6),
+    "dt": (float, 0.01, 1e-5, 1.0),
+    "max_steps": (int, 100_000, 1, 1_000_000),
+    "method": ("rk4", "euler"),
+}
+SPATTER = {
+    "weapon": (str, None, None, None),
+    "surface": SURFACES,
+    "velocity": (float, 20.0, 0.0, 500.0),
+    "angle": (float, 45.0, 0.0, 90.0),
+    "droplets": (int, 1000, 1, 2_000_000),
+    "seed": (int, None, 0, None),
+    "model": ("scatter", "ballistic"),
+    "plane": ("floor", "wall"),
+}
+AUTOMATA = {
+    "elementary": {
+        "rule": (int, 30, 0, 255),
+        "width": (int, 60, 3, 100_000),
+        "steps": (int, 40, 1, 10_000),
+        "initial": ("single", "random"),
+        "seed": (int, 0, 0, None),
+    },
+    # 2d.py places its patterns on a 60x60 grid, so that is the smallest
+    "life": {
+        "rows": (int, 60, 60, 1000),
+        "cols": (int, 60, 60, 1000),
+        "steps": (int, 220, 1, 2000),
+    },
+}
+
+
+def _normalize(schema, params):
+    """Validate ``params`` against ``schema`` and fill in defaults; raises ValueError."""
+    unknown = set(params) - set(schema)
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+    result = {}
+    for name, spec in schema.items():
+        value = params.get(name)
+        if isinstance(spec[0], str):  # Choices
+            value = spec[0] if value is None else value
+            if value not in spec:
+                raise ValueError(f"{name} must be one of {', '.join(spec)}")
+            result[name] = value
+            continue
+        kind, default, lo, hi = spec
+        if value is None:
+            if default is None and name != "seed":
+                raise ValueError(f"{name} is required")
+            result[name] = default
+            continue
+        if kind is str:
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or (kind is int and value != int(value)):
+                raise ValueError(f"{name} must be {'an integer' if kind is int else 'a number'}")
+            value = kind(value)
+            if (lo is not None and value < lo) or (hi is not None and value > hi):
+                raise ValueError(f"{name} must be between {lo} and {hi if hi is not None else 'inf'}")
+        result[name] = value
+    return result
+
+
+def normalize(kind, params, db=None):
+    """Canonical parameters of a request and whether its result may be cached."""
+    if not isinstance(params, dict):
+        raise ValueError("Request body must be a JSON object")
+    if kind == "projectile":
+        return _normalize(PROJECTILE, params), True
+    if kind == "spatter":
+        params = _normalize(SPATTER, params)
+        cacheable = params["seed"] is not None
+        if not cacheable:
+            params["seed"] = np.random.SeedSequence().entropy
+        if db is not None:
+            db.load_weapons()
+            weapon = db.get_weapon(params["weapon"])
+            if weapon is None:
+                raise ValueError(f"Unknown weapon {params['weapon']!r}")
+            params["weapon_data"] = asdict(weapon)  # Part of the cache key, so editing a weapon invalidates it
+        return params, cacheable
+    if kind == "automaton":
+        automaton = params.get("kind", "elementary")
+        if automaton not in AUTOMATA:
+            raise ValueError(f"kind must be one of {', '.join(AUTOMATA)}")
+        params = _normalize(AUTOMATA[automaton], {k: v for k, v in params.items() if k != "kind"})
+        if automaton == "elementary" and params["width"] * params["steps"] > 20_000_000:
+            raise ValueError("width x steps must be at most 20,000,000")
+        return dict(params, kind=automaton), True
+    raise ValueError(f"Unknown simulation {kind!r}")
+
+
+def cache_key(kind, params):
+    return hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode()).hexdigest()
+
+
+def job_cost(kind, params):
+    """Rough work units of a job, for packing batches."""
+    if kind == "projectile":
+        return min(params["max_steps"], 20_000)  # Most runs land long before max_steps
+    if kind == "spatter":
+        return params["droplets"]
+    if params["kind"] == "life":
+        return params["rows"] * params["cols"] * params["steps"]
+    return params["width"] * params["steps"]
+
+
+# --- Worker side ----------------------------------------------------------
+
+_db = None
+_ca2d = None
+
+
+def _init_worker(weapons_file):
+    global _db
+    _db = open_weapon_db(weapons_file)
+
+
+def _raise_error(title, message):
+    raise ValueError(message)
+
+
+def _rows(grid):
+    """A 0/1 grid as one string per row."""
+    grid = np.asarray(grid)
+    data = (grid.astype(np.uint8) + ord("0")).tobytes().decode()
+    width = grid.shape[-1]
+    return [data[i:i + width] for i in range(0, len(data), width)]
+
+
+def run_projectile(p):
+    cls = Projectile if p["method"] == "rk4" else EulerProjectile
+    projectile = cls(p["v0"], p["angle"], p["height"], p["size"], p["weight"])
+    step = projectile.runge_kutta if p["method"] == "rk4" else projectile.update
+    xs, ys = [float(projectile.x)], [float(projectile.y)]
+    for _ in range(p["max_steps"]):
+        step(p["dt"])
+        xs.append(float(projectile.x))
+        ys.append(float(projectile.y))
+        if projectile.on_ground:
+            break
+    steps = len(xs) - 1
+    return {"x": xs, "y": ys, "dt": p["dt"], "steps": steps, "landed": projectile.on_ground,
+            "distance": xs[-1], "max_height": max(ys), "flight_time": steps * p["dt"]}
+
+
+def run_spatter(p):
+    _db.load_weapons()
+    if p["model"] == "ballistic":
+        stains = simulate_ballistic_spatter(p["velocity"], p["angle"], p["surface"], p["weapon"], _db, p["plane"],
+                                            p["droplets"], rng=p["seed"], on_error=_raise_error)
+        # Not asdict(), which would deep-copy every array before converting it
+        result = {f.name: getattr(stains, f.name).tolist() for f in fields(stains)
+                  if f.name not in ("plane", "airborne")}
+        result["plane"], result["airborne"] = stains.plane, stains.airborne
+    else:
+        x, y, z = simulate_blood_spatter(p["velocity"], p["angle"], p["surface"], p["weapon"], _db, p["droplets"],
+                                         rng=p["seed"], on_error=_raise_error)
+        result = {"x": x.tolist(), "y": y.tolist(), "z": z.tolist()}
+    result["seed"] = p["seed"]
+    return result
+
+
+def run_automaton(p):
+    global _ca2d
+    if p["kind"] == "life":
+        if _ca2d is None:
+            try:
+                _ca2d = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "2d.py"),
+                                       run_name="ca2d")
+            except ImportError as e:
+                raise ValueError(f"Life automaton unavailable: {e}")
+        frames = _ca2d["evolve"](_ca2d["initial_state"](p["rows"], p["cols"]), p["steps"])
+        return {"frames": [_rows(frame) for frame in frames]}
+
+    state = np.zeros(p["width"], dtype=int)
+    if p["initial"] == "single":
+        state[p["width"] // 2] = 1
+    else:
+        state[:] = np.random.default_rng(p["seed"]).integers(0, 2, p["width"])
+    grid = np.zeros((p["steps"], p["width"]), dtype=int)
+    grid[0] = state
+    for i in range(1, p["steps"]):
+        grid[i] = apply_rule(grid[i - 1], p["rule"])
+    return {"rows": _rows(grid)}
+
+
+RUNNERS = {"projectile": run_projectile, "spatter": run_spatter, "automaton": run_automaton}
+
+
+def run_batch(jobs):
+    """Run ``(kind, params)`` jobs in one worker; returns encoded JSON or the exception, per job."""
+    results = []
+    for kind, params in jobs:
+        try:
+            results.append(json.dumps(RUNNERS[kind](params), separators=(",", ":")).encode())
+        except Exception as e:  # Reported on its own request; the rest of the batch still runs
+            results.append(e)
+    return results
+
+
+# --- Server side ----------------------------------------------------------
+
+class ResultCache:
+    """LRU of encoded results, bounded by total bytes."""
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes // 4:
+            return  # One huge result shouldn't flush everything else
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+class SimulationService:
+    def __init__(self, workers=None, weapons_file="weapons.json", cache_bytes=256 << 20,
+                 batch_window=BATCH_WINDOW, batch_cost=BATCH_COST):
+        self.db = open_weapon_db(weapons_file)
+        self.pool = ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=_init_worker,
+                                        initargs=(weapons_file,))
+        self.cache = ResultCache(cache_bytes)
+        self.batch_window = batch_window
+        self.batch_cost = batch_cost
+        self.pending = queue.Queue()
+        self.inflight = {}  # Cache key -> Future shared by identical requests
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()  # Updated from every request thread and the dispatcher
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, kind, params):
+        """Future of the encoded result, and how it was served: "hit", "shared" or "miss"."""
+        with self.lock:  # The request threads share one WeaponDB
+            params, cacheable = normalize(kind, params, self.db)
+        key = cache_key(kind, params)
+        self._count("requests")
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("hits")
+                future = Future()
+                future.set_result(cached)
+                return future, "hit"
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self._count("shared")
+                return future, "shared"
+            future = self.inflight[key] = Future()
+        self._count("misses")
+        self.pending.put((key, kind, params, cacheable, future))
+        return future, "miss"
+
+    def _count(self, name, n=1):
+        with self.stats_lock:
+            self.stats[name] += n
+
+    def _dispatch(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            batch, cost = [job], job_cost(job[1], job[2])
+            deadline = time.perf_counter() + self.batch_window
+            while cost < self.batch_cost:
+                try:
+                    job = self.pending.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.pending.put(None)
+                    break
+                batch.append(job)
+                cost += job_cost(job[1], job[2])
+            self._count("batches")
+            self._count("batched_jobs", len(batch))
+            try:
+                done = self.pool.submit(run_batch, [(kind, params) for _, kind, params, _, _ in batch])
+            except RuntimeError as e:  # Pool shut down
+                self._finish(batch, None, e)
+                continue
+            done.add_done_callback(lambda done, batch=batch: self._finish(batch, done))
+
+    def _finish(self, batch, done, error=None):
+        try:
+            results = done.result() if error is None else [error] * len(batch)
+        except Exception as e:  # The worker died
+            results = [e] * len(batch)
+        for (key, _, _, cacheable, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                if cacheable:
+                    self.cache.put(key, result)
+                future.set_result(result)
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def snapshot(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats.update(cache_entries=len(self.cache.entries), cache_bytes=self.cache.bytes,
+                     queued=self.pending.qsize(), inflight=len(self.inflight))
+        if stats.get("batches"):
+            stats["mean_batch"] = stats["batched_jobs"] / stats["batches"]
+        return stats
+
+    def close(self):
+        self.pending.put(None)
+        self.dispatcher.join()
+        self.pool.shutdown(cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse connections
+    # Headers and body go out as separate writes; with Nagle on, each response
+    # on a kept-alive connection then waits ~40 ms for the client's delayed ACK
+    disable_nagle_algorithm = True
+    service = None                 # Set by make_server
+    timeout = 600
+
+    def log_message(self, format, *args):
+        pass  # One line per request would dominate a load test
+
+    def send_body(self, status, body, cache=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if cache:
+            self.send_header("X-Cache", cache)
+        if len(body) > STREAM_BYTES:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            view = memoryview(body)
+            for start in range(0, len(body), CHUNK_BYTES):
+                chunk = view[start:start + CHUNK_BYTES]
+                self.wfile.write(b"%x\r\n" % len(chunk))
+                self.wfile.write(chunk)
+                self.wfile.write(b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data).encode())
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, self.service.snapshot())
+        elif self.path == "/weapons":
+            with self.service.lock:
+                self.service.db.load_weapons()
+                names = self.service.db.get_all_weapons()
+            self.send_json(200, {"weapons": names})
+        else:
+            self.send_json(404, {"error": f"No such endpoint {self.path}"})
+
+    def do_POST(self):
+        kind = self.path.strip("/")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if kind not in RUNNERS:
+                self.send_json(404, {"error": f"No such endpoint {self.path}"})
+                return
+            future, cache = self.service.submit(kind, params)
+            body = future.result()
+        except (ValueError, json.JSONDecodeError) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self.send_body(200, body, cache)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# --- Client and load test -----------------------------------------------
+
+class SimulationClient:
+    """Minimal client over one keep-alive connection (not thread-safe; use one per thread)."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=600):
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, params=None, decode=True):
+        """(status, decoded JSON (None unless ``decode``), X-Cache header, body bytes)."""
+        body = None if params is None else json.dumps(params).encode()
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.conn.request(method, path, body, headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if decode else None, response.getheader("X-Cache"), len(data)
+
+    def run(self, simulation, **params):
+        """Result of ``simulation`` ("projectile", "spatter" or "automaton"); raises RuntimeError on failure."""
+        status, data, _, _ = self.request("POST", f"/{simulation}", params)
+        if status != 200:
+            raise RuntimeError(data.get("error", f"HTTP {status}"))
+        return data
+
+    def close(self):
+        self.conn.close()
+
+
+def _request_mix(count, distinct, weapons, seed=0):
+    """``count`` (kind, params) requests drawn from ``distinct`` parameter sets per kind (0: all unique)."""
+    rng = random.Random(seed)
+    kinds = ["projectile", "automaton"] + (["spatter"] if weapons else [])
+    requests = []
+    for i in range(count):
+        kind = rng.choice(kinds)
+        variant = rng.randrange(distinct) if distinct else i
+        local = random.Random(f"{kind}-{variant}")
+        if kind == "projectile":
+            params = {"v0": local.uniform(10, 80), "angle": local.uniform(10, 80), "dt": 0.01,
+                      "method": local.choice(["rk4", "euler"])}
+        elif kind == "spatter":
+            params = {"weapon": local.choice(weapons), "surface": local.choice(SURFACES),
+                      "velocity": local.uniform(5, 40), "angle": local.uniform(10, 80),
+                      "droplets": local.choice([1_000, 10_000, 50_000]), "seed": variant,
+                      "model": local.choice(["scatter", "ballistic"])}
+        else:
+            params = {"kind": "elementary", "rule": local.choice([30, 90, 110, 184]),
+                      "width": local.choice([60, 200, 1000]), "steps": local.choice([40, 100])}
+        requests.append((kind, params))
+    return requests
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def loadtest(host, port, requests=400, concurrency=8, distinct=40, max_hit_ms=None):
+    """Fire a mixed workload from ``concurrency`` threads and report throughput and latency.
+
+    Returns False if the p95 latency of cache hits exceeds ``max_hit_ms`` (or any request failed).
+    """
+    _, data, _, _ = SimulationClient(host, port).request("GET", "/weapons")
+    work = _request_mix(requests, distinct, data["weapons"])
+    results = []  # (kind, latency, status, cache, bytes)
+    lock = threading.Lock()
+    counter = iter(range(len(work)))
+
+    def client():
+        session = SimulationClient(host, port)
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                kind, params = work[i]
+                start = time.perf_counter()
+                status, _, cache, size = session.request("POST", f"/{kind}", params, decode=False)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    results.append((kind, elapsed, status, cache, size))
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[2] == 200]
+    caches = Counter(r[3] for r in ok)
+    print(f"{len(results)} requests in {elapsed:.2f}s with {concurrency} clients: "
+          f"{len(results) / elapsed:.1f} req/s, {sum(r[4] for r in ok) / elapsed / 1e6:.1f} MB/s, "
+          f"{len(results) - len(ok)} errors")
+    print(f"served: {caches.get('hit', 0)} cache hits, {caches.get('shared', 0)} shared, "
+          f"{caches.get('miss', 0)} computed")
+    print(f"{'latency (ms)':<14} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for kind in ["all", "projectile", "spatter", "automaton", "hit", "miss"]:
+        if kind == "all":
+            latencies = [r[1] for r in ok]
+        elif kind in ("hit", "miss"):
+            latencies = [r[1] for r in ok if r[3] == kind]
+        else:
+            latencies = [r[1] for r in ok if r[0] == kind]
+        if latencies:
+            print(f"{kind:<14} {len(latencies):>6} {_percentile(latencies, 50):>8.1f} "
+                  f"{_percentile(latencies, 95):>8.1f} {_percentile(latencies, 99):>8.1f} "
+                  f"{max(latencies) * 1000:>8.1f}")
+    _, stats, _, _ = SimulationClient(host, port).request("GET", "/stats")
+    if stats.get("batches"):
+        print(f"server: {stats['batches']} batches, {stats['mean_batch']:.1f} jobs per batch, "
+              f"{stats['cache_entries']} cached results ({stats['cache_bytes'] / 1e6:.1f} MB)")
+    passed = len(ok) == len(results)
+    hits = [r[1] for r in ok if r[3] == "hit"]
+    if max_hit_ms is not None and hits:
+        p95 = _percentile(hits, 95)
+        within = p95 <= max_hit_ms
+        print(f"cache hit p95 {p95:.1f} ms {'within' if within else 'EXCEEDS'} the {max_hit_ms:g} ms bound")
+        passed = passed and within
+    return passed
+
+
+def _demo_weapons(path):
+    """A small catalogue so a self-hosted load test has weapons to spatter with."""
+    db = open_weapon_db(path, on_error=lambda title, message: None)
+    for name, kind, mult, spread, satellites in [("Knife", "Sharp", 1.0, 0.2, 0.2), ("Bat", "Blunt", 1.5, 0.4, 0.4),
+                                                 ("Pistol", "Firearm", 3.0, 0.1, 0.6)]:
+        db.add_weapon(Weapon(db.next_id(), name, kind, mult, spread, "", "", satellites))
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON simulation service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the service")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=None)
+    serve.add_argument("--weapons-file", default="weapons.json")
+    serve.add_argument("--cache-mb", type=int, default=256)
+    load = sub.add_parser("loadtest", help="measure throughput and latency")
+    load.add_argument("--url", help="host:port of a running service (default: start one with demo weapons)")
+    load.add_argument("--requests", type=int, default=400)
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--distinct", type=int, default=40, help="parameter sets per kind; 0 makes every one unique")
+    load.add_argument("--workers", type=int, default=None)
+    load.add_argument("--max-hit-ms", type=float, default=25.0,
+                      help="fail (exit 1) if the p95 latency of cache hits is above this")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        service = SimulationService(args.workers, args.weapons_file, args.cache_mb << 20)
+        server = make_server(service, args.host, args.port)
+        print(f"Serving simulations on http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+        return
+
+    if args.url:
+        host, port = args.url.rsplit(":", 1)
+        passed = loadtest(host, int(port), args.requests, args.concurrency, args.distinct, args.max_hit_ms)
+        sys.exit(0 if passed else 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        weapons_file = os.path.join(tmp, "weapons.json")
+        _demo_weapons(weapons_file)
+        service = SimulationService(args.workers, weapons_file)
+        server = make_server(service, DEFAULT_HOST, 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            passed = loadtest(DEFAULT_HOST, server.server_address[1], args.requests, args.concurrency,
+                              args.distinct, args.max_hit_ms)
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
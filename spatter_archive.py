@@ -0,0 +1,148 @@
+"""On-disk archive of spatter runs.
+
+Each run is a directory of one .npy file per column (droplet x, y, z and,
+for ballistic runs, every StainSet field) plus ``meta.json`` with its
+parameters (weapon, surface, velocity, angle, seed, ...). Columns are
+reloaded with ``np.load(mmap_mode="r")``, so opening a multi-million
+droplet run is just mapping its files: nothing is read until it is plotted.
+
+``index.jsonl`` next to the runs holds one line of parameters per run. It
+is only ever appended to, and listing or filtering runs reads that file
+alone, never the run directories. A run directory is written under a
+temporary name and renamed into place before its index line is added, so
+a crash never leaves a half-written run in the index. The archive
+directory itself is only created by the first ``save``.
+
+    python spatter_archive.py list --weapon Knife
+    python spatter_archive.py bench
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from spatter import StainSet
+
+STAIN_COLUMNS = [f.name for f in fields(StainSet) if f.name not in ("plane", "airborne")]
+
+
+@dataclass
+class ArchivedRun:
+    id: str
+    params: dict
+    path: str
+
+    def column(self, name):
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    def droplets(self):
+        """x, y, z as read-only memory maps."""
+        return self.column("x"), self.column("y"), self.column("z")
+
+    def stains(self):
+        """The run's StainSet (memory-mapped), or None for a scatter run."""
+        if self.params.get("plane") is None:
+            return None
+        return StainSet(self.params["plane"], airborne=self.params.get("airborne", 0),
+                        **{name: self.column(name) for name in STAIN_COLUMNS})
+
+
+class RunArchive:
+    def __init__(self, root="spatter_runs"):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+
+    def save(self, params, x=None, y=None, z=None, stains=None):
+        """Store a run's droplets (or stains) with its parameters; returns the ArchivedRun."""
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        final = os.path.join(self.root, run_id)
+        partial = final + ".partial"
+        os.makedirs(partial)  # Creates the archive directory too on the first save
+        try:
+            columns = {"x": x, "y": y, "z": z}
+            if stains is not None:
+                columns = {name: getattr(stains, name) for name in STAIN_COLUMNS}
+            for name, values in columns.items():
+                np.save(os.path.join(partial, f"{name}.npy"), np.asarray(values))
+            entry = dict(params, id=run_id, saved=time.time(), droplets=len(columns["x"]),
+                         plane=stains.plane if stains is not None else None)
+            if stains is not None:
+                entry["airborne"] = stains.airborne
+            with open(os.path.join(partial, "meta.json"), "w") as f:
+                json.dump(entry, f, indent=2)
+            os.replace(partial, final)
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return ArchivedRun(run_id, entry, final)
+
+    def entries(self):
+        """Parameters of every run still on disk, oldest first."""
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return [e for e in entries if os.path.isdir(os.path.join(self.root, e["id"]))]
+
+    def find(self, **criteria):
+        """Runs whose parameters equal every given value, e.g. ``find(weapon="Knife", surface="Rough")``."""
+        return [e for e in self.entries() if all(e.get(key) == value for key, value in criteria.items())]
+
+    def load(self, run_id):
+        path = os.path.join(self.root, run_id)
+        with open(os.path.join(path, "meta.json")) as f:
+            return ArchivedRun(run_id, json.load(f), path)
+
+    def delete(self, run_id):
+        """Remove a run's data; its index line stays but is skipped from then on."""
+        shutil.rmtree(os.path.join(self.root, run_id))
+
+
+def benchmark(droplets=(100_000, 1_000_000, 5_000_000)):
+    """Time saving and reopening runs of increasing size."""
+    import tempfile
+
+    from spatter import generate_droplets
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = RunArchive(tmp)
+        print(f"{'droplets':>10} {'save':>7} {'reopen':>8} {'first sum':>10}")
+        for n in droplets:
+            x, y, z = generate_droplets(20.0, 45, 0.3, 0.3, n, rng=0)
+            start = time.perf_counter()
+            run = archive.save({"weapon": "Knife", "surface": "Smooth", "velocity": 20, "angle": 45, "seed": 0},
+                               x, y, z)
+            saved = time.perf_counter() - start
+            start = time.perf_counter()
+            mx, my, mz = archive.load(run.id).droplets()
+            reopened = time.perf_counter() - start
+            start = time.perf_counter()
+            float(mx.sum())
+            summed = time.perf_counter() - start
+            print(f"{len(x):>10,} {saved:>6.3f}s {reopened * 1000:>6.2f}ms {summed:>9.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive of spatter runs")
+    parser.add_argument("command", choices=["list", "bench"])
+    parser.add_argument("--root", default="spatter_runs")
+    parser.add_argument("--weapon")
+    parser.add_argument("--surface")
+    parser.add_argument("--model")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark()
+    else:
+        criteria = {key: value for key, value in
+                    (("weapon", args.weapon), ("surface", args.surface), ("model", args.model)) if value}
+        for e in RunArchive(args.root).find(**criteria):
+            print(f"{e['id']}  {e.get('weapon')}  {e.get('surface')}  {e.get('model')}  v={e.get('velocity')}  "
+                  f"angle={e.get('angle')}  seed={e.get('seed')}  {e['droplets']:,} droplets")
@@ -0,0 +1,181 @@
+"""PDF reports for spatter runs.
+
+The GUI snapshots a run into a ReportData: its parameters, the plots
+already rasterized to PNG (once, on the Tk thread, since matplotlib figures
+aren't thread-safe) and the stain or droplet arrays. ``write_report`` then
+runs on a worker thread. Table rows are formatted a page at a time straight
+from the arrays, so the rows never exist as Python strings all at once, but
+the PDF is not streamed: reportlab's canvas keeps every finished page
+(compressed) in memory until ``save()``. Memory therefore grows with the
+table, roughly 170 bytes per row (about 8 MB peak for 50k rows), and
+``ReportData.max_rows`` caps how many rows are listed; the GUI sets it to
+REPORT_MAX_ROWS. The PDF is written to a temporary file and renamed into
+place, so a cancelled or failed report leaves nothing behind.
+
+``report_worker`` wraps it for the GUI, posting ``("progress", done,
+total)``, ``("done", path)`` or ``("error", exception)`` to a queue that
+the Tk thread polls.
+"""
+import datetime
+import io
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+MARGIN = 50
+ROW_HEIGHT = 11
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+@dataclass
+class ReportData:
+    title: str
+    parameters: dict                             # Label -> value, printed in order
+    images: list = field(default_factory=list)   # (caption, PNG bytes)
+    columns: list = field(default_factory=list)  # (header, array, format) of the table
+    table_title: str = "Stains"
+    max_rows: int = None                         # Rows past this are summarized, not listed
+
+    @property
+    def rows(self):
+        return len(self.columns[0][1]) if self.columns else 0
+
+
+def stain_columns(stains):
+    """Table columns for a spatter.StainSet or stain_detection.StainTable."""
+    image = stains.plane == "image"
+    unit, factor = ("px", 1.0) if image else ("mm", 1000.0)
+    columns = [
+        ("u" if image else "U (m)", stains.u, "{:.1f}" if image else "{:.3f}"),
+        ("v" if image else "V (m)", stains.v, "{:.1f}" if image else "{:.3f}"),
+        (f"Width ({unit})", stains.width * factor, "{:.2f}"),
+        (f"Length ({unit})", stains.length * factor, "{:.2f}"),
+        ("Direction (°)", np.degrees(stains.orientation), "{:.1f}"),
+    ]
+    if not image:
+        columns.append(("Impact (°)", np.degrees(stains.impact_angle), "{:.1f}"))
+    return columns
+
+
+def droplet_columns(x, y, z):
+    return [("X (m)", x, "{:.3f}"), ("Y (m)", y, "{:.3f}"), ("Z (m)", z, "{:.3f}")]
+
+
+def summary_lines(data):
+    """Count, centroid and spread of the first two table columns."""
+    if not data.rows:
+        return ["No stains or droplets"]
+    (name_u, u, _), (name_v, v, _) = data.columns[:2]
+    return [
+        f"Rows: {data.rows:,}",
+        f"Centroid: {name_u} {np.mean(u):.3f}, {name_v} {np.mean(v):.3f}",
+        f"Spread (std): {name_u} {np.std(u):.3f}, {name_v} {np.std(v):.3f}",
+    ]
+
+
+def _check(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ReportCancelled("Report cancelled")
+
+
+def write_report(path, data, progress=None, cancel=None, pagesize=letter):
+    """Write ``data`` as a PDF to ``path``; ``progress(done, total)`` is called once per page.
+
+    All pages are held in memory until the final save, so set ``data.max_rows`` for large tables.
+    """
+    width, height = pagesize
+    rows = data.rows if data.max_rows is None else min(data.rows, data.max_rows)
+    rows_per_page = int((height - 2 * MARGIN - 3 * ROW_HEIGHT) // ROW_HEIGHT)
+    table_pages = -(-rows // rows_per_page)
+    total = 1 + len(data.images) + table_pages
+
+    tmp = path + ".partial"
+    try:
+        pdf = canvas.Canvas(tmp, pagesize=pagesize, pageCompression=1)
+        pdf.setTitle(data.title)
+        done = 0
+
+        # Title page: parameters and summary
+        y = height - MARGIN
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(MARGIN, y, data.title)
+        y -= 20
+        pdf.setFont("Helvetica", 9)
+        pdf.drawString(MARGIN, y, datetime.datetime.now().strftime("Generated %Y-%m-%d %H:%M"))
+        y -= 30
+        pdf.setFont("Helvetica", 11)
+        for label, value in list(data.parameters.items()) + [(None, line) for line in summary_lines(data)]:
+            pdf.drawString(MARGIN, y, f"{label}: {value}" if label else str(value))
+            y -= 16
+        pdf.showPage()
+        done += 1
+        if progress:
+            progress(done, total)
+
+        for caption, png in data.images:
+            _check(cancel)
+            image = ImageReader(io.BytesIO(png))
+            iw, ih = image.getSize()
+            scale = min((width - 2 * MARGIN) / iw, (height - 2 * MARGIN - 30) / ih)
+            pdf.setFont("Helvetica-Bold", 12)
+            pdf.drawString(MARGIN, height - MARGIN, caption)
+            pdf.drawImage(image, MARGIN, height - MARGIN - 20 - ih * scale, iw * scale, ih * scale)
+            pdf.showPage()
+            done += 1
+            if progress:
+                progress(done, total)
+
+        headers = ["#"] + [header for header, _, _ in data.columns]
+        col_width = (width - 2 * MARGIN) / len(headers)
+        for page in range(table_pages):
+            _check(cancel)
+            start, stop = page * rows_per_page, min((page + 1) * rows_per_page, rows)
+            y = height - MARGIN
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(MARGIN, y, f"{data.table_title} {start + 1:,}-{stop:,} of {data.rows:,}")
+            y -= 2 * ROW_HEIGHT
+            for i, header in enumerate(headers):
+                pdf.drawString(MARGIN + i * col_width, y, header)
+            # Only this page's slice is ever turned into strings, one text block per column
+            cells = [[str(i) for i in range(start + 1, stop + 1)]]
+            cells += [[fmt.format(value) for value in values[start:stop].tolist()] for _, values, fmt in data.columns]
+            for i, column in enumerate(cells):
+                text = pdf.beginText(MARGIN + i * col_width, y - ROW_HEIGHT)
+                text.setFont("Helvetica", 8, leading=ROW_HEIGHT)
+                text.textLines(column)
+                pdf.drawText(text)
+            pdf.showPage()
+            done += 1
+            if progress:
+                progress(done, total)
+
+        _check(cancel)
+        pdf.save()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def report_worker(path, data, queue, cancel=None):
+    """Thread target: write the report, posting progress and the outcome to ``queue``."""
+    try:
+        write_report(path, data, lambda done, total: queue.put(("progress", done, total)), cancel)
+        queue.put(("done", path))
+    except Exception as e:
+        queue.put(("error", e))
+
+
+def figure_png(figure, dpi=150):
+    """Rasterize a matplotlib figure to PNG bytes; call from the thread that owns the figure."""
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=dpi)
+    return buffer.getvalue()
@@ -0,0 +1,176 @@
+"""Headless parameter sweeps over weapons x surfaces x velocities x angles.
+
+Every case of the grid is simulated with the same model as "Run Simulation"
+in "blood simulation.py" and reduced to a row of summary metrics (droplet
+count, satellite ratio, centroid, spread, reach). Cases run on a process
+pool; each one draws from its own ``SeedSequence.spawn`` child, handed out
+in grid order, so a given seed gives the same table whatever the worker
+count or scheduling. Results are written column by column to an .npz file
+(or Parquet, when the path ends in .parquet and pyarrow is installed).
+
+    python spatter_sweep.py --velocities 10 20 30 40 --angles 15 45 75 --out sweep.npz
+    python spatter_sweep.py bench
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from spatter import generate_droplets, launch_cone, simulate_droplet_flight, surface_spread
+from weapons import WeaponDB
+
+SURFACES = ("Smooth", "Rough", "Fabric")
+
+# Output columns, in order; the first two hold strings
+COLUMNS = ["weapon", "surface", "velocity", "angle", "droplets", "satellite_ratio", "centroid_x", "centroid_y",
+           "spread_x", "spread_y", "spread", "reach"]
+
+
+@dataclass
+class SweepConfig:
+    weapons_file: str = "weapons.json"
+    weapons: Optional[tuple] = None    # Names to include; None for the whole catalogue
+    surfaces: tuple = SURFACES
+    velocities: tuple = (10.0, 20.0, 30.0, 40.0)
+    angles: tuple = (15.0, 30.0, 45.0, 60.0, 75.0)
+    droplets: int = 10_000
+    model: str = "scatter"             # "scatter" or "ballistic" (floor stains)
+    seed: int = 0
+
+
+def sweep_cases(config):
+    """The grid as a list of (weapon, surface, velocity, angle), in a fixed order."""
+    db = WeaponDB(config.weapons_file)
+    weapons = [w for w in db.weapons if config.weapons is None or w.name in config.weapons]
+    if not weapons:
+        raise ValueError(f"No weapons to sweep in {config.weapons_file}")
+    return list(itertools.product(weapons, config.surfaces, config.velocities, config.angles))
+
+
+def run_case(case, seed_seq, droplets, model):
+    """Simulate one case and return its metrics row (without the weapon/surface labels)."""
+    weapon, surface, velocity, angle = case
+    rng = np.random.default_rng(seed_seq)
+    launch = velocity * weapon.velocity_mult
+    if model == "ballistic":
+        cone = launch_cone(weapon.spread_factor, surface)
+        stains = simulate_droplet_flight(launch, angle, cone, droplets, rng=rng, surface_type=surface)
+        x, y = stains.x, stains.y
+        satellite_ratio = np.nan  # Ballistic droplets have no primary/satellite split
+    else:
+        spread = surface_spread(weapon.spread_factor, surface)
+        x, y, _, parent = generate_droplets(launch, angle, spread, weapon.satellite_chance, droplets, rng=rng,
+                                            return_parent=True)
+        satellite_ratio = np.count_nonzero(parent >= 0) / len(parent)
+    if not len(x):
+        return (velocity, angle, 0, satellite_ratio) + (np.nan,) * 6
+    spread_x, spread_y = x.std(), y.std()
+    return (velocity, angle, len(x), satellite_ratio, x.mean(), y.mean(), spread_x, spread_y,
+            np.hypot(spread_x, spread_y), np.sqrt((x * x + y * y).max()))
+
+
+def run_sweep(config, workers=None):
+    """Run every case; returns ``{column: array}`` in grid order."""
+    cases = sweep_cases(config)
+    n = len(cases)
+    seeds = np.random.SeedSequence(config.seed).spawn(n)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [run_case(case, seed_seq, config.droplets, config.model) for case, seed_seq in zip(cases, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(run_case, cases, seeds, [config.droplets] * n, [config.model] * n,
+                                 chunksize=max(1, n // (4 * workers))))
+
+    values = np.array(rows, dtype=float).reshape(n, len(COLUMNS) - 2)
+    table = {"weapon": np.array([case[0].name for case in cases]), "surface": np.array([case[1] for case in cases])}
+    for i, name in enumerate(COLUMNS[2:]):
+        table[name] = values[:, i]
+    table["droplets"] = table["droplets"].astype(np.int64)
+    return table
+
+
+def save_table(path, table, config=None):
+    """Write the sweep table column by column: Parquet for .parquet paths, .npz otherwise."""
+    if path.lower().endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table({name: table[name] for name in COLUMNS}), path)
+        return
+    extra = {}
+    if config is not None:
+        extra = {"seed": np.int64(config.seed), "model": np.array(config.model),
+                 "droplets_per_case": np.int64(config.droplets)}
+    np.savez(path, **{name: table[name] for name in COLUMNS}, **extra)
+
+
+def load_table(path):
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return {name: column.to_numpy() for name, column in zip(COLUMNS, pq.read_table(path).columns)}
+    with np.load(path) as data:
+        return {name: data[name] for name in COLUMNS}
+
+
+def benchmark(droplets=20_000):
+    """Report cases/second for increasing worker counts on a 3 x 3 x 4 x 5 grid of built-in weapons."""
+    import tempfile
+
+    from weapons import Weapon
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "weapons.json")
+        db = WeaponDB(path, on_error=lambda title, message: None)
+        for name, kind, mult, spread, satellites in [("Knife", "Sharp", 1.0, 0.2, 0.2),
+                                                     ("Bat", "Blunt", 1.5, 0.4, 0.4),
+                                                     ("Pistol", "Firearm", 3.0, 0.1, 0.6)]:
+            db.add_weapon(Weapon(db.next_id(), name, kind, mult, spread, "", "", satellites))
+        config = SweepConfig(weapons_file=path, droplets=droplets)
+        cpus = os.cpu_count() or 1
+        reference = None
+        for workers in sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))):
+            start = time.perf_counter()
+            table = run_sweep(config, workers=workers)
+            elapsed = time.perf_counter() - start
+            same = reference is None or all(np.array_equal(table[c], reference[c], equal_nan=True)
+                                            for c in COLUMNS[2:])
+            reference = reference or table
+            print(f"{workers:>3} worker(s): {len(table['weapon'])} cases in {elapsed:.2f}s "
+                  f"({len(table['weapon']) / elapsed:.1f} cases/s){'' if same else '  MISMATCH'}")
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Spatter sweeps over weapons x surfaces x velocities x angles")
+    parser.add_argument("command", nargs="?", choices=["run", "bench"], default="run")
+    parser.add_argument("--weapons-file", default="weapons.json")
+    parser.add_argument("--weapons", nargs="+", help="weapon names (default: all)")
+    parser.add_argument("--surfaces", nargs="+", default=list(SURFACES))
+    parser.add_argument("--velocities", type=float, nargs="+", default=list(SweepConfig.velocities))
+    parser.add_argument("--angles", type=float, nargs="+", default=list(SweepConfig.angles))
+    parser.add_argument("--droplets", type=int, default=10_000)
+    parser.add_argument("--model", choices=["scatter", "ballistic"], default="scatter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep.npz")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        benchmark(args.droplets)
+        return
+
+    config = SweepConfig(args.weapons_file, tuple(args.weapons) if args.weapons else None, tuple(args.surfaces),
+                         tuple(args.velocities), tuple(args.angles), args.droplets, args.model, args.seed)
+    start = time.perf_counter()
+    table = run_sweep(config, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    save_table(args.out, table, config)
+    print(f"{len(table['weapon'])} cases x {config.droplets:,} droplets in {elapsed:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
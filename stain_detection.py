@@ -0,0 +1,281 @@
+"""Stain detection for photographed spatter scenes.
+
+Finds blood stains in a photo and fits an ellipse to each, giving the same
+kind of stain table the ballistic simulation produces, so it can go into
+spatter_reconstruction.estimate_origin. A photo only gives each stain's
+long axis, not which way along it the drop travelled, so the table is
+marked non-directional and estimate_origin assumes the stains travelled
+away from the area of convergence when it estimates the height:
+
+  1. the image is decoded once into an uncompressed .npy in a cache
+     directory (or used as is when it already is one) and memory-mapped from
+     then on; the least recently used decodes are deleted once the cache
+     outgrows CACHE_MAX_BYTES,
+  2. the scene is cut into tiles that are read with a margin of ``overlap``
+     pixels on each side, and a process pool segments blood-coloured pixels
+     in HSV, extracts contours and fits ellipses tile by tile,
+  3. each stain is kept only by the tile whose core holds its centre, so
+     stains crossing tile borders are neither lost nor counted twice as long
+     as ``overlap`` is larger than the biggest stain.
+
+Workers map the cache themselves and only ever touch their own tile, so
+memory use stays at a few tiles per worker whatever the scene size.
+
+    python stain_detection.py detect scene.jpg --out stains.csv
+    python stain_detection.py bench --megapixels 100
+    python stain_detection.py clear-cache
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# Blood-coloured pixels in OpenCV's HSV (hue runs 0-179 and red wraps around 0)
+RED_RANGES = (((0, 70, 30), (10, 255, 255)), ((165, 70, 30), (179, 255, 255)))
+
+# Decoded images are ~3 bytes per pixel (300 MB for a 100 MP photo)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "spatter-image-cache")
+CACHE_MAX_BYTES = 2 << 30
+
+
+@dataclass
+class StainTable:
+    """Stain ellipses found in an image.
+
+    ``u``/``v`` are the stain centres in pixels (v pointing down, as in the
+    image) times ``scale``; ``orientation`` is the long axis in radians from
+    +u, folded into [0, pi) since a still photo doesn't say which way the
+    drop was travelling.
+    """
+    directional = False  # Orientation is an axis, not a direction; see spatter_reconstruction.estimate_origin
+    u: np.ndarray
+    v: np.ndarray
+    width: np.ndarray
+    length: np.ndarray
+    orientation: np.ndarray
+    area: np.ndarray
+    scale: float = 1.0  # Scene units per pixel
+    plane: str = "image"
+
+    def __len__(self):
+        return len(self.u)
+
+    def save_csv(self, path):
+        np.savetxt(path, np.column_stack([self.u, self.v, self.width, self.length, self.orientation, self.area]),
+                   delimiter=",", fmt="%.6g", header="u,v,width,length,orientation,area", comments="")
+
+
+def _cache_entries(cache_dir):
+    """(mtime, size, path) of every finished decode in the cache, oldest first."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npy") and not name.endswith(".partial.npy"):
+            path = os.path.join(cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return sorted(entries)
+
+
+def evict_cache(cache_dir=None, max_bytes=CACHE_MAX_BYTES, keep=None):
+    """Delete the least recently used decodes until the cache holds at most ``max_bytes``; returns bytes freed.
+
+    Mapped files can be unlinked on POSIX (the mapping stays valid); where
+    they can't, they are skipped and go on a later call.
+    """
+    entries = _cache_entries(cache_dir or CACHE_DIR)
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in entries:
+        if total - freed <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        freed += size
+    return freed
+
+
+def clear_cache(cache_dir=None):
+    """Delete every cached decode; returns bytes freed."""
+    if not os.path.isdir(cache_dir or CACHE_DIR):
+        return 0
+    return evict_cache(cache_dir, max_bytes=0)
+
+
+def open_image(path, cache_dir=None, max_cache_bytes=CACHE_MAX_BYTES):
+    """The image as a read-only (h, w, 3) BGR uint8 memmap, decoding it into a .npy cache on first use.
+
+    The cache lives in ``cache_dir`` (CACHE_DIR by default); using an entry
+    marks it recently used, and adding one evicts the least recently used
+    beyond ``max_cache_bytes``.
+    """
+    if path.lower().endswith(".npy"):
+        return np.load(path, mmap_mode="r"), path
+    stat = os.stat(path)
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    # Same-named photos from different folders, or a file rewritten within a second, get their own entries
+    key = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}".encode(errors="surrogateescape")
+    name = f"{os.path.basename(path)}.{hashlib.sha256(key).hexdigest()[:32]}.npy"
+    cache = os.path.join(cache_dir, name)
+    if os.path.exists(cache):
+        os.utime(cache)
+    else:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image: {path}")
+        partial = cache + ".partial.npy"
+        np.save(partial, image)
+        del image
+        os.replace(partial, cache)  # Never leave a half-written cache behind
+        evict_cache(cache_dir, max_cache_bytes, keep=cache)
+    return np.load(cache, mmap_mode="r"), cache
+
+
+def tile_grid(height, width, tile=2048):
+    """Cores ``(y0, y1, x0, x1)`` of the tiles covering the image."""
+    return [(y, min(y + tile, height), x, min(x + tile, width))
+            for y in range(0, height, tile) for x in range(0, width, tile)]
+
+
+def segment(tile, ranges=RED_RANGES, open_size=3):
+    """Binary mask of blood-coloured pixels, with specks smaller than ``open_size`` opened away."""
+    hsv = cv2.cvtColor(tile, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, np.array(ranges[0][0]), np.array(ranges[0][1]))
+    for lo, hi in ranges[1:]:
+        mask |= cv2.inRange(hsv, np.array(lo), np.array(hi))
+    if open_size > 1:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (open_size, open_size))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    return mask
+
+
+def detect_tile(path, core, overlap=128, min_area=12.0, ranges=RED_RANGES):
+    """Stains whose centre lies in ``core``, as rows of (u, v, width, length, orientation, area) in pixels."""
+    image = np.load(path, mmap_mode="r")
+    height, width = image.shape[:2]
+    y0, y1, x0, x1 = core
+    top, left = max(y0 - overlap, 0), max(x0 - overlap, 0)
+    tile = np.ascontiguousarray(image[top:min(y1 + overlap, height), left:min(x1 + overlap, width)])
+    contours, _ = cv2.findContours(segment(tile, ranges), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+
+    rows = []
+    for contour in contours:
+        if len(contour) < 5:  # fitEllipse needs five points
+            continue
+        area = cv2.contourArea(contour)
+        if area < min_area:
+            continue
+        (cx, cy), (d1, d2), angle = cv2.fitEllipse(contour)
+        cx += left
+        cy += top
+        if not (x0 <= cx < x1 and y0 <= cy < y1):
+            continue  # Belongs to a neighbouring tile
+        if d2 > d1:
+            d1, d2, angle = d2, d1, angle + 90
+        rows.append((cx, cy, d2, d1, np.radians(angle) % np.pi, area))
+    return np.array(rows, dtype=float).reshape(-1, 6)
+
+
+def detect_stains(path, tile=2048, overlap=128, min_area=12.0, scale=1.0, workers=None, ranges=RED_RANGES,
+                  cache_dir=None):
+    """Detect every stain in the image at ``path`` across a pool of ``workers`` processes."""
+    image, source = open_image(path, cache_dir)
+    cores = tile_grid(image.shape[0], image.shape[1], tile)
+    del image
+    workers = workers or os.cpu_count() or 1
+    n = len(cores)
+    if workers == 1 or n == 1:
+        parts = [detect_tile(source, core, overlap, min_area, ranges) for core in cores]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(detect_tile, [source] * n, cores, [overlap] * n, [min_area] * n, [ranges] * n,
+                                  chunksize=max(1, n // (4 * workers))))
+    rows = np.concatenate(parts) if parts else np.empty((0, 6))
+    u, v, width, length, orientation, area = rows.T
+    return StainTable(u * scale, v * scale, width * scale, length * scale, orientation, area * scale * scale, scale)
+
+
+def thumbnail(image, max_size=1024):
+    """Downsampled RGB copy of a (memory-mapped) BGR image for display."""
+    step = max(1, -(-max(image.shape[:2]) // max_size))
+    return np.ascontiguousarray(image[::step, ::step, ::-1])
+
+
+def synthetic_scene(path, megapixels=100, stains_per_megapixel=200, max_axis=40, rng=None, strip=1024):
+    """Write a light background scattered with red ellipses to ``path`` (.npy); returns the stain count."""
+    rng = np.random.default_rng(rng)
+    side = int(np.sqrt(megapixels * 1e6))
+    n = int(megapixels * stains_per_megapixel)
+    cx, cy = rng.uniform(0, side, n), rng.uniform(0, side, n)
+    length = rng.uniform(6, max_axis, n)
+    width = length * rng.uniform(0.3, 1.0, n)
+    angle = rng.uniform(0, 180, n)
+
+    image = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(side, side, 3))
+    for top in range(0, side, strip):
+        bottom = min(top + strip, side)
+        block = np.full((bottom - top, side, 3), 225, dtype=np.uint8)
+        near = np.flatnonzero((cy > top - max_axis) & (cy < bottom + max_axis))
+        for i in near:
+            cv2.ellipse(block, (int(cx[i]), int(cy[i]) - top), (int(length[i] / 2), int(width[i] / 2)),
+                        angle[i], 0, 360, (20, 20, 140), -1)
+        image[top:bottom] = block
+    image.flush()
+    return n
+
+
+def benchmark(megapixels=100, workers=None, tile=2048):
+    """Detect stains in a synthetic scene and report throughput."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scene.npy")
+        start = time.perf_counter()
+        n = synthetic_scene(path, megapixels, rng=0)
+        print(f"Synthetic {megapixels} MP scene with {n:,} drawn stains in {time.perf_counter() - start:.2f}s")
+        cpus = os.cpu_count() or 1
+        counts = [workers] if workers else sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+        for count in counts:
+            start = time.perf_counter()
+            stains = detect_stains(path, tile=tile, workers=count)
+            elapsed = time.perf_counter() - start
+            print(f"{count:>3} worker(s): {len(stains):,} stains in {elapsed:.2f}s "
+                  f"({megapixels / elapsed:.1f} MP/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stain detection for spatter photos")
+    parser.add_argument("command", choices=["detect", "bench", "clear-cache"])
+    parser.add_argument("image", nargs="?")
+    parser.add_argument("--out", help="write the stain table as CSV here")
+    parser.add_argument("--tile", type=int, default=2048)
+    parser.add_argument("--overlap", type=int, default=128)
+    parser.add_argument("--min-area", type=float, default=12.0)
+    parser.add_argument("--scale", type=float, default=1.0, help="scene units per pixel")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--megapixels", type=float, default=100)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark(args.megapixels, args.workers, args.tile)
+    elif args.command == "clear-cache":
+        print(f"Freed {clear_cache() / 1e6:.1f} MB from {CACHE_DIR}")
+    else:
+        if not args.image:
+            parser.error("detect needs an image")
+        start = time.perf_counter()
+        stains = detect_stains(args.image, args.tile, args.overlap, args.min_area, args.scale, args.workers)
+        print(f"{len(stains):,} stains in {time.perf_counter() - start:.2f}s")
+        if args.out:
+            stains.save_csv(args.out)
@@ -0,0 +1,85 @@
+"""Cold-start import times of the apps and their compute modules.
+
+Every measurement runs in a fresh interpreter, so nothing is already in
+sys.modules. "blood simulation.py" is executed without starting its main
+loop, once as it is and once with everything it used to import up front:
+pyplot, the 3D toolkit, the Tk canvas, the spatial index, the run archive,
+OpenCV, PIL, reportlab, the stain detector and the report writer. This
+times the module import only; building the window still loads matplotlib
+and the Tk canvas. The compute modules are checked to import without
+pulling in tkinter.
+
+    python startup_bench.py
+    python startup_bench.py --repeat 9
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ["tkinter", "matplotlib.pyplot", "mpl_toolkits.mplot3d", "matplotlib.backends.backend_tkagg", "cv2",
+         "PIL.ImageTk", "reportlab.pdfgen.canvas"]
+EAGER = ("import matplotlib.pyplot, mpl_toolkits.mplot3d.art3d, matplotlib.collections, matplotlib.colors, "
+         "matplotlib.backends.backend_tkagg, spatter_index, spatter_archive, "
+         "cv2, PIL.ImageTk, PIL.ImageDraw, reportlab.pdfgen.canvas, stain_detection, spatter_report")
+GUI = 'runpy.run_path("blood simulation.py", run_name="blood_simulation")'
+
+# (label, statement timed in the child)
+TARGETS = [
+    ("blood simulation.py, eager imports", f"{EAGER}; {GUI}"),
+    ("blood simulation.py", GUI),
+    ("spatter.simulate_blood_spatter", "from spatter import simulate_blood_spatter"),
+    ("projectile.Projectile", "from projectile import Projectile"),
+    ("auto.apply_rule", "from auto import apply_rule"),
+]
+
+CHILD = """
+import json, runpy, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(statement, repeat=5):
+    """Median import time of ``statement`` over fresh interpreters, and the heavy modules it loaded."""
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    code = CHILD.format(statement=statement, heavy=HEAVY)
+    times, walls = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, capture_output=True, text=True,
+                             check=True).stdout
+        walls.append(time.perf_counter() - start)
+        result = json.loads(out.strip().splitlines()[-1])
+        times.append(result["seconds"])
+    return statistics.median(times), statistics.median(walls), result["loaded"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import times")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'target':<36} {'import':>8} {'process':>8}  heavy modules loaded")
+    baseline = None
+    for label, statement in TARGETS:
+        try:
+            seconds, wall, loaded = measure(statement, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{label:<36} failed: {e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e}")
+            continue
+        print(f"{label:<36} {seconds * 1000:>6.0f}ms {wall * 1000:>6.0f}ms  {', '.join(loaded) or '-'}")
+        if baseline is None:
+            baseline = seconds
+        elif label == "blood simulation.py":
+            print(f"{'':<36} {baseline / seconds:>7.1f}x faster than eager")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from currency import CurrencySimulator
+from frame_timing import FrameTimer
+
+
+class Flag:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class CountingCanvas(FigureCanvasAgg):
+    def __init__(self, figure):
+        super().__init__(figure)
+        self.draws = 0
+        self.blits = 0
+
+    def draw(self):
+        self.draws += 1
+        super().draw()
+
+    def blit(self, bbox=None):
+        self.blits += 1
+
+
+def make_simulator():
+    """The chart half of CurrencySimulator on an Agg canvas, without the Tk widgets."""
+    app = CurrencySimulator.__new__(CurrencySimulator)
+    app.fig = Figure(figsize=(8, 4))
+    app.canvas = CountingCanvas(app.fig)
+    app.ax = app.fig.add_subplot()
+    app.timing = FrameTimer()
+    app.data_points_count = 12
+    app.tick_rate = 1.0
+    app.ema_spans, app.analytics_windows = (20,), (20, 100)
+    app.inr_label, app.rub_label = "INR", "RUB"
+    app.show_analytics_var = Flag(False)
+    app.time_history, app.rate_history1, app.rate_history2 = [], [], []
+    app.history_view = False
+    app.background = None
+    app.init_graph()
+    app.reset_graph_limits()
+    return app
+
+
+def tick(app, t, rate1, rate2):
+    app.time_history.append(t)
+    app.rate_history1.append(rate1)
+    app.rate_history2.append(rate2)
+    app.update_graph()
+
+
+def test_update_graph_reuses_artists_and_blits_inside_the_limits():
+    app = make_simulator()
+    artists = list(app.ax.get_children())
+    line1, labels = app.line1, list(app.point_labels1)
+
+    tick(app, 0.0, 73.0, 71.0)
+    assert app.canvas.draws == 1 and app.background is not None  # First frame rescales
+    x_limits, y_limits = app.ax.get_xlim(), app.ax.get_ylim()
+
+    # Small moves inside the padded view are blitted onto the cached background
+    for t in range(1, 4):
+        tick(app, 0.25 * t, 73.0 + 0.001 * t, 71.0 - 0.001 * t)
+    assert app.canvas.draws == 1 and app.canvas.blits == 3
+    assert (app.ax.get_xlim(), app.ax.get_ylim()) == (x_limits, y_limits)
+
+    # Leaving the view forces one full redraw, then blitting resumes
+    tick(app, 50.0, 73.0, 71.0)
+    assert app.canvas.draws == 2 and app.ax.get_xlim()[1] >= 50.0
+    tick(app, 50.5, 73.0, 71.0)
+    assert app.canvas.draws == 2 and app.canvas.blits == 4
+    tick(app, 51.0, 90.0, 71.0)
+    assert app.canvas.draws == 3 and app.ax.get_ylim()[1] >= 90.0
+
+    assert app.line1 is line1 and app.point_labels1 == labels
+    assert list(app.ax.get_children()) == artists
+    assert list(line1.get_xdata()) == app.time_history[-app.data_points_count:]
+    assert [label.get_visible() for label in labels].count(True) == len(app.time_history)
@@ -0,0 +1,110 @@
+import csv
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+from currency_analytics import (EMA, AnalyticsStage, CandleBuilder, RollingMinMax, RollingStats, StreamAnalytics,
+                                write_tick_log)
+
+
+def read_candles(path):
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+
+def test_export_candles_is_consistent_while_producer_runs(tmp_path):
+    analytics = StreamAnalytics(candle_intervals=(1, 10, 60))
+    rng = np.random.default_rng(0)
+    stop = threading.Event()
+
+    def produce():
+        t = 0.0
+        while not stop.is_set():
+            times = list(t + np.arange(50) * 0.05)
+            t = times[-1] + 0.05
+            analytics.update_batch(times, list(73 + rng.normal(0, 0.1, 50)), list(71 + rng.normal(0, 0.1, 50)))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    try:
+        for k in range(100):
+            paths = analytics.export_candles(str(tmp_path / f"run{k}"))
+            # Every interval covers the same ticks when the export sees a single batch boundary
+            totals = {sum(int(row["ticks"]) for row in read_candles(path) if row["pair"] == "INR") for path in paths}
+            assert len(totals) == 1
+    finally:
+        stop.set()
+        producer.join()
+
+
+def test_indicator_batches_match_per_tick_updates_and_brute_force():
+    rng = np.random.default_rng(1)
+    xs = list(70 + np.cumsum(rng.normal(0, 0.1, 500)))
+    window = 20
+
+    ema, ema_batch = EMA(20), EMA(20)
+    expected = [ema.update(x) for x in xs]
+    got = ema_batch.update_batch(xs[:7]) + ema_batch.update_batch(xs[7:])
+    np.testing.assert_allclose(got, expected)
+
+    stats = RollingStats(window)
+    means, stds = stats.update_batch(xs[:33])
+    more_means, more_stds = stats.update_batch(xs[33:])
+    means, stds = means + more_means, stds + more_stds
+    extremes = RollingMinMax(window)
+    mins, maxs = extremes.update_batch(xs[:50])
+    more_mins, more_maxs = extremes.update_batch(xs[50:])
+    mins, maxs = mins + more_mins, maxs + more_maxs
+    for i in range(len(xs)):
+        recent = xs[max(i + 1 - window, 0):i + 1]
+        assert means[i] == pytest.approx(np.mean(recent), abs=1e-9)
+        assert stds[i] == pytest.approx(np.std(recent, ddof=1) if len(recent) > 1 else 0.0, abs=1e-9)
+        assert (mins[i], maxs[i]) == (min(recent), max(recent))
+    assert stats.mean == pytest.approx(np.mean(xs[-window:]))
+    assert stats.std == pytest.approx(np.std(xs[-window:], ddof=1))
+
+
+def test_candles_match_brute_force_grouping():
+    rng = np.random.default_rng(2)
+    times = list(np.cumsum(rng.exponential(0.3, 400)))
+    xs = list(70 + rng.normal(0, 1, 400))
+    batched, single = CandleBuilder(10), CandleBuilder(10)
+    for lo in range(0, 400, 37):
+        batched.update_batch(times[lo:lo + 37], xs[lo:lo + 37])
+    for t, x in zip(times, xs):
+        single.update(t, x)
+
+    buckets = {}
+    for t, x in zip(times, xs):
+        buckets.setdefault(np.floor(t / 10) * 10, []).append(x)
+    expected = [(start, v[0], max(v), min(v), v[-1], len(v)) for start, v in sorted(buckets.items())]
+    assert batched.all_candles() == pytest.approx(expected)
+    assert single.all_candles() == pytest.approx(expected)
+
+
+def test_stage_adds_indicator_columns_and_tick_log_round_trips(tmp_path):
+    analytics = StreamAnalytics(ema_spans=(5,), windows=(10,), candle_intervals=(1,))
+    q = queue.Queue()
+    stage = AnalyticsStage(analytics, q)
+    times = [0.1 * i for i in range(30)]
+    inr, rub = [73.0 + 0.01 * i for i in range(30)], [71.0 - 0.01 * i for i in range(30)]
+    stage.put((times, inr, rub))
+    error = RuntimeError("feed down")
+    stage.put(error)
+
+    batch_times, batch_inr, batch_rub, indicators = q.get_nowait()
+    assert (batch_times, batch_inr, batch_rub) == (times, inr, rub)
+    assert list(indicators) == ["ema5", "mean10", "vol10", "min10", "max10"]
+    assert indicators["min10"][1][-1] == min(rub[-10:])
+    assert q.get_nowait() is error
+
+    path = tmp_path / "ticks.csv"
+    write_tick_log(str(path), ("INR", "RUB"), times, [inr, rub], indicators)
+    with open(path) as f:
+        header = f.readline().strip().split(",")
+    assert header[:3] == ["time", "INR", "RUB"] and "RUB_max10" in header
+    data = np.loadtxt(path, delimiter=",", skiprows=1)
+    np.testing.assert_allclose(data[:, header.index("INR_mean10")], indicators["mean10"][0], atol=1e-6)
+    np.testing.assert_allclose(data[:, 2], rub, atol=1e-6)
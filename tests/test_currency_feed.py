@@ -0,0 +1,127 @@
+import queue
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from currency_feed import (FeedClient, TickReplayer, align_ticks, in_order, load_csv_ticks, load_ticks,
+                           parse_feed_block, save_binary_ticks)
+
+
+def drain(q):
+    times, r1, r2 = [], [], []
+    while not q.empty():
+        batch = q.get_nowait()
+        times += batch[0]
+        r1 += batch[1]
+        r2 += batch[2]
+    return times, r1, r2
+
+
+def run_client(*chunks):
+    """Serve ``chunks`` to one FeedClient and return it with everything it queued."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            for chunk in chunks:
+                conn.sendall(chunk)
+
+    threading.Thread(target=serve, daemon=True).start()
+    q = queue.Queue()
+    client = FeedClient(port=server.getsockname()[1])
+    try:
+        client.run(q, threading.Event())  # Returns when the server closes the connection
+    finally:
+        server.close()
+    return client, drain(q)
+
+
+def test_parse_feed_block_drops_malformed_lines():
+    rows, dropped = parse_feed_block(b"0.0,73.1,71.1\n0.1,73.2,71.0", 3)
+    np.testing.assert_array_equal(rows, [[0.0, 73.1, 71.1], [0.1, 73.2, 71.0]])
+    assert dropped == 0
+
+    block = b"0.0,73.1,71.1\n0.1,73.2\n0.2,7x.2,71.0\n\n0.3,73.3,71.2,5\n0.4,nan,71.0\n0.5,73.5,71.5"
+    rows, dropped = parse_feed_block(block, 3)
+    np.testing.assert_array_equal(rows[:, 0], [0.0, 0.5])
+    assert dropped == 4
+
+    rows, dropped = parse_feed_block(b"1,2\n3,4", 3)
+    assert rows.shape == (0, 3) and dropped == 2
+
+
+def test_feed_client_survives_garbled_lines():
+    client, (times, inr, rub) = run_client(b"time,INR,RUB\n0.0,73.0,71.0\n0.1,73.1,71.1\n0.2,garbage\n",
+                                           b"0.3,73.3,71.3\n0.4,73.4", b",71.4\n")
+    np.testing.assert_allclose(times, [0.0, 0.1, 0.3, 0.4])
+    np.testing.assert_allclose(inr, [73.0, 73.1, 73.3, 73.4])
+    np.testing.assert_allclose(rub, [71.0, 71.1, 71.3, 71.4])
+    assert client.dropped == 1
+
+
+def test_in_order_drops_ticks_that_go_back_in_time():
+    np.testing.assert_array_equal(in_order(np.array([1.0, 2.0, 1.5, 2.0, 3.0])), [1, 1, 0, 1, 1])
+    np.testing.assert_array_equal(in_order(np.array([0.5, 1.0, 0.9]), after=0.8), [0, 1, 0])
+
+
+def test_feed_client_finds_time_by_name_and_drops_out_of_order_ticks():
+    client, (times, inr, rub) = run_client(b"RUB,time,INR\n71.0,10.0,73.0\n71.1,10.1,73.1\n",
+                                           b"71.2,10.05,73.2\n71.3,10.3,73.3\n71.4,10.2,73.4\n")
+    np.testing.assert_allclose(times, [0.0, 0.1, 0.3])
+    np.testing.assert_allclose(inr, [73.0, 73.1, 73.3])
+    np.testing.assert_allclose(rub, [71.0, 71.1, 71.3])
+    assert client.dropped == 2
+
+    with pytest.raises(ValueError, match="time"):
+        run_client(b"t,INR,RUB\n0.0,73.0,71.0\n")
+
+
+def test_replayer_rejects_unsorted_times():
+    with pytest.raises(ValueError):
+        TickReplayer(np.array([0.0, 2.0, 1.0]), [np.zeros(3), np.zeros(3)])
+
+
+def test_replayer_delivers_every_tick():
+    times = np.arange(100_000) / 1000.0 + 5.0
+    rates = [np.arange(100_000.0), -np.arange(100_000.0)]
+    q = queue.Queue()
+    TickReplayer(times, rates, speed=0, max_batch=30_000).run(q, threading.Event())
+    got, r1, r2 = drain(q)
+    np.testing.assert_allclose(got, times - 5.0)
+    np.testing.assert_array_equal(r1, rates[0])
+    np.testing.assert_array_equal(r2, rates[1])
+
+
+def test_align_ticks_carries_rates_forward():
+    times, rates = align_ticks({"INR": ([0.0, 2.0], [1.0, 2.0]), "RUB": ([1.0, 3.0], [10.0, 30.0])})
+    np.testing.assert_array_equal(times, [1.0, 2.0, 3.0])  # Before t=1 RUB has no rate yet
+    np.testing.assert_array_equal(rates, [[1.0, 10.0], [2.0, 10.0], [2.0, 30.0]])
+
+
+def test_csv_formats_and_binary_round_trip(tmp_path):
+    wide = tmp_path / "wide.csv"
+    wide.write_text("time,RUB,INR\n1.0,71.0,73.0\n0.0,70.0,72.0\n")
+    times, rates = load_csv_ticks(str(wide))
+    np.testing.assert_array_equal(times, [0.0, 1.0])
+    np.testing.assert_array_equal(rates, [[72.0, 70.0], [73.0, 71.0]])
+
+    long = tmp_path / "long.csv"
+    long.write_text("time,pair,rate\n0.0,INR,72.0\n0.0,RUB,70.0\n1.0,INR,73.0\n")
+    times, rates = load_csv_ticks(str(long))
+    np.testing.assert_array_equal(rates, [[72.0, 70.0], [73.0, 70.0]])
+
+    path = str(tmp_path / "ticks.npy")
+    save_binary_ticks(path, times, rates)
+    loaded_times, loaded_rates = load_ticks(path)
+    assert isinstance(loaded_times, np.memmap)
+    np.testing.assert_array_equal(loaded_times, times)
+    np.testing.assert_array_equal(np.column_stack(loaded_rates), rates)
+
+    (tmp_path / "bad.csv").write_text("time,INR\n0,1\n")
+    with pytest.raises(ValueError):
+        load_csv_ticks(str(tmp_path / "bad.csv"))
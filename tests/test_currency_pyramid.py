@@ -0,0 +1,83 @@
+import numpy as np
+
+from currency_pyramid import HistoryPyramid
+
+
+def make_ticks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.exponential(0.05, n))
+    values = np.column_stack([73 + np.cumsum(rng.normal(0, 0.01, n)), 71 + np.cumsum(rng.normal(0, 0.01, n))])
+    return times, values
+
+
+def fill(pyramid, times, values, batch_sizes):
+    i = 0
+    for size in batch_sizes:
+        pyramid.append(times[i:i + size], values[i:i + size, 0], values[i:i + size, 1])
+        i += size
+    assert i == len(times)
+
+
+def test_levels_match_brute_force_after_uneven_appends():
+    times, values = make_ticks(5000)
+    pyramid = HistoryPyramid(base=4)
+    rng = np.random.default_rng(1)
+    sizes = []
+    while sum(sizes) < len(times):
+        sizes.append(min(int(rng.integers(1, 300)), len(times) - sum(sizes)))
+    fill(pyramid, times, values, sizes)
+
+    assert len(pyramid) == len(times)
+    assert pyramid.time_range() == (times[0], times[-1])
+    scale = 1
+    for level in pyramid.levels:
+        scale *= pyramid.base
+        buckets = -(-len(times) // scale)
+        assert level.size == buckets
+        for b in range(buckets):
+            chunk = values[b * scale:(b + 1) * scale]
+            assert level.t.data[b] == times[b * scale]
+            assert level.count.data[b] == len(chunk)
+            np.testing.assert_array_equal(level.min.data[b], chunk.min(axis=0))
+            np.testing.assert_array_equal(level.max.data[b], chunk.max(axis=0))
+            np.testing.assert_allclose(level.sum.data[b], chunk.sum(axis=0))
+    assert pyramid.levels[-1].size <= pyramid.base
+
+
+def test_batch_size_does_not_change_the_pyramid():
+    times, values = make_ticks(3000, seed=3)
+    one, many = HistoryPyramid(), HistoryPyramid()
+    fill(one, times, values, [len(times)])
+    fill(many, times, values, [1] * 100 + [17] * 100 + [1200])
+    assert len(one.levels) == len(many.levels)
+    for a, b in zip(one.levels, many.levels):
+        for column in ("t", "min", "max", "sum", "count"):
+            np.testing.assert_allclose(getattr(a, column).view(), getattr(b, column).view())
+
+
+def test_query_returns_raw_ticks_when_they_fit_and_summaries_otherwise():
+    times, values = make_ticks(20000, seed=4)
+    pyramid = HistoryPyramid()
+    fill(pyramid, times, values, [5000] * 4)
+
+    t0, t1 = times[100], times[180]
+    q_times, mean, lo, hi = pyramid.query(t0, t1, 500)
+    np.testing.assert_array_equal(q_times, times[99:182])  # One tick beyond each edge
+    np.testing.assert_array_equal(mean, values[99:182])
+
+    t0, t1 = times[1000], times[19000]
+    q_times, mean, lo, hi = pyramid.query(t0, t1, 400)
+    assert 0 < len(q_times) <= 400
+    assert q_times[0] <= t0 and q_times[-1] <= t1
+    # Every summary matches the raw ticks it covers
+    starts = np.searchsorted(times, q_times)
+    scale = starts[1] - starts[0]
+    for k, first in enumerate(starts):
+        chunk = values[first:first + scale]
+        np.testing.assert_array_equal(lo[k], chunk.min(axis=0))
+        np.testing.assert_array_equal(hi[k], chunk.max(axis=0))
+        np.testing.assert_allclose(mean[k], chunk.mean(axis=0))
+    # The range's overall extremes survive the downsampling
+    inside = values[1000:19001]
+    assert (lo.min(axis=0) <= inside.min(axis=0)).all()
+    assert (hi.max(axis=0) >= inside.max(axis=0)).all()
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from currency_risk import Histogram, Portfolio, RiskConfig, run_risk, summarize
+
+
+def normal_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def single_asset_config(paths=40_000):
+    portfolio = Portfolio(rates=(73.0, 71.0), holdings=(1000, 0), vols=(0.01, 0.01))
+    return RiskConfig(portfolio=portfolio, paths=paths, steps=25, seed=7, chunk_paths=10_000, batch_paths=5_000)
+
+
+def test_histogram_quantiles_and_tail_means_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, 100_000)
+    hist = Histogram(-6, 6, 12000)
+    hist.add(values[:30_000])
+    rest = Histogram(-6, 6, 12000)
+    rest.add(values[30_000:])
+    hist.merge(rest)
+
+    assert hist.total == len(values)
+    assert hist.mean() == pytest.approx(values.mean(), abs=1e-12)
+    ordered = np.sort(values)
+    for q in (0.01, 0.05, 0.5, 0.95):
+        assert hist.quantile(q) == pytest.approx(np.quantile(values, q), abs=2 * hist.width)
+        assert hist.tail_mean(q) == pytest.approx(ordered[:int(q * len(values))].mean(), abs=hist.width)
+
+
+def test_var_and_cvar_match_the_lognormal_closed_form():
+    config = single_asset_config()
+    summary = summarize(config, run_risk(config, workers=1))
+    exposure = 1000 * 73.0
+    s = 0.01 * math.sqrt(config.steps)
+    for level in (0.95, 0.99):
+        z = -{0.95: 1.6448536, 0.99: 2.3263479}[level]
+        var = exposure * (1 - math.exp(s * z))
+        cvar = exposure * (1 - math.exp(s * s / 2) * normal_cdf(z - s) / (1 - level))
+        assert summary["var"][f"{level:g}"] == pytest.approx(var, rel=0.04)
+        assert summary["cvar"][f"{level:g}"] == pytest.approx(cvar, rel=0.04)
+    assert summary["expected_pnl"] == pytest.approx(exposure * (math.exp(s * s / 2) - 1), abs=0.02 * exposure * s)
+    # The peak starts at the initial value, so a path's drawdown is at least its final loss
+    assert summary["drawdown"]["q95"] >= summary["var"]["0.95"] * 0.99
+    assert summary["fan"]["q50"][-1] == pytest.approx(config.portfolio.value, rel=0.01)
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    config = single_asset_config(paths=6_000)
+    config.chunk_paths = 1_500
+    serial, pooled = run_risk(config, workers=1), run_risk(config, workers=2)
+    assert serial.paths == pooled.paths == 6_000
+    np.testing.assert_array_equal(serial.pnl.counts, pooled.pnl.counts)
+    np.testing.assert_array_equal(serial.drawdown.counts, pooled.drawdown.counts)
+    np.testing.assert_array_equal(serial.fan.counts, pooled.fan.counts)
@@ -0,0 +1,60 @@
+import json
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from frame_timing import NULL_SPAN, FrameTimer
+
+
+class NoTkCanvas:
+    """A canvas of a non-Tk backend: no get_tk_widget."""
+
+    def __init__(self):
+        self.draws = 0
+
+    def draw(self):
+        self.draws += 1
+
+
+def test_disabled_timer_is_inert():
+    timer = FrameTimer()
+    assert timer.span("step") is NULL_SPAN and timer.frame() is NULL_SPAN
+    canvas = NoTkCanvas()
+    draw = canvas.draw
+    timer.wrap_draw(canvas)
+    assert canvas.draw == draw
+    assert timer.attach_overlay(canvas) is None
+    assert timer.samples == {}
+
+
+def test_overlay_skipped_on_non_tk_canvas():
+    timer = FrameTimer(enabled=True)
+    fig = plt.figure()
+    try:
+        assert timer.attach_overlay(fig.canvas) is None
+    finally:
+        plt.close(fig)
+    assert timer.overlays == []
+
+
+def test_spans_feed_statistics_and_trace(tmp_path):
+    timer = FrameTimer(enabled=True)
+    canvas = NoTkCanvas()
+    timer.wrap_draw(canvas)
+    for _ in range(5):
+        with timer.frame():
+            with timer.span("step"):
+                pass
+            canvas.draw()
+    assert canvas.draws == 5
+    assert {name: len(samples) for name, samples in timer.samples.items()} == {"frame": 5, "step": 5, "draw": 5}
+    p = timer.percentiles("frame")
+    assert 0 <= p[50] <= p[95] <= p[99]
+    assert timer.fps() > 0
+    path = str(tmp_path / "trace.json")
+    assert timer.export_chrome_trace(path) == 15
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
@@ -0,0 +1,155 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from dataclasses import fields
+
+import pytest
+
+import sim_service
+from spatter import StainSet
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    weapons_file = str(tmp_path_factory.mktemp("weapons") / "weapons.json")
+    sim_service._demo_weapons(weapons_file)
+    service = sim_service.SimulationService(1, weapons_file, batch_window=0.05)
+    httpd = sim_service.make_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield service, httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+
+@pytest.fixture
+def client(server):
+    client = sim_service.SimulationClient("127.0.0.1", server[1])
+    yield client
+    client.close()
+
+
+def test_normalize_fills_defaults_and_rejects_bad_input():
+    params, cacheable = sim_service.normalize("projectile", {"v0": 10})
+    assert cacheable and params["v0"] == 10.0 and params["method"] == "rk4" and params["dt"] == 0.01
+    for bad in [{"v0": "fast"}, {"v0": -1}, {"method": "leapfrog"}, {"max_steps": 1.5}, {"unknown": 1}]:
+        with pytest.raises(ValueError):
+            sim_service.normalize("projectile", bad)
+    with pytest.raises(ValueError):
+        sim_service.normalize("automaton", {"kind": "life", "rows": 10})
+    _, cacheable = sim_service.normalize("spatter", {"weapon": "Knife"})
+    assert not cacheable
+
+
+def test_cache_key_ignores_parameter_order():
+    a, _ = sim_service.normalize("projectile", {"v0": 10, "angle": 30})
+    b, _ = sim_service.normalize("projectile", {"angle": 30, "v0": 10})
+    assert sim_service.cache_key("projectile", a) == sim_service.cache_key("projectile", b)
+    assert sim_service.cache_key("projectile", a) != sim_service.cache_key("automaton", a)
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = sim_service.ResultCache(max_bytes=400)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"x" * 100)
+    cache.put("c", b"x" * 100)
+    cache.get("a")
+    cache.put("d", b"x" * 100)
+    cache.put("e", b"x" * 100)
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.bytes <= 400
+    cache.put("huge", b"x" * 200)  # Over a quarter of the budget: not kept
+    assert cache.get("huge") is None
+
+
+def test_run_batch_reports_errors_per_job():
+    projectile, _ = sim_service.normalize("projectile", {"v0": 20})
+    automaton, _ = sim_service.normalize("automaton", {"rule": 90, "width": 11, "steps": 3})
+    results = sim_service.run_batch([("projectile", projectile), ("nonsense", {}), ("automaton", automaton)])
+    assert json.loads(results[0])["landed"]
+    assert isinstance(results[1], Exception)
+    assert json.loads(results[2])["rows"] == ["00000100000", "00001010000", "00010001000"]
+
+
+def test_projectile_matches_flight_model(client):
+    from projectile import Projectile
+
+    result = client.run("projectile", v0=30, angle=40, dt=0.01)
+    projectile = Projectile(30, 40, 0, 0.01, 1.0)
+    while not projectile.on_ground:
+        projectile.runge_kutta(0.01)
+    assert result["landed"] and result["distance"] == pytest.approx(projectile.x)
+
+
+def test_repeat_request_is_served_from_cache(client):
+    first = client.request("POST", "/automaton", {"rule": 30, "width": 101, "steps": 50})
+    second = client.request("POST", "/automaton", {"steps": 50, "width": 101, "rule": 30})
+    assert first[0] == second[0] == 200
+    assert (first[2], second[2]) == ("miss", "hit")
+    assert first[1] == second[1]
+
+
+def test_spatter_without_seed_is_not_cached(client):
+    first = client.request("POST", "/spatter", {"weapon": "Knife", "droplets": 50})
+    second = client.request("POST", "/spatter", {"weapon": "Knife", "droplets": 50})
+    assert (first[2], second[2]) == ("miss", "miss")
+    assert first[1]["seed"] != second[1]["seed"]
+
+
+def test_ballistic_spatter_returns_every_stain_column(client):
+    result = client.run("spatter", weapon="Bat", droplets=100, seed=4, model="ballistic")
+    columns = {f.name for f in fields(StainSet)}
+    assert set(result) == columns | {"seed"}
+    assert result["plane"] == "floor" and len(result["x"]) == len(result["width"])
+
+
+def test_errors_are_json(client):
+    assert client.request("POST", "/spatter", {"weapon": "Spoon"})[:2] == (400, {"error": "Unknown weapon 'Spoon'"})
+    assert client.request("POST", "/teleport", {})[0] == 404
+    assert client.request("GET", "/nowhere")[0] == 404
+
+
+def test_concurrent_misses_share_batches_and_jobs(server):
+    service, _ = server
+    before = service.snapshot()
+    futures = [service.submit("projectile", {"v0": 10 + i, "dt": 0.05})[0] for i in range(8)]
+    duplicate, how = service.submit("projectile", {"v0": 10, "dt": 0.05})
+    assert how == "shared" and duplicate is futures[0]
+    for future in futures:
+        json.loads(future.result(timeout=60))
+    after = service.snapshot()
+    assert after["misses"] - before.get("misses", 0) == 8
+    assert after["batches"] - before.get("batches", 0) < 8
+
+
+def test_cache_hits_on_a_kept_alive_connection_are_fast(client):
+    client.request("POST", "/projectile", {"v0": 42})
+    latencies = []
+    for _ in range(20):
+        start = time.perf_counter()
+        status, _, cache, _ = client.request("POST", "/projectile", {"v0": 42})
+        latencies.append(time.perf_counter() - start)
+        assert (status, cache) == (200, "hit")
+    # Nagle plus delayed ACK would put every one of these at about 40 ms
+    assert statistics.median(latencies) < 0.02
+
+
+def test_large_results_are_chunked(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server[1], timeout=120)
+    conn.request("POST", "/spatter", json.dumps({"weapon": "Knife", "droplets": 100_000, "seed": 1}))
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert len(body) > sim_service.STREAM_BYTES
+    assert len(json.loads(body)["x"]) >= 100_000
+
+
+def test_loadtest_reports_and_checks_hit_latency(server, capsys):
+    assert sim_service.loadtest("127.0.0.1", server[1], requests=40, concurrency=4, distinct=3, max_hit_ms=100)
+    out = capsys.readouterr().out
+    assert "req/s" in out and "cache hit p95" in out
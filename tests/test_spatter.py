@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from spatter import CONE_REFERENCE_DISTANCE, launch_cone, simulate_droplet_flight, surface_spread
+
+
+def test_droplets_still_in_flight_are_counted():
+    stains = simulate_droplet_flight(8.0, 40, 0.3, 2000, rng=0, max_steps=25)
+    assert 0 < stains.airborne < 2000
+    assert len(stains) + stains.airborne == 2000
+
+    stains = simulate_droplet_flight(8.0, 40, 0.3, 2000, rng=0)
+    assert stains.airborne == 0 and len(stains) == 2000
+
+
+def test_launch_cone_is_the_angle_of_the_scatter_spread():
+    for factor, surface in [(0.1, "Smooth"), (0.3, "Rough"), (2.0, "Fabric")]:
+        spread = surface_spread(factor, surface)  # Metres
+        cone = launch_cone(factor, surface)  # Radians
+        assert np.tan(cone) * CONE_REFERENCE_DISTANCE == pytest.approx(spread)
+        assert 0 < cone < np.pi / 2
+    assert launch_cone(0.02, "Smooth") == pytest.approx(0.01, rel=1e-3)  # Small spreads barely change
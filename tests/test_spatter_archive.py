@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from spatter import generate_droplets, simulate_droplet_flight
+from spatter_archive import STAIN_COLUMNS, RunArchive
+
+PARAMS = {"weapon": "Knife", "surface": "Smooth", "velocity": 20.0, "angle": 45, "seed": 3}
+
+
+def test_archive_directory_created_on_first_save(tmp_path):
+    root = str(tmp_path / "runs")
+    archive = RunArchive(root)
+    assert not os.path.exists(root)
+    assert archive.entries() == [] and archive.find(weapon="Knife") == []
+    archive.save(dict(PARAMS, model="scatter"), *generate_droplets(20.0, 45, 0.3, 0.3, 100, rng=0))
+    assert os.path.isdir(root)
+
+
+def test_droplet_round_trip(tmp_path):
+    archive = RunArchive(str(tmp_path))
+    x, y, z = generate_droplets(20.0, 45, 0.3, 0.3, 5000, rng=3)
+    saved = archive.save(dict(PARAMS, model="scatter"), x, y, z)
+
+    run = archive.load(saved.id)
+    assert run.params["droplets"] == len(x) and run.params["plane"] is None
+    assert run.stains() is None
+    for original, loaded in zip((x, y, z), run.droplets()):
+        assert isinstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, original)
+    assert not any(name.endswith(".partial") for name in os.listdir(tmp_path))
+
+
+def test_stain_round_trip(tmp_path):
+    archive = RunArchive(str(tmp_path))
+    stains = simulate_droplet_flight(15.0, 30, 0.3, 2000, rng=1, plane="wall", max_steps=15)
+    assert stains.airborne > 0 and len(stains)
+    saved = archive.save(dict(PARAMS, model="ballistic"), stains=stains)
+
+    loaded = archive.load(saved.id).stains()
+    assert loaded.plane == "wall" and loaded.airborne == stains.airborne
+    for name in STAIN_COLUMNS:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(stains, name))
+
+
+def test_find_filters_and_skips_deleted_runs(tmp_path):
+    archive = RunArchive(str(tmp_path))
+    droplets = generate_droplets(20.0, 45, 0.3, 0.3, 50, rng=0)
+    knife = archive.save(dict(PARAMS, model="scatter"), *droplets)
+    bat = archive.save(dict(PARAMS, weapon="Bat", model="scatter"), *droplets)
+    archive.save(dict(PARAMS, weapon="Bat", surface="Rough", model="scatter"), *droplets)
+
+    assert [e["id"] for e in archive.find(weapon="Knife")] == [knife.id]
+    assert len(archive.find(weapon="Bat")) == 2
+    assert len(archive.find(weapon="Bat", surface="Smooth")) == 1
+    archive.delete(bat.id)
+    assert [e["surface"] for e in archive.find(weapon="Bat")] == ["Rough"]
+    assert len(archive.entries()) == 2
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from spatter import generate_droplets
+from spatter_index import GridIndex, cluster_summary
+
+
+def brute_radius(points, centre, radius):
+    return np.flatnonzero(((points - centre) ** 2).sum(axis=1) <= radius * radius)
+
+
+def brute_dbscan_partition(points, eps, min_samples):
+    """Core points grouped into clusters, as a set of frozensets."""
+    d2 = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    near = d2 <= eps * eps
+    core = near.sum(axis=1) >= min_samples
+    seen, clusters = set(), set()
+    for start in np.flatnonzero(core):
+        if start in seen:
+            continue
+        stack, members = [start], set()
+        while stack:
+            i = stack.pop()
+            if i in members:
+                continue
+            members.add(i)
+            stack.extend(j for j in np.flatnonzero(near[i] & core) if j not in members)
+        seen |= members
+        clusters.add(frozenset(int(i) for i in members))
+    return core, clusters
+
+
+@pytest.mark.parametrize("dims", [2, 3])
+def test_query_radius_matches_brute_force(dims):
+    rng = np.random.default_rng(dims)
+    points = rng.random((3000, dims))
+    index = GridIndex(points)
+    # Centres inside the data, on its edge and well outside it on every side of every axis
+    centres = [rng.random(dims) for _ in range(20)]
+    for axis in range(dims):
+        for value in (-2.0, -0.02, 1.02, 1.5, 3.0):
+            centre = np.full(dims, 0.5)
+            centre[axis] = value
+            centres.append(centre)
+    for radius in (0.001, 0.03, 0.2, 0.7):
+        hits = index.query_radius(np.array(centres), radius)
+        counts = index.count_radius(np.array(centres), radius)
+        for centre, hit, count in zip(centres, hits, counts):
+            expected = brute_radius(points, centre, radius)
+            np.testing.assert_array_equal(np.sort(hit), expected)
+            assert count == len(expected)
+
+
+def test_query_radius_single_centre_outside_data():
+    index = GridIndex(np.random.default_rng(0).random((20000, 2)))
+    assert len(index.query_radius((0.5, 1.5), 0.03)) == 0
+    assert len(index.query_radius((0.5, -1.5), 0.03)) == 0
+
+    x, y, _ = generate_droplets(20.0, 45, 0.3, 0.3, 5000, rng=1)
+    points = np.column_stack([x, y])
+    centre = (20, y.min() - 0.5)
+    np.testing.assert_array_equal(GridIndex(points).query_radius(centre, 0.1), brute_radius(points, centre, 0.1))
+
+
+def test_nearest_neighbor_matches_brute_force():
+    points = np.random.default_rng(3).normal(size=(800, 2)) ** 3  # Dense core, sparse fringe
+    distance, index = GridIndex(points).nearest_neighbor()
+    d = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(d, np.inf)
+    np.testing.assert_allclose(distance, d.min(axis=1))
+    np.testing.assert_allclose(d[np.arange(len(points)), index], d.min(axis=1))
+
+
+def test_nearest_neighbor_of_a_lone_point():
+    distance, index = GridIndex(np.array([[0.0, 0.0]])).nearest_neighbor()
+    assert np.isinf(distance[0]) and index[0] == -1
+
+
+def test_dbscan_matches_brute_force():
+    rng = np.random.default_rng(5)
+    points = np.concatenate([rng.normal(0, 0.05, (300, 2)), rng.normal(1, 0.05, (300, 2)), rng.random((100, 2)) * 3])
+    eps, min_samples = 0.05, 5
+    labels = GridIndex(points).dbscan(eps, min_samples)
+    core, clusters = brute_dbscan_partition(points, eps, min_samples)
+
+    found = {}
+    for i in np.flatnonzero(core):
+        found.setdefault(labels[i], set()).add(int(i))
+    assert -1 not in found
+    assert {frozenset(members) for members in found.values()} == clusters
+    # Border points join a cluster of a core point within eps; everything else is noise
+    d2 = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    for i in np.flatnonzero(~core):
+        reachable = np.flatnonzero((d2[i] <= eps * eps) & core)
+        if len(reachable):
+            assert labels[i] in set(labels[reachable])
+        else:
+            assert labels[i] == -1
+    summary = cluster_summary(labels)
+    assert summary["clusters"] == len(clusters)
+    assert summary["noise"] == int(np.count_nonzero(labels == -1))
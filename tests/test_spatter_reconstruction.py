@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from spatter import StainSet, simulate_droplet_flight
+from spatter_reconstruction import convergence_least_squares, estimate_origin
+
+
+def shifted(stains, du, dv):
+    return StainSet(stains.plane, stains.x + du, stains.y + dv, stains.z, stains.u + du, stains.v + dv,
+                    stains.width, stains.length, stains.orientation, stains.impact_angle, stains.impact_speed,
+                    stains.diameter)
+
+
+def test_lines_through_one_point_converge_on_it():
+    rng = np.random.default_rng(0)
+    angle = rng.uniform(0, 2 * np.pi, 50)
+    distance = rng.uniform(0.5, 2, 50)
+    u, v = 0.3 + distance * np.cos(angle), -0.7 + distance * np.sin(angle)
+    np.testing.assert_allclose(convergence_least_squares(u, v, angle), [0.3, -0.7], atol=1e-9)
+
+
+@pytest.mark.parametrize("method", ["lsq", "ransac"])
+def test_convergence_is_recovered(method):
+    stains = shifted(simulate_droplet_flight(8.0, 20, 0.6, 3000, rng=1, height=1.5), 0.4, -0.2)
+    est = estimate_origin(stains, method=method, rng=0)
+    np.testing.assert_allclose(est.convergence, [0.4, -0.2], atol=0.02)
+    a, b, _ = est.confidence_ellipse()
+    assert 0 < b <= a < 0.05
+
+
+# (velocity, elevation, true height, stated tolerance): the corrected estimate is an upper
+# bound, about 5% high for fast flat or downward launches and up to 20% for the benchmark's
+@pytest.mark.parametrize("velocity, angle, height, tolerance", [
+    (8.0, 20, 1.5, 0.25),
+    (20.0, -20, 1.5, 0.10),
+    (15.0, 0, 1.0, 0.10),
+    (10.0, -60, 1.0, 0.10),
+])
+def test_height_within_stated_tolerance(velocity, angle, height, tolerance):
+    stains = simulate_droplet_flight(velocity, angle, 0.6, 5000, rng=2, height=height)
+    est = estimate_origin(stains, rng=0)
+    assert height * 0.97 <= est.height <= height * (1 + tolerance)
+    lo, hi = est.height_interval
+    assert lo <= est.height <= hi
+
+
+def test_uncorrected_mean_overestimates():
+    stains = simulate_droplet_flight(8.0, 20, 0.6, 5000, rng=3, height=1.5)
+    corrected = estimate_origin(stains, rng=0)
+    plain = estimate_origin(stains, height_quantile=None, rng=0)
+    assert plain.height > 2 * 1.5 > corrected.height
+
+
+def test_ransac_ignores_stray_stains():
+    stains = simulate_droplet_flight(8.0, 20, 0.6, 2000, rng=4, height=1.5)
+    rng = np.random.default_rng(4)
+    k = 400
+    stray = StainSet("floor", *(np.concatenate([a, b]) for a, b in zip(
+        (stains.x, stains.y, stains.z, stains.u, stains.v, stains.width, stains.length, stains.orientation,
+         stains.impact_angle, stains.impact_speed, stains.diameter),
+        (rng.uniform(2, 4, k), rng.uniform(2, 4, k), np.zeros(k), rng.uniform(2, 4, k), rng.uniform(2, 4, k),
+         np.full(k, 1e-3), np.full(k, 3e-3), rng.uniform(0, 2 * np.pi, k), np.full(k, 0.3), np.ones(k),
+         np.full(k, 1e-3)))))
+    est = estimate_origin(stray, method="ransac", rng=0)
+    np.testing.assert_allclose(est.convergence, [0, 0], atol=0.02)
+    assert est.inliers[len(stains):].mean() < 0.2
+
+
+def test_needs_two_elongated_stains():
+    stains = simulate_droplet_flight(8.0, 20, 0.6, 50, rng=5)
+    stains.length = stains.width.copy()
+    with pytest.raises(ValueError):
+        estimate_origin(stains)
+
+
+def test_height_needs_a_stain_moving_away_from_the_convergence():
+    # Four lines through the origin; only the first stain travelled away from it
+    angle = np.array([0.3, 1.9, 3.4, 4.9])
+    distance = np.array([1.0, 0.8, 1.2, 0.9])
+    toward = np.array([False, True, True, True])
+    stains = SimpleNamespace(u=distance * np.cos(angle), v=distance * np.sin(angle), width=np.full(4, 0.5),
+                             length=np.full(4, 1.0), orientation=np.where(toward, angle + np.pi, angle))
+    est = estimate_origin(stains, method="lsq", rng=0)
+    assert est.height == pytest.approx(np.tan(np.arcsin(0.5)))
+    # Replicates that drew no weight on the first stain have no height and are left out
+    lo, hi = est.height_interval
+    assert 0 < lo <= est.height <= hi
+
+    stains.orientation = angle + np.pi
+    with pytest.raises(ValueError):
+        estimate_origin(stains, method="lsq", rng=0)
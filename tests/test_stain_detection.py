@@ -0,0 +1,94 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from spatter import simulate_droplet_flight
+from spatter_reconstruction import estimate_origin
+from stain_detection import StainTable, clear_cache, detect_stains, evict_cache, open_image
+
+
+def write_scene(path, ellipses, size=(600, 800)):
+    image = np.full(size + (3,), 225, dtype=np.uint8)
+    for (cx, cy), (a, b), angle in ellipses:
+        cv2.ellipse(image, (cx, cy), (a, b), angle, 0, 360, (20, 20, 140), -1)
+    assert cv2.imwrite(path, image)
+
+
+def test_detects_known_ellipses_across_tiles(tmp_path):
+    path = str(tmp_path / "scene.png")
+    # The second stain straddles the 256-pixel tile border
+    ellipses = [((100, 100), (30, 10), 0), ((256, 300), (24, 12), 45), ((600, 450), (20, 20), 0)]
+    write_scene(path, ellipses)
+    stains = detect_stains(path, tile=256, overlap=64, workers=1, cache_dir=str(tmp_path / "cache"))
+    assert len(stains) == 3
+    order = np.argsort(stains.u)
+    np.testing.assert_allclose(stains.u[order], [100, 256, 600], atol=1)
+    np.testing.assert_allclose(stains.v[order], [100, 300, 450], atol=1)
+    np.testing.assert_allclose(stains.length[order][:2], [60, 48], rtol=0.1)
+    np.testing.assert_allclose(np.degrees(stains.orientation[order][:2]), [0, 45], atol=3)
+    assert ((stains.orientation >= 0) & (stains.orientation < np.pi)).all()
+
+
+def test_decode_cache_is_reused_and_evicted(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"scene{i}.png"))
+        write_scene(paths[-1], [((100 + 50 * i, 100), (20, 8), 0)], size=(200, 200))
+    entry_size = 200 * 200 * 3 + 128
+
+    _, first = open_image(paths[0], cache_dir)
+    assert open_image(paths[0], cache_dir)[1] == first and len(os.listdir(cache_dir)) == 1
+    os.utime(first, (1, 1))  # Make it the least recently used
+    open_image(paths[1], cache_dir)
+    # Room for two decodes: adding a third evicts the oldest
+    _, third = open_image(paths[2], cache_dir, max_cache_bytes=2 * entry_size)
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(p) for p in [open_image(paths[1], cache_dir)[1], third])
+    assert not os.path.exists(first)
+
+    assert evict_cache(cache_dir, max_bytes=0, keep=third) > 0
+    assert os.listdir(cache_dir) == [os.path.basename(third)]
+    clear_cache(cache_dir)
+    assert os.listdir(cache_dir) == []
+
+
+def test_decode_cache_keys_on_full_path_and_exact_mtime(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    paths = [str(tmp_path / folder / "IMG_0001.png") for folder in ("a", "b")]
+    for path, x in zip(paths, (60, 140)):
+        os.makedirs(os.path.dirname(path))
+        write_scene(path, [((x, 100), (20, 8), 0)], size=(200, 200))
+    mtime_ns = os.stat(paths[0]).st_mtime_ns
+    os.utime(paths[1], ns=(mtime_ns, mtime_ns))
+    assert os.path.getsize(paths[0]) == os.path.getsize(paths[1])
+
+    a, a_cache = open_image(paths[0], cache_dir)
+    b, b_cache = open_image(paths[1], cache_dir)
+    assert a_cache != b_cache
+    np.testing.assert_array_equal(b, cv2.imread(paths[1]))
+
+    # Rewritten within the same second: only the sub-second mtime differs
+    write_scene(paths[0], [((100, 60), (20, 8), 0)], size=(200, 200))
+    os.utime(paths[0], ns=(mtime_ns + 1000, mtime_ns + 1000))
+    rewritten, _ = open_image(paths[0], cache_dir)
+    np.testing.assert_array_equal(rewritten, cv2.imread(paths[0]))
+
+
+def test_unreadable_image_is_reported(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    with pytest.raises(ValueError):
+        open_image(str(path), str(tmp_path / "cache"))
+
+
+def test_photo_orientations_give_the_same_origin_as_directional_ones():
+    stains = simulate_droplet_flight(8.0, 20, 0.6, 3000, rng=2, height=1.5)
+    photo = StainTable(stains.u, stains.v, stains.width, stains.length, np.mod(stains.orientation, np.pi),
+                       stains.width * stains.length)
+    directional = estimate_origin(stains, rng=0)
+    folded = estimate_origin(photo, rng=0)
+    np.testing.assert_allclose(folded.convergence, directional.convergence, atol=1e-9)
+    assert folded.height == pytest.approx(directional.height)
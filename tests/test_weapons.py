@@ -0,0 +1,125 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+import weapons
+from weapons import SQLiteWeaponDB, Weapon, WeaponDB, open_weapon_db
+
+
+def knife(weapon_id=1, name="Knife"):
+    return Weapon(weapon_id, name, "Sharp", 1.0, 0.2, "", "", 0.2, blade_length=0.2)
+
+
+def quiet(errors):
+    return lambda title, message: errors.append(message)
+
+
+def test_save_and_reload_round_trip(tmp_path):
+    path = str(tmp_path / "weapons.json")
+    errors = []
+    db = WeaponDB(path, on_error=quiet(errors))
+    assert db.weapons == [] and errors  # Missing file reported, catalogue empty
+    db.add_weapon(knife())
+    db.add_weapon(Weapon(db.next_id(), "Pistol", "Firearm", 3.0, 0.1, "", "", 0.6, caliber="9mm"))
+    assert os.listdir(tmp_path) == ["weapons.json"]  # No temporary file left behind
+
+    again = WeaponDB(path)
+    assert again.weapons == db.weapons
+    assert again.get_weapon("Pistol").caliber == "9mm"
+    assert again.get_weapon_by_id(1).name == "Knife"
+    assert again.get_all_weapons() == ["Knife", "Pistol"]
+
+
+@pytest.mark.parametrize("name", ["weapons.json", "weapons.db"])
+def test_duplicate_name_is_reported_not_added(tmp_path, name):
+    errors = []
+    db = open_weapon_db(str(tmp_path / name), on_error=quiet(errors))
+    assert db.add_weapon(knife())
+    errors.clear()
+    assert not db.add_weapon(knife(2))
+    assert db.get_all_weapons() == ["Knife"] and "Knife" in errors[0]
+
+
+def test_saved_file_follows_umask(tmp_path):
+    path = str(tmp_path / "weapons.json")
+    old = os.umask(0o022)
+    try:
+        WeaponDB(path, on_error=quiet([])).add_weapon(knife())
+    finally:
+        os.umask(old)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_concurrent_saves_never_share_a_temporary_file(tmp_path):
+    path = str(tmp_path / "weapons.json")
+    errors = []
+    dbs = [WeaponDB(path, on_error=quiet(errors)) for _ in range(4)]
+    errors.clear()  # The file doesn't exist yet
+    for i, db in enumerate(dbs):
+        db.weapons = [knife(1, f"Knife {i}")] * 200
+    threads = [threading.Thread(target=lambda db=db: [db.save_weapons() for _ in range(10)]) for db in dbs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    saved = WeaponDB(path).get_all_weapons()
+    assert len(saved) == 200 and len(set(saved)) == 1  # One writer's whole catalogue, never a mix
+    assert os.listdir(tmp_path) == ["weapons.json"]
+
+
+def test_unchanged_file_is_not_reread(tmp_path, monkeypatch):
+    path = str(tmp_path / "weapons.json")
+    WeaponDB(path, on_error=quiet([])).add_weapon(knife())
+    db = WeaponDB(path)
+    loads = []
+    real_load = json.load
+    monkeypatch.setattr(weapons.json, "load", lambda f: loads.append(1) or real_load(f))
+    for _ in range(5):
+        db.load_weapons()
+    assert loads == []
+    db.load_weapons(force=True)
+    assert loads == [1]
+
+
+def test_external_edit_is_picked_up(tmp_path):
+    path = str(tmp_path / "weapons.json")
+    db = WeaponDB(path, on_error=quiet([]))
+    db.add_weapon(knife())
+    other = WeaponDB(path)
+    other.add_weapon(knife(2, "Bat"))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # Coarse-mtime filesystems
+    db.load_weapons()
+    assert db.get_all_weapons() == ["Knife", "Bat"]
+
+
+def test_corrupt_file_reports_and_empties(tmp_path):
+    path = tmp_path / "weapons.json"
+    path.write_text("{not json")
+    errors = []
+    db = WeaponDB(str(path), on_error=quiet(errors))
+    assert db.weapons == [] and errors
+
+
+def test_sqlite_store_sees_other_connections(tmp_path):
+    path = str(tmp_path / "weapons.db")
+    db = open_weapon_db(path)
+    assert isinstance(db, SQLiteWeaponDB)
+    db.add_weapon(knife())
+    other = open_weapon_db(path)
+    other.add_weapon(knife(2, "Bat"))
+    db.load_weapons()
+    assert db.get_all_weapons() == ["Knife", "Bat"]
+    assert db.get_weapon("Knife") == knife()
+
+
+def test_sqlite_import_json(tmp_path):
+    json_path = str(tmp_path / "weapons.json")
+    WeaponDB(json_path, on_error=quiet([])).add_weapon(knife())
+    db = SQLiteWeaponDB(str(tmp_path / "weapons.db"))
+    db.import_json(json_path)
+    assert db.get_all_weapons() == ["Knife"]
@@ -0,0 +1,213 @@
+"""Weapon catalogue for the blood spatter simulator.
+
+Two interchangeable stores with the same interface:
+
+  * WeaponDB        the original ``weapons.json`` file
+  * SQLiteWeaponDB  a SQLite database, for large catalogues
+
+Both keep the weapons in memory with dict indexes by id and by name, and
+only go back to disk when the file actually changed (JSON: mtime and size,
+SQLite: the connection's data_version), so refreshing the GUI or looking a
+weapon up once per batch run costs a dict lookup. JSON saves go to a
+uniquely named temporary file that is renamed over the old one, so neither
+a crash mid-save nor two processes saving at once leave a truncated or
+mixed catalogue; SQLite adds weapons with a single INSERT.
+
+Errors go to ``on_error(title, message)``; the GUI passes a message box.
+No Tk import here, so batch tools can use the catalogue headless.
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+
+
+@dataclass
+class Weapon:
+    id: int
+    name: str
+    type: str
+    velocity_mult: float
+    spread_factor: float
+    pattern_desc: str
+    stain_chars: str
+    satellite_chance: float
+    caliber: Optional[str] = None
+    blade_length: Optional[float] = None
+
+
+FIELDS = [f.name for f in fields(Weapon)]
+
+
+def _print_error(title, message):
+    print(f"{title}: {message}", file=sys.stderr)
+
+
+def _umask():
+    mask = os.umask(0)  # Can only be read by setting it
+    os.umask(mask)
+    return mask
+
+
+def weapon_from_dict(w):
+    return Weapon(
+        id=w["id"],
+        name=w["name"],
+        type=w["type"],
+        velocity_mult=w["velocity_mult"],
+        spread_factor=w["spread_factor"],
+        pattern_desc=w["pattern_desc"],
+        stain_chars=w["stain_chars"],
+        satellite_chance=w["satellite_chance"],
+        caliber=w.get("caliber"),
+        blade_length=w.get("blade_length")
+    )
+
+
+class WeaponDB:
+    def __init__(self, file_path='weapons.json', on_error=_print_error):
+        self.file_path = file_path
+        self.on_error = on_error
+        self.weapons = []
+        self.by_id = {}
+        self.by_name = {}
+        self._signature = None  # (mtime_ns, size) of the file the weapons were read from
+        self.load_weapons()
+
+    def _index(self, weapons):
+        self.weapons = weapons
+        self.by_id = {w.id: w for w in weapons}
+        self.by_name = {w.name: w for w in weapons}
+
+    def _stat(self):
+        st = os.stat(self.file_path)
+        return st.st_mtime_ns, st.st_size
+
+    def load_weapons(self, force=False):
+        """Read the catalogue, unless the file is unchanged since the last read or save."""
+        try:
+            signature = self._stat()
+            if not force and signature == self._signature:
+                return
+            with open(self.file_path, 'r') as f:
+                data = json.load(f)
+            self._index([weapon_from_dict(w) for w in data.get('weapons', [])])
+            self._signature = signature
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            self.on_error("Load Error", f"Failed to load weapons: {str(e)}")
+            self._index([])
+            self._signature = None
+
+    def save_weapons(self):
+        data = {"weapons": [asdict(w) for w in self.weapons]}
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=".weapons-", suffix=".tmp", dir=directory)
+            try:
+                # mkstemp creates the file 0600; give it the mode a plain open() would have
+                os.chmod(tmp, 0o666 & ~_umask())
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.file_path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._signature = self._stat()
+        except Exception as e:
+            self.on_error("Save Error", f"Failed to save weapons: {str(e)}")
+
+    def next_id(self):
+        return max(self.by_id) + 1 if self.by_id else 1
+
+    def add_weapon(self, weapon):
+        """Add and save ``weapon``; returns False (after ``on_error``) if its name is taken."""
+        if weapon.name in self.by_name:
+            self.on_error("Add Error", f"A weapon named {weapon.name!r} already exists")
+            return False
+        self._index(self.weapons + [weapon])
+        self.save_weapons()
+        return True
+
+    def get_weapon(self, name):
+        return self.by_name.get(name)
+
+    def get_weapon_by_id(self, weapon_id):
+        return self.by_id.get(weapon_id)
+
+    def get_all_weapons(self):
+        return [w.name for w in self.weapons]
+
+
+class SQLiteWeaponDB(WeaponDB):
+    """Same catalogue in SQLite; ``import_json`` copies an existing weapons.json in."""
+
+    def __init__(self, file_path='weapons.db', on_error=_print_error):
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS weapons (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, type TEXT, "
+            "velocity_mult REAL, spread_factor REAL, pattern_desc TEXT, stain_chars TEXT, satellite_chance REAL, "
+            "caliber TEXT, blade_length REAL)")
+        self.conn.commit()
+        super().__init__(file_path, on_error)
+
+    def _stat(self):
+        # Bumped whenever another connection commits; our own writes update the cache directly
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_weapons(self, force=False):
+        try:
+            signature = self._stat()
+            if not force and signature == self._signature:
+                return
+            rows = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM weapons ORDER BY id").fetchall()
+            self._index([Weapon(*row) for row in rows])
+            self._signature = signature
+        except sqlite3.Error as e:
+            self.on_error("Load Error", f"Failed to load weapons: {str(e)}")
+            self._index([])
+            self._signature = None
+
+    def _insert(self, weapons):
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO weapons ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+            [tuple(getattr(w, name) for name in FIELDS) for w in weapons])
+
+    def save_weapons(self):
+        try:
+            with self.conn:
+                self.conn.execute("DELETE FROM weapons")
+                self._insert(self.weapons)
+        except sqlite3.Error as e:
+            self.on_error("Save Error", f"Failed to save weapons: {str(e)}")
+
+    def add_weapon(self, weapon):
+        if weapon.name in self.by_name:
+            self.on_error("Add Error", f"A weapon named {weapon.name!r} already exists")
+            return False
+        try:
+            with self.conn:
+                self._insert([weapon])
+        except sqlite3.Error as e:
+            self.on_error("Save Error", f"Failed to save weapon: {str(e)}")
+            return False
+        self._index(self.weapons + [weapon])
+        return True
+
+    def import_json(self, json_path):
+        with open(json_path, 'r') as f:
+            weapons = [weapon_from_dict(w) for w in json.load(f).get('weapons', [])]
+        with self.conn:
+            self._insert(weapons)
+        self.load_weapons(force=True)
+
+
+def open_weapon_db(file_path='weapons.json', on_error=_print_error):
+    """The SQLite store for .db/.sqlite paths, the JSON one otherwise."""
+    if file_path.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteWeaponDB(file_path, on_error)
+    return WeaponDB(file_path, on_error)